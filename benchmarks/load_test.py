@@ -0,0 +1,502 @@
+"""
+多会话并发负载测试
+
+用Streamlit的AppTest模拟N名老师同时使用主页面、数据编辑页面和历史记录页面（每名老师一个进程），
+天气由本地替身服务提供（不访问网络）。报告每个操作重新运行的p50/p99耗时、
+文件存储冲突（锁超时、写入失败、丢失的历史记录）和每个会话的内存增长。
+
+所有读写都在临时目录中的仓库副本里进行，不影响 data/ 和 output/。
+
+示例:
+    python benchmarks/load_test.py                      # 8个会话，每个会话3轮
+    python benchmarks/load_test.py --sessions 32 --rounds 5
+    python benchmarks/load_test.py --sessions 16 --no-memory   # 不统计内存（tracemalloc会拖慢运行）
+"""
+import argparse
+import copy
+import gc
+import json
+import logging
+import multiprocessing
+import os
+import platform
+import queue
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(REPO_ROOT, 'benchmarks', 'results')
+
+# 复制到临时目录时跳过的文件（输出、备份、版本库和之前的结果）
+COPY_IGNORE = shutil.ignore_patterns('.git', '__pycache__', 'output', 'backups', 'results', '*.prom')
+
+# 页面文件
+MAIN_PAGE = '温馨提醒生成器.py'
+EDITOR_PAGE = os.path.join('pages', '数据编辑.py')
+HISTORY_PAGE = os.path.join('pages', '历史记录.py')
+
+# 单次页面运行的超时时间（秒）
+RUN_TIMEOUT = 120
+# 天气替身服务每次响应前的延迟（秒），模拟真实接口的网络耗时
+STUB_DELAY = 0.05
+# 父进程等待会话结果时检查子进程状态的间隔（秒）
+POLL_INTERVAL = 1.0
+
+
+class _WeatherStubHandler(BaseHTTPRequestHandler):
+    """天气接口替身：返回从今天起15天的固定预报"""
+
+    requests_served = 0
+    lock = threading.Lock()
+
+    def do_GET(self):
+        with self.lock:
+            type(self).requests_served += 1
+        time.sleep(STUB_DELAY)
+        today = datetime.now().date()
+        payload = {
+            "status": 200,
+            "data": {"forecast": [
+                {"ymd": (today + timedelta(days=i)).isoformat(), "type": "多云",
+                 "high": "高温 28℃", "low": "低温 19℃"}
+                for i in range(15)
+            ]},
+        }
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class _ProblemCounter(logging.Handler):
+    """统计应用日志中的警告和错误（锁超时、写入失败等）"""
+
+    def __init__(self):
+        super().__init__(logging.WARNING)
+        self.counts: Dict[str, int] = defaultdict(int)
+        self.samples: List[str] = []
+        self._lock_samples = threading.Lock()
+
+    def emit(self, record):
+        if not record.name.startswith("utils"):
+            return
+        message = record.getMessage()
+        with self._lock_samples:
+            self.counts[f"{record.levelname.lower()}:{record.name}"] += 1
+            if len(self.samples) < 20:
+                self.samples.append(f"{record.levelname} {record.name}: {message}")
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """
+    最近秩法计算百分位数
+
+    Args:
+        values (List[float]): 样本
+        pct (float): 百分位（0-100）
+
+    Returns:
+        float: 百分位数，没有样本时为0
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, min(len(ordered), int(-(-pct * len(ordered) // 100))))
+    return ordered[rank - 1]
+
+
+def prepare_work_dir() -> str:
+    """
+    把仓库复制到临时目录，清空历史记录、天气缓存和历史天气库
+
+    Returns:
+        str: 临时目录
+    """
+    work_dir = os.path.join(tempfile.mkdtemp(prefix="lezhiban_load_"), "repo")
+    shutil.copytree(REPO_ROOT, work_dir, ignore=COPY_IGNORE)
+    for name in ("history_records.json", "history_stats.json", "weather_cache.json",
+                 "weather_history.db", "weather_history.db-wal", "weather_history.db-shm"):
+        path = os.path.join(work_dir, "data", name)
+        if os.path.exists(path):
+            os.remove(path)
+    return work_dir
+
+
+class Session:
+    """
+    一名模拟老师：在各页面各有一个AppTest实例，跨轮次保留会话状态
+
+    每轮依次：打开主页面 → 生成提醒 → 生成手机网页 → 打开历史记录 → 打开数据编辑 → 保存
+    """
+
+    def __init__(self, index: int, work_dir: str, target_date: date):
+        from streamlit.testing.v1 import AppTest
+
+        self.index = index
+        self.target_date = target_date
+        self.main = AppTest.from_file(os.path.join(work_dir, MAIN_PAGE), default_timeout=RUN_TIMEOUT)
+        self.history = AppTest.from_file(os.path.join(work_dir, HISTORY_PAGE), default_timeout=RUN_TIMEOUT)
+        self.editor = AppTest.from_file(os.path.join(work_dir, EDITOR_PAGE), default_timeout=RUN_TIMEOUT)
+        self.timings: Dict[str, List[float]] = defaultdict(list)
+        self.exceptions: List[str] = []
+        self.page_errors: List[str] = []
+        self.history_saves = 0
+
+    def _step(self, name: str, app, action=None) -> bool:
+        """执行一次页面运行并记录耗时、异常和页面上的错误提示，运行出错时返回False"""
+        start = time.perf_counter()
+        try:
+            if action is None:
+                app.run()
+            else:
+                action()
+        except Exception as e:
+            self.exceptions.append(f"{name}: {type(e).__name__}: {e}")
+            return False
+        finally:
+            self.timings[name].append((time.perf_counter() - start) * 1000)
+        self.exceptions.extend(f"{name}: {item.value}" for item in app.exception)
+        self.page_errors.extend(f"{name}: {item.value}" for item in app.error)
+        return not app.exception
+
+    def _button(self, app, label: str):
+        return next(button for button in app.button if button.label == label)
+
+    def run_round(self) -> None:
+        """执行一轮操作"""
+        main = self.main
+        self._step("main_load", main)
+        if main.exception:
+            return
+        main.date_input(key="selected_date").set_value(self.target_date)
+        self._step("main_date", main, lambda: main.run())
+        # 每次成功生成提醒或网页都保存一条历史记录
+        if self._step("main_generate", main, lambda: main.button(key="generate_btn").click().run()):
+            self.history_saves += 1
+        if self._step("main_mobile_page", main, lambda: main.button(key="generate_mobile_btn").click().run()):
+            self.history_saves += 1
+
+        self._step("history_load", self.history)
+
+        editor = self.editor
+        self._step("editor_load", editor)
+        if editor.exception:
+            return
+        # 让快照与当前数据相差一处，保存时写入课程安排文件（模拟老师修改后保存）
+        snapshot = copy.deepcopy(editor.session_state["schedule_snapshot"])
+        duty = snapshot.setdefault("值日安排", {})
+        duty["星期一"] = (duty.get("星期一") or "") + "（负载测试）"
+        editor.session_state["schedule_snapshot"] = snapshot
+        self._step("editor_save", editor, lambda: self._button(editor, "保存所有更改").click().run())
+
+
+def _empty_report(index: int, exceptions: List[str]) -> Dict[str, Any]:
+    """没有运行结果的会话报告（会话启动失败或进程异常退出）"""
+    return {
+        "index": index,
+        "timings": {},
+        "exceptions": exceptions,
+        "page_errors": [],
+        "history_saves": 0,
+        "log_problems": {},
+        "log_samples": [],
+        "write_queue_flushed": True,
+        "write_behind_errors": 0,
+        "memory_kb": None,
+    }
+
+
+def _session_worker(index: int, rounds: int, work_dir: str, weather_url: str, target_date: date,
+                    trace_memory: bool, barrier, results) -> None:
+    """
+    子进程：运行一个模拟会话，把结果放入results队列
+
+    先预热一轮（模块导入、模板加载等一次性开销不计入耗时和内存增长），所有会话预热完成后同时开始。
+    导入和创建会话出错时同样放入结果并中止等待，父进程不会一直等待这个会话。
+    """
+    report = _empty_report(index, [])
+    session = None
+    problems = None
+    write_queue = None
+    warmup_timings = None
+    try:
+        os.chdir(work_dir)
+        sys.path.insert(0, work_dir)
+        logging.basicConfig(level=logging.ERROR)
+        logging.getLogger("streamlit").setLevel(logging.ERROR)
+
+        from utils import weather_service
+        from utils.write_behind import WRITE_QUEUE as write_queue
+
+        weather_service.WEATHER_API_URL = weather_url
+        problems = _ProblemCounter()
+        logging.getLogger().addHandler(problems)
+
+        session = Session(index, work_dir, target_date)
+        session.run_round()
+        warmup_timings, session.timings = session.timings, defaultdict(list)
+        if trace_memory:
+            gc.collect()
+            tracemalloc.start()
+            memory_baseline = tracemalloc.get_traced_memory()[0]
+        barrier.wait()
+        for _ in range(rounds):
+            session.run_round()
+    except Exception as e:
+        report["exceptions"].append(f"session: {type(e).__name__}: {e}")
+        # 启动或预热失败时让其他会话和父进程不再等待
+        barrier.abort()
+    finally:
+        try:
+            # 等待后台队列写完，父进程随后检查历史记录
+            if write_queue is not None:
+                report["write_queue_flushed"] = write_queue.flush(timeout=60)
+                from utils.metrics import snapshot
+                report["write_behind_errors"] = snapshot()["counters"].get("write_behind_errors", 0)
+            if trace_memory and tracemalloc.is_tracing():
+                gc.collect()
+                report["memory_kb"] = round((tracemalloc.get_traced_memory()[0] - memory_baseline) / 1e3, 1)
+                tracemalloc.stop()
+            if session is not None:
+                report["exceptions"] = session.exceptions + report["exceptions"]
+                report.update({
+                    "timings": dict(session.timings) if warmup_timings is not None else {},
+                    "page_errors": session.page_errors,
+                    "history_saves": session.history_saves,
+                })
+            if problems is not None:
+                report.update({"log_problems": dict(problems.counts), "log_samples": problems.samples})
+        except Exception as e:
+            report["exceptions"].append(f"report: {type(e).__name__}: {e}")
+        results.put(report)
+
+
+def _collect_reports(processes: List[Any], results, timeout: float) -> List[Dict[str, Any]]:
+    """
+    收集各会话的结果；子进程没有放入结果就退出、或超时仍未结束时，记为异常而不是一直等待
+
+    Args:
+        processes (List[Any]): 会话子进程
+        results: 结果队列
+        timeout (float): 最长等待时间（秒）
+
+    Returns:
+        List[Dict[str, Any]]: 每个会话一份报告
+    """
+    reports: Dict[int, Dict[str, Any]] = {}
+    deadline = time.monotonic() + timeout
+    while len(reports) < len(processes):
+        # 先记下已退出的进程：它们的结果在退出前已写入队列，等待一个间隔后仍没有就不会再来
+        exited = [index for index, process in enumerate(processes)
+                  if process.exitcode is not None and index not in reports]
+        try:
+            report = results.get(timeout=POLL_INTERVAL)
+            reports[report["index"]] = report
+            continue
+        except queue.Empty:
+            pass
+        for index in exited:
+            if index not in reports:
+                reports[index] = _empty_report(
+                    index, [f"session: 子进程异常退出（退出码 {processes[index].exitcode}），没有返回结果"])
+        if time.monotonic() >= deadline:
+            for index, process in enumerate(processes):
+                if index not in reports:
+                    process.terminate()
+                    reports[index] = _empty_report(index, [f"session: 超过 {timeout:.0f} 秒仍未结束，已终止"])
+    return [reports[index] for index in range(len(processes))]
+
+
+def run_load_test(sessions: int, rounds: int, work_dir: str, trace_memory: bool = True) -> Dict[str, Any]:
+    """
+    运行负载测试
+
+    AppTest运行页面时会替换进程内全局的Streamlit运行时，同一进程中的多个AppTest不能同时运行，
+    因此每个会话在独立的子进程中运行。各会话之间的文件存储冲突（文件锁、原子写入、后台写入队列）
+    与多个进程同时写入相同，比单个服务进程内更严格；进程内缓存不在会话之间共享。
+
+    Args:
+        sessions (int): 并发会话数
+        rounds (int): 每个会话的轮数
+        work_dir (str): 仓库副本目录
+        trace_memory (bool): 是否用tracemalloc统计内存增长
+
+    Returns:
+        Dict[str, Any]: 测试报告
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _WeatherStubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    weather_url = f"http://127.0.0.1:{server.server_port}/api/weather/city/{{city}}"
+
+    context = multiprocessing.get_context("spawn")
+    barrier = context.Barrier(sessions + 1)
+    results = context.Queue()
+    tomorrow = datetime.now().date() + timedelta(days=1)
+    # 会话分散在未来一周的日期上，既有天气缓存命中也有未命中，同一日期的网页也会被多个会话写入
+    processes = [
+        context.Process(target=_session_worker, name=f"session-{index}",
+                        args=(index, rounds, work_dir, weather_url, tomorrow + timedelta(days=index % 7),
+                              trace_memory, barrier, results))
+        for index in range(sessions)
+    ]
+    for process in processes:
+        process.start()
+    # 所有会话预热完成后同时开始计时
+    try:
+        barrier.wait(timeout=RUN_TIMEOUT * 6)
+    except threading.BrokenBarrierError:
+        pass
+    start = time.perf_counter()
+    reports = _collect_reports(processes, results, RUN_TIMEOUT * 6 * (rounds + 1))
+    elapsed = time.perf_counter() - start
+    for process in processes:
+        process.join()
+    server.shutdown()
+
+    # 所有会话的后台写入都已完成，检查历史记录是否丢失
+    sys.path.insert(0, work_dir)
+    from utils.records import decode_history
+    from utils.history_manager import MAX_HISTORY_RECORDS
+    with open(os.path.join(work_dir, "data", "history_records.json"), 'r', encoding='utf-8') as f:
+        saved_records = len(decode_history(json.load(f)))
+    history_saves = sum(report["history_saves"] for report in reports)
+    expected_records = min(history_saves, MAX_HISTORY_RECORDS)
+
+    timings: Dict[str, List[float]] = defaultdict(list)
+    log_problems: Dict[str, int] = defaultdict(int)
+    for report in reports:
+        for name, values in report["timings"].items():
+            timings[name].extend(values)
+        for name, count in report["log_problems"].items():
+            log_problems[name] += count
+    operations = {
+        name: {
+            "count": len(values),
+            "p50_ms": round(percentile(values, 50), 1),
+            "p99_ms": round(percentile(values, 99), 1),
+            "max_ms": round(max(values), 1),
+        }
+        for name, values in timings.items()
+    }
+    exceptions = [item for report in reports for item in report["exceptions"]]
+    page_errors = [item for report in reports for item in report["page_errors"]]
+    log_samples = [item for report in reports for item in report["log_samples"]]
+
+    memory = None
+    if trace_memory:
+        growth = [report["memory_kb"] for report in reports if report["memory_kb"] is not None]
+        memory = {
+            "per_session_kb_mean": round(sum(growth) / len(growth), 1) if growth else None,
+            "per_session_kb_max": max(growth) if growth else None,
+        }
+
+    return {
+        "sessions": sessions,
+        "rounds": rounds,
+        "elapsed_s": round(elapsed, 2),
+        "operations": operations,
+        "contention": {
+            "exceptions": len(exceptions),
+            "page_errors": len(page_errors),
+            "log_problems": dict(log_problems),
+            "history_saves": history_saves,
+            "history_records_expected": expected_records,
+            "history_records_found": saved_records,
+            "history_records_lost": max(0, expected_records - saved_records),
+            "write_queues_flushed": all(report["write_queue_flushed"] for report in reports),
+            "write_behind_errors": sum(report["write_behind_errors"] for report in reports),
+            "samples": (exceptions + page_errors + log_samples)[:20],
+        },
+        "weather_stub_requests": _WeatherStubHandler.requests_served,
+        "memory": memory,
+    }
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    """打印测试报告摘要"""
+    print(f'\n{report["sessions"]} 个会话 × {report["rounds"]} 轮，用时 {report["elapsed_s"]} 秒')
+    print(f'{"操作":<18} {"次数":>6} {"p50(ms)":>10} {"p99(ms)":>10} {"最长(ms)":>10}')
+    for name, stats in report["operations"].items():
+        print(f'{name:<20} {stats["count"]:>6} {stats["p50_ms"]:>10.1f} {stats["p99_ms"]:>10.1f} '
+              f'{stats["max_ms"]:>10.1f}')
+
+    contention = report["contention"]
+    print(f'\n异常 {contention["exceptions"]} 个，页面错误提示 {contention["page_errors"]} 个，'
+          f'后台写入失败 {contention["write_behind_errors"]} 次')
+    print(f'历史记录：保存 {contention["history_saves"]} 次，应保留 {contention["history_records_expected"]} 条，'
+          f'实际 {contention["history_records_found"]} 条，丢失 {contention["history_records_lost"]} 条')
+    for name, count in contention["log_problems"].items():
+        print(f"  日志 {name}: {count}")
+    for sample in contention["samples"]:
+        print(f"  {sample}")
+    print(f'天气替身服务收到 {report["weather_stub_requests"]} 次请求')
+    if report["memory"]:
+        memory = report["memory"]
+        print(f'每个会话的内存增长：平均 {memory["per_session_kb_mean"]} KB，最多 {memory["per_session_kb_max"]} KB')
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="多会话并发负载测试")
+    parser.add_argument("--sessions", type=int, default=8, help="并发会话数")
+    parser.add_argument("--rounds", type=int, default=3, help="每个会话的轮数")
+    parser.add_argument("--no-memory", action="store_true", help="不统计内存增长")
+    parser.add_argument("--keep", action="store_true", help="保留临时目录，便于检查写入的文件")
+    parser.add_argument("--output", help="结果文件路径，默认保存到 benchmarks/results/")
+    args = parser.parse_args(argv)
+    if args.sessions < 1 or args.rounds < 1:
+        parser.error("会话数和轮数至少为1")
+
+    # 页面中的相对路径（课程安排、数据、模板）都指向仓库副本
+    work_dir = prepare_work_dir()
+    try:
+        report = run_load_test(args.sessions, args.rounds, work_dir, trace_memory=not args.no_memory)
+    finally:
+        if args.keep:
+            print(f"临时目录: {work_dir}")
+        else:
+            shutil.rmtree(os.path.dirname(work_dir), ignore_errors=True)
+
+    print_report(report)
+
+    commit = _git_commit()
+    report.update({
+        "commit": commit,
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+    })
+    output = args.output or os.path.join(
+        RESULTS_DIR, f'load_{datetime.now().strftime("%Y%m%d_%H%M%S")}_{commit}.json')
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"\n结果已保存: {output}")
+
+    contention = report["contention"]
+    return 1 if contention["exceptions"] or contention["history_records_lost"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
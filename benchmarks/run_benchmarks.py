@@ -0,0 +1,305 @@
+"""
+温馨提醒生成流程的性能基准
+
+按当前数据规模的1倍、10倍、100倍测量提醒生成、解析、网页生成、
+历史记录读写（100 / 1万 / 10万条）和天气缓存命中/未命中的耗时，
+结果保存为JSON（benchmarks/results/<时间>_<提交>.json），便于跨提交比较。
+
+示例:
+    python benchmarks/run_benchmarks.py
+    python benchmarks/run_benchmarks.py --quick
+    python benchmarks/run_benchmarks.py --only history --compare benchmarks/results/上一次.json
+"""
+import argparse
+import copy
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
+from unittest import mock
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(REPO_ROOT, 'benchmarks', 'results')
+
+# 模板等资源使用相对路径，基准需要在仓库根目录下运行
+os.chdir(REPO_ROOT)
+sys.path.insert(0, REPO_ROOT)
+
+from utils import history_manager, weather_service, weather_store  # noqa: E402
+from utils.data_manager import load_schedule_data  # noqa: E402
+from utils.mobile_page_generator import (  # noqa: E402
+    generate_mobile_html, generate_mobile_page, parse_reminder_content
+)
+from utils.reminder_generator import generate_reminder_content  # noqa: E402
+from utils.records import WeatherEntry, encode_history, encode_weather_cache  # noqa: E402
+from utils.storage import write_json  # noqa: E402
+from utils.term_calendar import WEEKDAY_NAMES  # noqa: E402
+
+# 数据规模倍数
+SCALES = (1, 10, 100)
+# 历史记录条数
+HISTORY_SIZES = (100, 10_000, 100_000)
+# 基准目标日期（星期二，课程、社团、值日都有数据）
+TARGET_DATE = date(2025, 9, 2)
+CITY = "101240301"
+
+
+def measure(func: Callable[[], Any], repeat: int, setup: Optional[Callable[[], Any]] = None) -> Dict[str, float]:
+    """
+    重复执行并统计耗时（setup的耗时不计入）
+
+    Args:
+        func (Callable[[], Any]): 被测函数
+        repeat (int): 重复次数
+        setup (Optional[Callable[[], Any]]): 每次执行前的准备函数
+
+    Returns:
+        Dict[str, float]: 耗时统计（毫秒）
+    """
+    timings = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return {
+        "repeat": repeat,
+        "min_ms": round(min(timings), 4),
+        "median_ms": round(statistics.median(timings), 4),
+        "mean_ms": round(statistics.fmean(timings), 4),
+    }
+
+
+def scale_schedule(schedule_data: Dict[str, Any], factor: int) -> Dict[str, Any]:
+    """
+    按倍数放大课程安排数据（课程、社团、值日生）
+
+    Args:
+        schedule_data (Dict[str, Any]): 原始课程安排数据
+        factor (int): 放大倍数
+
+    Returns:
+        Dict[str, Any]: 放大后的数据
+    """
+    data = copy.deepcopy(schedule_data)
+    for day in data.get("课程安排", {}).values():
+        for period in ("上午", "下午"):
+            day[period] = [f"{course}{i or ''}" for i in range(factor) for course in day.get(period, [])]
+    for weekday, clubs in data.get("社团安排", {}).items():
+        data["社团安排"][weekday] = [
+            {"社团名称": f'{club["社团名称"]}{i or ""}', "成员": club["成员"]}
+            for i in range(factor) for club in clubs
+        ]
+    for weekday, duty in data.get("值日安排", {}).items():
+        data["值日安排"][weekday] = "、".join([duty] * factor)
+    return data
+
+
+def build_notes(factor: int) -> str:
+    """按倍数生成特别注意事项"""
+    return "\n".join(f"第{i + 1}条：请带好《语文》课本" for i in range(factor))
+
+
+def bench_generation(schedule_data: Dict[str, Any], repeat: int, output_dir: str) -> List[Dict[str, Any]]:
+    """提醒生成、解析和网页生成"""
+    results = []
+    weekday = WEEKDAY_NAMES[TARGET_DATE.weekday()]
+    for factor in SCALES:
+        data = scale_schedule(schedule_data, factor)
+        notes = build_notes(factor)
+        text = generate_reminder_content(TARGET_DATE, weekday, "晴，低温 20℃~高温 28℃", data, notes)
+        info = parse_reminder_content(text)
+        cases = {
+            "generate_reminder_content": lambda: generate_reminder_content(
+                TARGET_DATE, weekday, "晴，低温 20℃~高温 28℃", data, notes),
+            "parse_reminder_content": lambda: parse_reminder_content(text),
+            "generate_mobile_html": lambda: generate_mobile_html(info),
+            "generate_mobile_page": lambda: generate_mobile_page(text, TARGET_DATE, output_dir),
+        }
+        for name, func in cases.items():
+            results.append({"name": name, "scale": factor, "size": len(text), **measure(func, repeat)})
+    return results
+
+
+def _history_record(index: int, reminder_text: str) -> Dict[str, Any]:
+    return {
+        "date": "2025年09月02日",
+        "weekday": "星期二",
+        "weather": "晴，低温 20℃~高温 28℃",
+        "special_notes": "",
+        "reminder_content": reminder_text,
+        "timestamp": (datetime(2025, 1, 1) + timedelta(minutes=index)).isoformat(),
+    }
+
+
+def bench_history(schedule_data: Dict[str, Any], repeat: int, work_dir: str,
+                  sizes=HISTORY_SIZES) -> List[Dict[str, Any]]:
+    """
+    历史记录保存和加载
+
+    保存时文件只保留最近MAX_HISTORY_RECORDS条，正常使用时文件不会更大：
+    不超过该条数的规模测量稳定状态（load_history_records / save_history_record）；
+    更大的规模是旧版本留下的未裁剪文件，测量首次读取（load_history_legacy，读N条）
+    和首次保存（save_history_legacy_trim，读N条、写MAX_HISTORY_RECORDS条）。
+    """
+    results = []
+    weekday = WEEKDAY_NAMES[TARGET_DATE.weekday()]
+    text = generate_reminder_content(TARGET_DATE, weekday, "晴", schedule_data)
+    history_file = os.path.join(work_dir, "history_records.json")
+    seed_file = os.path.join(work_dir, "history_seed.json")
+
+    for size in sizes:
+        write_json(seed_file, encode_history(_history_record(i, text) for i in range(size)))
+
+        def reseed():
+            shutil.copyfile(seed_file, history_file)
+
+        reseed()
+        legacy = size > history_manager.MAX_HISTORY_RECORDS
+        results.append({"name": "load_history_legacy" if legacy else "load_history_records", "scale": 1,
+                        "size": size, **measure(lambda: history_manager.load_history_records(history_file), repeat)})
+        results.append({"name": "save_history_legacy_trim" if legacy else "save_history_record", "scale": 1,
+                        "size": size,
+                        **measure(lambda: history_manager.save_history_record(
+                            _history_record(size, text), history_file), repeat, setup=reseed)})
+    return results
+
+
+class _FakeWeatherResponse:
+    """天气接口的固定响应，未命中路径只测量解析和写缓存，不受网络影响"""
+
+    status_code = 200
+
+    def __init__(self, today: date):
+        self._payload = {
+            "status": 200,
+            "data": {"forecast": [
+                {"ymd": (today + timedelta(days=i)).isoformat(), "type": "晴",
+                 "high": "高温 28℃", "low": "低温 20℃"}
+                for i in range(15)
+            ]},
+        }
+
+    def json(self):
+        return self._payload
+
+
+def bench_weather(repeat: int, work_dir: str) -> List[Dict[str, Any]]:
+    """天气缓存命中和未命中"""
+    results = []
+    today = datetime.now().date()
+    target = today + timedelta(days=1)
+    cache_file = os.path.join(work_dir, "weather_cache.json")
+    original_cache_file = weather_service.WEATHER_CACHE_FILE
+    original_store_file = weather_store.WEATHER_STORE_FILE
+    weather_service.WEATHER_CACHE_FILE = cache_file
+    weather_store.WEATHER_STORE_FILE = os.path.join(work_dir, "weather_history.db")
+    try:
+        for factor in SCALES:
+            # 缓存中已有其他城市的条目，模拟缓存文件随部署规模增长
+            entries = {
+                f"{100000000 + i}_{target}": WeatherEntry("晴", datetime.now())
+                for i in range(factor * 10)
+            }
+
+            def reset_cache():
+                write_json(cache_file, encode_weather_cache(entries))
+
+            def fill_cache():
+                reset_cache()
+                weather_service.cache_weather(CITY, target, "晴，低温 20℃~高温 28℃")
+
+            fill_cache()
+            results.append({"name": "weather_cache_hit", "scale": factor, "size": len(entries) + 1,
+                            **measure(lambda: weather_service.fetch_weather_info(CITY, target), repeat)})
+            with mock.patch("requests.get", return_value=_FakeWeatherResponse(today)):
+                results.append({"name": "weather_cache_miss", "scale": factor, "size": len(entries),
+                                **measure(lambda: weather_service.fetch_weather_info(CITY, target),
+                                          repeat, setup=reset_cache)})
+    finally:
+        weather_service.WEATHER_CACHE_FILE = original_cache_file
+        weather_store.WEATHER_STORE_FILE = original_store_file
+    return results
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(results: List[Dict[str, Any]], baseline_path: str) -> None:
+    """与之前的结果比较，打印中位数耗时的变化"""
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = {(r["name"], r["scale"], r["size"]): r for r in json.load(f)["results"]}
+    print(f"\n与 {baseline_path} 比较（中位数）：")
+    for result in results:
+        old = baseline.get((result["name"], result["scale"], result["size"]))
+        if old and old["median_ms"]:
+            ratio = result["median_ms"] / old["median_ms"]
+            flag = "  <-- 变慢" if ratio > 1.2 else ""
+            print(f'{result["name"]:<28} x{result["scale"]:<4} {result["size"]:>8}  '
+                  f'{old["median_ms"]:>10.3f} -> {result["median_ms"]:>10.3f} ms  ({ratio:.2f}x){flag}')
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="温馨提醒生成流程性能基准")
+    parser.add_argument("--quick", action="store_true", help="减少重复次数，历史记录最多1万条")
+    parser.add_argument("--only", choices=["generation", "history", "weather"], action="append",
+                        help="只运行指定的基准，可重复指定")
+    parser.add_argument("--output", help="结果文件路径，默认保存到 benchmarks/results/")
+    parser.add_argument("--compare", help="与之前的结果文件比较")
+    args = parser.parse_args(argv)
+
+    repeat = 5 if args.quick else 20
+    groups = args.only or ["generation", "history", "weather"]
+    schedule_data = load_schedule_data()
+    results: List[Dict[str, Any]] = []
+
+    work_dir = tempfile.mkdtemp(prefix="lezhiban_bench_")
+    try:
+        if "generation" in groups:
+            results += bench_generation(schedule_data, repeat, os.path.join(work_dir, "output"))
+        if "history" in groups:
+            sizes = HISTORY_SIZES[:2] if args.quick else HISTORY_SIZES
+            results += bench_history(schedule_data, min(repeat, 5), work_dir, sizes)
+        if "weather" in groups:
+            results += bench_weather(repeat, work_dir)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    for result in results:
+        print(f'{result["name"]:<28} x{result["scale"]:<4} {result["size"]:>8}  '
+              f'median {result["median_ms"]:>10.3f} ms  min {result["min_ms"]:>10.3f} ms')
+
+    commit = _git_commit()
+    report = {
+        "commit": commit,
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "quick": args.quick,
+        "results": results,
+    }
+    output = args.output or os.path.join(
+        RESULTS_DIR, f'{datetime.now().strftime("%Y%m%d_%H%M%S")}_{commit}.json')
+    write_json(output, report)
+    print(f"\n结果已保存: {output}")
+
+    if args.compare:
+        compare(results, args.compare)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
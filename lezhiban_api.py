@@ -0,0 +1,265 @@
+"""
+乐知班温馨提醒HTTP接口
+
+独立于Streamlit的轻量HTTP服务，供学校其他系统拉取温馨提醒。
+请求由固定大小的线程池处理，同一份提醒只生成一次并缓存。
+
+接口:
+    GET  /health                       健康检查
+    GET  /api/classes                  已注册班级
+    GET  /metrics                      各阶段耗时和缓存命中统计（Prometheus文本格式）
+    GET  /api/reminder                 生成提醒
+    POST /api/reminder                 生成提醒（参数放在JSON请求体中）
+
+/api/reminder 参数:
+    date     目标日期 YYYY-MM-DD，默认明天
+    class    班级ID，默认 lezhiban
+    notes    特别注意事项
+    weather  指定天气信息，为空时查询天气服务
+    format   text / json / html / markdown / wechat / sms / png，默认 json
+             png 为服务器端绘制的图片，按内容缓存在班级输出目录中
+
+示例:
+    python lezhiban_api.py --port 8600 --workers 16
+    curl "http://localhost:8600/api/reminder?date=2025-09-01&format=text"
+    curl -o reminder.png "http://localhost:8600/api/reminder?date=2025-09-01&format=png"
+"""
+import argparse
+import hashlib
+import json
+import logging
+import socket
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from typing import Dict, Any, List, Optional, Union
+from urllib.parse import urlsplit, parse_qs
+
+from utils.class_manager import DEFAULT_CLASS_ID, list_classes, get_class_context
+from utils.errors import LezhibanError, ImageRenderError
+from utils.metrics import render_prometheus
+from utils.reminder_service import (
+    RESPONSE_FORMATS, IMAGE_FORMATS, build_reminder, render_reminder, render_reminder_image
+)
+from utils.term_calendar import parse_date
+
+logger = logging.getLogger("lezhiban_api")
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8600
+DEFAULT_WORKERS = 8
+# 单个连接的读写超时（秒），避免慢客户端长期占用工作线程
+REQUEST_TIMEOUT = 10
+# POST请求体大小上限（字节）
+MAX_BODY_SIZE = 64 * 1024
+
+
+class ApiError(Exception):
+    """返回给客户端的请求错误"""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+def _parse_reminder_params(params: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    校验 /api/reminder 的请求参数
+
+    Args:
+        params (Dict[str, Any]): 查询参数或JSON请求体
+
+    Returns:
+        Dict[str, Any]: 规范化后的参数
+    """
+    class_id = params.get("class") or DEFAULT_CLASS_ID
+    if class_id not in list_classes():
+        raise ApiError(404, f"未注册的班级：{class_id}")
+
+    if params.get("date"):
+        try:
+            target_date = parse_date(params["date"])
+        except ValueError:
+            raise ApiError(400, f"日期格式应为YYYY-MM-DD：{params['date']}")
+    else:
+        target_date = date.today() + timedelta(days=1)
+
+    fmt = params.get("format") or "json"
+    if fmt not in RESPONSE_FORMATS and fmt not in IMAGE_FORMATS:
+        raise ApiError(400, f"不支持的输出格式：{fmt}，可选：{'、'.join([*RESPONSE_FORMATS, *IMAGE_FORMATS])}")
+
+    return {
+        "class_id": class_id,
+        "target_date": target_date,
+        "special_notes": str(params.get("notes") or ""),
+        "weather": str(params["weather"]) if params.get("weather") else None,
+        "fmt": fmt,
+    }
+
+
+class ReminderRequestHandler(BaseHTTPRequestHandler):
+    """温馨提醒接口的请求处理"""
+
+    server_version = "LezhibanAPI/1.0"
+    # 使用默认的HTTP/1.0：每个请求处理完即关闭连接，空闲的长连接不会占用工作线程
+    timeout = REQUEST_TIMEOUT
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        self._dispatch(url.path, params)
+
+    do_HEAD = do_GET
+
+    def do_POST(self):
+        url = urlsplit(self.path)
+        try:
+            params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+            params.update(self._read_json_body())
+        except ApiError as e:
+            self._send_json(e.status, {"error": str(e)})
+            return
+        self._dispatch(url.path, params)
+
+    def _read_json_body(self) -> Dict[str, Any]:
+        """读取JSON请求体"""
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+        except ValueError:
+            raise ApiError(400, "Content-Length无效")
+        if length < 0:
+            raise ApiError(400, "Content-Length无效")
+        if length > MAX_BODY_SIZE:
+            raise ApiError(413, "请求体过大")
+        if not length:
+            return {}
+        try:
+            body = json.loads(self.rfile.read(length).decode("utf-8"))
+        except (UnicodeDecodeError, json.JSONDecodeError):
+            raise ApiError(400, "请求体不是有效的JSON")
+        if not isinstance(body, dict):
+            raise ApiError(400, "请求体应为JSON对象")
+        return body
+
+    def _dispatch(self, path: str, params: Dict[str, Any]) -> None:
+        """按路径分发请求，统一处理错误"""
+        try:
+            if path == "/health":
+                self._send_json(200, {"status": "ok"})
+            elif path == "/metrics":
+                self._send(200, "text/plain; version=0.0.4; charset=utf-8", render_prometheus())
+            elif path == "/api/classes":
+                classes = [get_class_context(class_id) for class_id in list_classes()]
+                self._send_json(200, [{"id": context.class_id, "name": context.name} for context in classes])
+            elif path == "/api/reminder":
+                self._handle_reminder(params)
+            else:
+                raise ApiError(404, f"未知接口：{path}")
+        except ApiError as e:
+            self._send_json(e.status, {"error": str(e)})
+        except ImageRenderError as e:
+            # 服务器未安装Pillow或缺少字体，属于部署问题而不是请求错误
+            logger.error("生成提醒图片失败: %s", e)
+            self._send_json(503, {"error": str(e)})
+        except LezhibanError as e:
+            logger.error("生成提醒失败: %s", e)
+            self._send_json(500, {"error": str(e)})
+        except Exception:
+            logger.exception("处理请求 %s 时发生未知错误", self.path)
+            self._send_json(500, {"error": "服务器内部错误"})
+
+    def _handle_reminder(self, params: Dict[str, Any]) -> None:
+        """生成提醒并按指定格式返回"""
+        options = _parse_reminder_params(params)
+        entry = build_reminder(
+            options["class_id"], options["target_date"], options["special_notes"], options["weather"]
+        )
+        if options["fmt"] in IMAGE_FORMATS:
+            content, digest = render_reminder_image(entry)
+            self._send(200, IMAGE_FORMATS[options["fmt"]], content, {"ETag": f'"{digest}"'})
+            return
+        body = render_reminder(entry, options["fmt"])
+        # 按响应内容计算，日期、天气、特别注意事项或格式不同的响应不会共用同一个ETag
+        digest = hashlib.sha1(body.encode("utf-8")).hexdigest()[:16]
+        self._send(200, RESPONSE_FORMATS[options["fmt"]], body, {"ETag": f'"{digest}"'})
+
+    def _send_json(self, status: int, payload: Any) -> None:
+        self._send(status, RESPONSE_FORMATS["json"], json.dumps(payload, ensure_ascii=False))
+
+    def _send(self, status: int, content_type: str, body: Union[str, bytes],
+              headers: Optional[Dict[str, str]] = None) -> None:
+        data = body if isinstance(body, bytes) else body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        logger.info("%s - %s", self.address_string(), format % args)
+
+
+class PooledHTTPServer(HTTPServer):
+    """
+    使用固定大小线程池处理连接的HTTP服务器
+
+    标准库的ThreadingHTTPServer为每个连接新建线程，并发客户端多时线程数不受控制；
+    这里由线程池处理连接，超出的连接在队列中等待。
+    """
+
+    def __init__(self, server_address, handler_class, workers: int = DEFAULT_WORKERS):
+        super().__init__(server_address, handler_class)
+        self._executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="api")
+
+    def process_request(self, request, client_address):
+        self._executor.submit(self._process_request_in_pool, request, client_address)
+
+    def _process_request_in_pool(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except (socket.timeout, ConnectionError):
+            pass
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        self._executor.shutdown(wait=True)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    HTTP服务入口
+
+    Args:
+        argv (Optional[List[str]]): 命令行参数，默认读取sys.argv
+
+    Returns:
+        int: 退出码
+    """
+    parser = argparse.ArgumentParser(description="温馨提醒HTTP接口")
+    parser.add_argument("--host", default=DEFAULT_HOST, help="监听地址")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="监听端口")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="处理请求的线程数")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    server = PooledHTTPServer((args.host, args.port), ReminderRequestHandler, args.workers)
+    logger.info("温馨提醒接口已启动: http://%s:%d（%d个工作线程）", args.host, args.port, args.workers)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
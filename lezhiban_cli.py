@@ -0,0 +1,373 @@
+"""
+乐知班温馨提醒命令行工具
+
+不启动Streamlit，直接生成指定日期的温馨提醒（文本、手机网页和历史记录），
+适合在cron等定时任务中使用。
+
+示例:
+    python lezhiban_cli.py                                # 为默认班级生成明天的提醒
+    python lezhiban_cli.py --date 2025-09-01
+    python lezhiban_cli.py --start 2025-09-01 --end 2025-09-05 --class all --workers 8
+    python lezhiban_cli.py --precompute --class all       # 每晚预生成未来7天的提醒
+    python lezhiban_cli.py --no-generate --archive --build-site --class all   # 归档旧网页并更新静态网站
+    python lezhiban_cli.py --students --date 2025-09-01     # 为每名学生生成只含本人社团和值日的提醒
+    python lezhiban_cli.py --import 课程表.xlsx --import 社团名单.csv --class all --dry-run   # 批量导入（预览）
+    python lezhiban_cli.py --migrate-records --class all  # 迁移历史记录和天气缓存，并把天气缓存导入历史天气库
+"""
+import argparse
+import logging
+import sys
+from datetime import date, timedelta
+from typing import List, Optional
+
+from utils.batch_generator import DEFAULT_WORKERS, date_range, run_batch, generate_student_reminders
+from utils.class_manager import DEFAULT_CLASS_ID, list_classes, get_class_context, check_class_ids
+from utils.metrics import write_prometheus_file
+from utils.precompute import PRECOMPUTE_DAYS, precompute_reminders
+from utils.site_builder import build_site
+from utils.output_archive import RETENTION_DAYS, archive_old_outputs
+from utils.term_calendar import parse_date
+from utils.data_manager import load_schedule_data
+from utils.errors import ScheduleDataError, UnknownClassError
+from utils.schedule_import import parse_import_file, plan_import, describe_changes, apply_import
+from utils.records import migrate_history_file, migrate_weather_cache
+from utils.weather_service import WEATHER_CACHE_FILE, seed_weather_store
+
+logger = logging.getLogger("lezhiban_cli")
+
+
+def _parse_date_arg(value: str) -> date:
+    """argparse使用的日期解析"""
+    try:
+        return parse_date(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"日期格式应为YYYY-MM-DD：{value}")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """
+    构建命令行参数解析器
+
+    Returns:
+        argparse.ArgumentParser: 参数解析器
+    """
+    parser = argparse.ArgumentParser(description="批量生成班级温馨提醒（文本、手机网页和历史记录）")
+    parser.add_argument("--date", type=_parse_date_arg, help="目标日期 YYYY-MM-DD，默认明天")
+    parser.add_argument("--start", type=_parse_date_arg, help="日期范围的开始日期")
+    parser.add_argument("--end", type=_parse_date_arg, help="日期范围的结束日期（包含）")
+    parser.add_argument("--days", type=int, help="从开始日期（默认明天）起连续生成的天数")
+    parser.add_argument("--class", dest="class_ids", action="append", metavar="CLASS_ID",
+                        help="班级ID，可重复指定；all 表示所有已注册班级，默认 " + DEFAULT_CLASS_ID)
+    parser.add_argument("--notes", default="", help="特别注意事项（所有班级共用）")
+    parser.add_argument("--weather", help="指定天气信息，不查询天气服务")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="并发数")
+    parser.add_argument("--processes", action="store_true", help="使用多进程（默认多线程）")
+    parser.add_argument("--no-text", action="store_true", help="不写出文本文件")
+    parser.add_argument("--no-html", action="store_true", help="不写出手机网页")
+    parser.add_argument("--no-history", action="store_true", help="不保存历史记录")
+    parser.add_argument("--precompute", action="store_true",
+                        help=f"只预生成不含特别注意事项的提醒和网页骨架（默认未来{PRECOMPUTE_DAYS}天），供页面直接使用")
+    parser.add_argument("--build-site", action="store_true",
+                        help="生成后增量构建静态网站（只重新生成变化的网页，并更新首页、月份页和周页）")
+    parser.add_argument("--archive", action="store_true",
+                        help="把较早日期的网页和文本提醒移入按月压缩的归档（在构建网站之前执行）")
+    parser.add_argument("--keep-days", type=int, default=RETENTION_DAYS,
+                        help=f"归档时保留为普通文件的最近天数，默认{RETENTION_DAYS}")
+    parser.add_argument("--no-generate", action="store_true", help="不生成提醒，只执行归档或网站构建")
+    parser.add_argument("--students", action="store_true",
+                        help="为每名学生生成个人提醒（只含本人的社团和值日），写入输出目录的students子目录")
+    parser.add_argument("--import", dest="import_files", action="append", metavar="FILE",
+                        help="从CSV/Excel导入课程表或社团名单（可重复），导入后退出")
+    parser.add_argument("--encoding", default="utf-8-sig", help="导入CSV文件的编码，如gbk")
+    parser.add_argument("--dry-run", action="store_true", help="导入时只显示将要修改的内容，不保存")
+    parser.add_argument("--migrate-records", action="store_true",
+                        help="把历史记录和天气缓存迁移为紧凑格式，并把天气缓存导入历史天气库（不生成提醒）")
+    parser.add_argument("--metrics-file", help="运行结束后把各阶段耗时写入Prometheus文本文件")
+    parser.add_argument("-v", "--verbose", action="store_true", help="输出调试日志")
+    return parser
+
+
+def resolve_dates(args: argparse.Namespace) -> List[date]:
+    """
+    根据命令行参数确定要生成的日期
+
+    Args:
+        args (argparse.Namespace): 命令行参数
+
+    Returns:
+        List[date]: 日期列表
+    """
+    tomorrow = date.today() + timedelta(days=1)
+    if args.date:
+        return [args.date]
+    start = args.start or tomorrow
+    if args.end:
+        return date_range(start, args.end)
+    if args.days:
+        return date_range(start, start + timedelta(days=args.days - 1))
+    return [start]
+
+
+def resolve_class_ids(values: Optional[List[str]]) -> List[str]:
+    """
+    根据命令行参数确定要生成的班级
+
+    Args:
+        values (Optional[List[str]]): --class 参数值
+
+    Returns:
+        List[str]: 班级ID列表
+
+    Raises:
+        UnknownClassError: 有未注册的班级ID
+    """
+    if not values:
+        return [DEFAULT_CLASS_ID]
+    if "all" in values:
+        return list_classes()
+    check_class_ids(values)
+    return values
+
+
+def run_precompute(class_ids: List[str], dates: List[date], weather: Optional[str] = None) -> int:
+    """
+    为各班级预生成连续日期的提醒
+
+    Args:
+        class_ids (List[str]): 班级ID列表
+        dates (List[date]): 连续的日期列表
+        weather (Optional[str]): 指定天气信息，为空时查询天气服务
+
+    Returns:
+        int: 退出码，有班级失败时为1
+    """
+    options = {"weather_lookup": lambda city, target_date: weather} if weather else {}
+    failed = 0
+    for class_id in class_ids:
+        try:
+            precompute_reminders(get_class_context(class_id), dates[0], len(dates), **options)
+        except Exception:
+            logger.exception("预生成 %s 的提醒失败", class_id)
+            failed += 1
+    return 1 if failed else 0
+
+
+def run_build_site(class_ids: List[str]) -> int:
+    """
+    为各班级增量构建静态网站
+
+    Args:
+        class_ids (List[str]): 班级ID列表
+
+    Returns:
+        int: 退出码，有班级失败时为1
+    """
+    failed = 0
+    for class_id in class_ids:
+        try:
+            stats = build_site(get_class_context(class_id))
+            logger.info("%s 网站已更新：写入 %d 个网页，%d 个未变化，写入 %d 个索引页",
+                        class_id, stats["rebuilt"], stats["unchanged"], stats["indexes_written"])
+        except Exception:
+            logger.exception("构建 %s 的静态网站失败", class_id)
+            failed += 1
+    return 1 if failed else 0
+
+
+def run_archive(class_ids: List[str], keep_days: int) -> int:
+    """
+    为各班级归档较早日期的输出文件
+
+    Args:
+        class_ids (List[str]): 班级ID列表
+        keep_days (int): 保留为普通文件的最近天数
+
+    Returns:
+        int: 退出码，有班级失败时为1
+    """
+    failed = 0
+    for class_id in class_ids:
+        try:
+            stats = archive_old_outputs(get_class_context(class_id).output_dir, keep_days)
+            logger.info("%s 已归档 %d 个文件，删除 %d 张过期图片", class_id, stats["archived"], stats["removed_images"])
+        except Exception:
+            logger.exception("归档 %s 的输出文件失败", class_id)
+            failed += 1
+    return 1 if failed else 0
+
+
+def run_migrate(class_ids: List[str]) -> int:
+    """
+    把各班级的历史记录文件和共享的天气缓存迁移为紧凑格式，并把天气缓存导入历史天气库
+
+    Args:
+        class_ids (List[str]): 班级ID列表
+
+    Returns:
+        int: 退出码，有文件迁移失败时为1
+    """
+    failed = 0
+    for class_id in class_ids:
+        history_file = get_class_context(class_id).history_file
+        try:
+            if migrate_history_file(history_file):
+                logger.info("%s 的历史记录已迁移: %s", class_id, history_file)
+            else:
+                logger.info("%s 的历史记录无需迁移", class_id)
+        except Exception:
+            logger.exception("迁移 %s 的历史记录失败", class_id)
+            failed += 1
+    try:
+        if migrate_weather_cache(WEATHER_CACHE_FILE):
+            logger.info("天气缓存已迁移: %s", WEATHER_CACHE_FILE)
+        logger.info("已把 %d 天的天气导入历史天气库", seed_weather_store())
+    except Exception:
+        logger.exception("迁移天气缓存失败")
+        failed += 1
+    return 1 if failed else 0
+
+
+def run_students(class_ids: List[str], dates: List[date], special_notes: str = "",
+                 weather: Optional[str] = None, workers: int = 1,
+                 write_text: bool = True, write_html: bool = True) -> int:
+    """
+    为各班级各日期生成每名学生的个人提醒
+
+    Args:
+        class_ids (List[str]): 班级ID列表
+        dates (List[date]): 日期列表
+        special_notes (str): 特别注意事项
+        weather (Optional[str]): 指定天气信息
+        workers (int): 每个班级渲染时的并发数
+        write_text (bool): 是否写出文本文件
+        write_html (bool): 是否写出手机网页
+
+    Returns:
+        int: 退出码，有任务失败时为1
+    """
+    failed = 0
+    for class_id in class_ids:
+        for target_date in dates:
+            try:
+                results = generate_student_reminders(class_id, target_date, special_notes, weather,
+                                                     write_text=write_text, write_html=write_html,
+                                                     workers=workers)
+                logger.info("%s %s 已生成 %d 名学生的个人提醒", class_id, target_date, len(results))
+            except Exception:
+                logger.exception("生成 %s %s 的个人提醒失败", class_id, target_date)
+                failed += 1
+    return 1 if failed else 0
+
+
+def run_import(class_ids: List[str], files: List[str], encoding: str, dry_run: bool = False) -> int:
+    """
+    把导入文件中各班级的行导入对应班级的课程安排（每个班级一次保存）
+
+    Args:
+        class_ids (List[str]): 班级ID列表
+        files (List[str]): 导入文件路径
+        encoding (str): CSV文件编码
+        dry_run (bool): 只显示将要修改的内容，不保存
+
+    Returns:
+        int: 退出码，有班级失败时为1
+    """
+    failed = 0
+    for class_id in class_ids:
+        context = get_class_context(class_id)
+        try:
+            results = [parse_import_file(path, class_names=[context.class_id, context.name], encoding=encoding)
+                       for path in files]
+            for result in results:
+                for issue in result.issues:
+                    logger.warning("%s %s %s", class_id, result.file_name, issue)
+            current = load_schedule_data(context.schedule_file)
+            merged, changes, problems = plan_import(current, results)
+            for change in describe_changes(current, merged, changes):
+                logger.info("%s %s %s：%s -> %s", class_id, change["数据段"], change["星期"],
+                            change["导入前"], change["导入后"])
+            if problems:
+                for problem in problems:
+                    logger.error("%s %s", class_id, problem)
+                failed += 1
+            elif not dry_run:
+                apply_import(results, context.schedule_file, context.backup_dir)
+                logger.info("%s 已导入 %d 处修改", class_id, len(changes))
+        except ScheduleDataError as e:
+            logger.error("导入 %s 的数据失败: %s", class_id, e)
+            failed += 1
+        except Exception:
+            logger.exception("导入 %s 的数据失败", class_id)
+            failed += 1
+    return 1 if failed else 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    命令行入口
+
+    Args:
+        argv (Optional[List[str]]): 命令行参数，默认读取sys.argv
+
+    Returns:
+        int: 退出码，有任务失败时为1
+    """
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    logging.basicConfig(
+        level=logging.DEBUG if args.verbose else logging.INFO,
+        format="%(asctime)s %(levelname)s %(name)s: %(message)s",
+    )
+
+    if args.precompute and not (args.date or args.end or args.days):
+        args.days = PRECOMPUTE_DAYS
+    dates = resolve_dates(args)
+    if not dates:
+        parser.error("结束日期早于开始日期")
+    try:
+        class_ids = resolve_class_ids(args.class_ids)
+    except UnknownClassError as e:
+        # 未注册的班级不能回到默认班级，否则会覆盖默认班级的输出
+        parser.error(str(e))
+
+    if args.migrate_records:
+        return run_migrate(class_ids)
+    if args.import_files:
+        return run_import(class_ids, args.import_files, args.encoding, args.dry_run)
+    if args.precompute:
+        return run_precompute(class_ids, dates, args.weather)
+    if args.students:
+        return run_students(class_ids, dates, args.notes, args.weather, args.workers,
+                            write_text=not args.no_text, write_html=not args.no_html)
+    results = [] if args.no_generate else run_batch(
+        class_ids, dates,
+        special_notes=args.notes,
+        weather=args.weather,
+        workers=args.workers,
+        use_processes=args.processes,
+        write_text=not args.no_text,
+        write_html=not args.no_html,
+        save_history=not args.no_history,
+    )
+
+    failed = [result for result in results if "error" in result]
+    for result in results:
+        if "error" in result:
+            logger.error("%s %s 失败: %s", result["class_id"], result["date"], result["error"])
+        else:
+            outputs = [path for path in (result["text_path"], result["html_path"]) if path]
+            logger.info("%s %s 完成 %s", result["class_id"], result["date"], " ".join(outputs))
+    if not args.no_generate:
+        logger.info("共 %d 个任务，成功 %d，失败 %d", len(results), len(results) - len(failed), len(failed))
+    exit_code = 1 if failed else 0
+    if args.archive:
+        exit_code = run_archive(class_ids, args.keep_days) or exit_code
+    if args.build_site:
+        exit_code = run_build_site(class_ids) or exit_code
+    if args.metrics_file:
+        logger.info("耗时统计已写入 %s", write_prometheus_file(args.metrics_file))
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
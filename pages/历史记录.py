@@ -1,7 +1,10 @@
 import streamlit as st
 import streamlit.components.v1 as components
-from utils.history_manager import load_history_records, clear_history_records, format_history_record
-from utils.mobile_page_generator import generate_mobile_page
+from utils.history_manager import load_history_records, clear_history_records, delete_history_records, format_history_record
+from utils.history_analytics import load_history_stats, rebuild_history_stats
+from utils.mobile_page_generator import get_or_generate_mobile_page
+from utils.preview_cache import PreviewCache
+from utils.ui_components import get_current_class, render_class_selector, render_debug_sidebar
 import json
 import os
 from datetime import datetime
@@ -13,15 +16,63 @@ st.set_page_config(
     layout="wide"
 )
 
+# 确定当前班级（URL参数 ?class=<班级ID>）
+class_context = get_current_class()
+render_class_selector(class_context)
+
 # 页面标题
-st.title("📚 历史记录")
+st.title(f"📚 {class_context.name}历史记录")
 
 # 从session state获取要删除的记录ID列表
 if "records_to_delete" not in st.session_state:
     st.session_state.records_to_delete = []
 
+# 网页预览缓存（容量有限，最久未查看的预览会被淘汰）和当前显示的预览
+if "preview_cache" not in st.session_state:
+    st.session_state.preview_cache = PreviewCache()
+if "active_preview" not in st.session_state:
+    st.session_state.active_preview = None
+preview_cache = st.session_state.preview_cache
+
 # 加载历史记录
-history_records = load_history_records()
+history_records = load_history_records(class_context.history_file)
+
+# 本学期统计（读取保存记录时增量维护的汇总，不扫描历史记录）
+history_stats = load_history_stats(class_context.history_file)
+if not history_stats["days"] and history_records:
+    # 首次启用统计时根据已有历史记录计算一次
+    history_stats = rebuild_history_stats(history_records, class_context.history_file)
+
+if history_stats["totals"]["days"]:
+    with st.expander("📊 本学期统计", expanded=False):
+        totals = history_stats["totals"]
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("提醒天数", totals["days"])
+        col2.metric("社团活动人次", totals["club_sessions"])
+        col3.metric("有注意事项的天数", totals["notice_days"])
+        col4.metric("注意事项条数", totals["notices"])
+        
+        col1, col2 = st.columns(2)
+        with col1:
+            st.markdown("**社团活动次数**")
+            if history_stats["clubs"]:
+                st.bar_chart(history_stats["clubs"])
+            else:
+                st.caption("暂无社团活动")
+        with col2:
+            st.markdown("**天气分布**")
+            st.bar_chart(history_stats["weather"])
+            temperature = history_stats["temperature"]
+            if temperature["days"]:
+                st.caption(
+                    f"平均低温 {temperature['low_sum'] / temperature['days']:.1f}℃，"
+                    f"平均高温 {temperature['high_sum'] / temperature['days']:.1f}℃"
+                )
+        
+        if history_stats["notice_dates"]:
+            st.markdown("**有特别注意事项的日期**")
+            st.caption("、".join(history_stats["notice_dates"]))
+        st.caption("统计按日期汇总，同一天多次生成以最后一次为准")
 
 if history_records:
     # 按时间倒序排列
@@ -43,31 +94,24 @@ if history_records:
     with col3:
         if st.button("删除选中"):
             if st.session_state.records_to_delete:
-                # 删除选中的记录
-                records_to_keep = [
-                    record for record in history_records 
-                    if record.get("timestamp", "") not in st.session_state.records_to_delete
-                ]
-                
-                # 保存剩余记录
-                try:
-                    with open("data/history_records.json", "w", encoding="utf-8") as f:
-                        json.dump(records_to_keep[::-1], f, ensure_ascii=False, indent=2)  # 重新反转以保持正确顺序
-                    
+                # 删除选中的记录（在文件锁内基于最新数据删除）
+                if delete_history_records(st.session_state.records_to_delete, class_context.history_file):
                     st.success(f"成功删除 {len(st.session_state.records_to_delete)} 条记录！")
                     st.session_state.records_to_delete = []
                     st.rerun()
-                except Exception as e:
-                    st.error(f"删除记录时出错: {e}")
+                else:
+                    st.error("删除记录时出错，请稍后重试")
             else:
                 st.warning("请先选择要删除的记录")
     
     with col4:
         if st.button("清空所有记录"):
-            clear_history_records()
-            st.session_state.records_to_delete = []
-            st.success("所有历史记录已清空！")
-            st.rerun()
+            if clear_history_records(class_context.history_file):
+                st.session_state.records_to_delete = []
+                st.success("所有历史记录已清空！")
+                st.rerun()
+            else:
+                st.error("清空记录时出错，请稍后重试")
     
     # 显示记录列表
     st.markdown("---")
@@ -125,9 +169,6 @@ if history_records:
                 st.text_area("", value=record.get("reminder_content", ""), height=200, key=f"full_content_{record_key}")
             
             # 查看网页功能
-            if f"show_web_{record_key}" not in st.session_state:
-                st.session_state[f"show_web_{record_key}"] = False
-            
             col1, col2 = st.columns(2)
             with col1:
                 if st.button("查看手机网页", key=f"web_{record_key}"):
@@ -141,31 +182,31 @@ if history_records:
                             # 如果解析失败，使用当前日期
                             date_obj = datetime.now().date()
                         
-                        # 生成手机网页
-                        with st.spinner("正在生成手机网页..."):
-                            html_content, file_path = generate_mobile_page(reminder_content, date_obj)
-                            st.session_state[f"html_content_{record_key}"] = html_content
-                            st.session_state[f"file_path_{record_key}"] = file_path
-                            st.session_state[f"show_web_{record_key}"] = True
+                        # 优先使用已写入 output/ 的网页文件（较早的网页从按月归档中读取），都没有时再生成
+                        if record_key not in preview_cache:
+                            with st.spinner("正在加载手机网页..."):
+                                html_content, file_path = get_or_generate_mobile_page(
+                                    reminder_content, date_obj, class_context.output_dir, background=True
+                                )
+                                preview_cache.put(record_key, html_content, file_path)
+                        st.session_state.active_preview = record_key
                     else:
                         st.error("此记录没有提醒内容，无法生成网页")
             
             with col2:
-                # 下载网页按钮（只有在生成网页后才显示）
-                if f"html_content_{record_key}" in st.session_state:
+                # 下载网页按钮（只有在网页已加载时才显示）；列表逐条检查不改变淘汰顺序
+                cached_preview = preview_cache.peek(record_key)
+                if cached_preview is not None:
                     st.download_button(
                         label="下载网页",
-                        data=st.session_state[f"html_content_{record_key}"],
+                        data=cached_preview[0],
                         file_name=f"乐知班温馨提醒_{date_str.replace('年', '').replace('月', '').replace('日', '')}.html",
                         mime="text/html",
                         key=f"download_{record_key}"
                     )
             
-            # 显示网页预览
-            if st.session_state[f"show_web_{record_key}"] and f"html_content_{record_key}" in st.session_state:
-                st.markdown("#### 手机网页预览")
-                components.html(st.session_state[f"html_content_{record_key}"], height=600, scrolling=True)
-                st.info(f"网页文件已保存至：{st.session_state[f'file_path_{record_key}']}")
+            if st.session_state.active_preview == record_key:
+                st.caption("👇 网页预览显示在记录列表下方")
             
             # 删除选项
             is_selected = record_key in st.session_state.records_to_delete
@@ -179,34 +220,43 @@ if history_records:
             # 单条删除按钮
             if st.button("删除此记录", key=f"delete_{record_key}"):
                 # 删除单条记录
-                records_to_keep = [
-                    r for r in history_records
-                    if r.get("timestamp", "") != timestamp
-                ]
-                
-                # 保存剩余记录
-                try:
-                    with open("data/history_records.json", "w", encoding="utf-8") as f:
-                        json.dump(records_to_keep[::-1], f, ensure_ascii=False, indent=2)  # 重新反转以保持正确顺序
-                    
+                if delete_history_records([timestamp], class_context.history_file):
                     # 从待删除列表中移除
                     if record_key in st.session_state.records_to_delete:
                         st.session_state.records_to_delete.remove(record_key)
                     
                     # 清理相关的session_state
-                    keys_to_remove = [f"show_full_{record_key}", f"show_web_{record_key}",
-                                    f"html_content_{record_key}", f"file_path_{record_key}"]
-                    for key in keys_to_remove:
-                        if key in st.session_state:
-                            del st.session_state[key]
+                    if f"show_full_{record_key}" in st.session_state:
+                        del st.session_state[f"show_full_{record_key}"]
+                    preview_cache.discard(record_key)
+                    if st.session_state.active_preview == record_key:
+                        st.session_state.active_preview = None
                     
                     st.success("记录已删除！")
                     st.rerun()
-                except Exception as e:
-                    st.error(f"删除记录时出错: {e}")
+                else:
+                    st.error("删除记录时出错，请稍后重试")
+    
+    # 单一的网页预览区域：同一时间只挂载一个预览iframe
+    active_key = st.session_state.active_preview
+    active_preview = preview_cache.get(active_key) if active_key else None
+    if active_preview is not None:
+        st.markdown("---")
+        preview_col, close_col = st.columns([4, 1])
+        with preview_col:
+            st.markdown("#### 手机网页预览")
+        with close_col:
+            if st.button("关闭预览", key="close_preview", use_container_width=True):
+                st.session_state.active_preview = None
+                st.rerun()
+        components.html(active_preview[0], height=600, scrolling=True)
+        st.info(f"网页文件位于：{active_preview[1]}")
 else:
     st.info("暂无历史记录")
 
 # 返回主页面按钮
 if st.button("返回主页面"):
     st.switch_page("温馨提醒生成器.py")
+
+# 调试模式下显示各阶段耗时（放在页面末尾，包含本次运行的统计）
+render_debug_sidebar()
@@ -1,9 +1,12 @@
+import copy
 import streamlit as st
 from datetime import datetime, timedelta
 
 # 导入自定义模块
-from utils.data_manager import load_schedule_data, save_schedule_data
-from utils.ui_components import render_course_editor, render_club_editor, render_duty_editor
+from utils.data_manager import diff_schedule_data
+from utils.st_adapters import load_schedule_data, save_schedule_changes
+from utils.schema_validator import SCHEDULE_VALIDATOR
+from utils.ui_components import render_course_editor, render_club_editor, render_duty_editor, render_term_editor, render_import_panel, clear_editor_frames, get_current_class, render_class_selector, render_debug_sidebar
 
 # 设置页面配置
 st.set_page_config(
@@ -12,17 +15,23 @@ st.set_page_config(
     layout="wide"
 )
 
+# 确定当前班级（URL参数 ?class=<班级ID>）
+class_context = get_current_class()
+render_class_selector(class_context)
+
 # 标题和说明
-st.title("📅乐知班数据编辑器")
+st.title(f"📅{class_context.name}数据编辑器")
 
-# 加载课程安排数据
+# 加载课程安排数据，并保存一份快照用于比较修改
 if "schedule_data" not in st.session_state:
-    st.session_state.schedule_data = load_schedule_data()
+    st.session_state.schedule_data = load_schedule_data(class_context.schedule_file)
+    st.session_state.schedule_snapshot = copy.deepcopy(st.session_state.schedule_data)
+    clear_editor_frames()
 
 schedule_data = st.session_state.schedule_data
 
 # 创建标签页用于不同类型的编辑
-tab1, tab2, tab3 = st.tabs(["课程安排", "社团安排", "值日安排"])
+tab1, tab2, tab3, tab4, tab5 = st.tabs(["课程安排", "社团安排", "值日安排", "学期安排", "批量导入"])
 
 # 课程安排编辑
 with tab1:
@@ -39,11 +48,33 @@ with tab3:
     edited_duty_data = render_duty_editor(schedule_data)
     schedule_data["值日安排"] = edited_duty_data
 
-# 保存按钮
-if st.button("保存所有更改"):
-    if save_schedule_data(schedule_data):
-        st.success("数据已保存成功！")
+# 学期安排编辑
+with tab4:
+    edited_term_data = render_term_editor(schedule_data)
+    # 未配置过学期且没有填写时不写入空的学期安排
+    if edited_term_data or "学期安排" in schedule_data:
+        schedule_data["学期安排"] = edited_term_data
+
+# 批量导入（CSV/Excel），导入后重新加载数据
+with tab5:
+    if render_import_panel(class_context):
+        del st.session_state["schedule_data"]
+        st.rerun()
+
+# 只校验与快照相比发生变化的部分，编辑时即时提示错误
+changes = diff_schedule_data(st.session_state.schedule_snapshot, schedule_data)
+validation_issues = SCHEDULE_VALIDATOR.validate_changes(schedule_data, changes)
+if validation_issues:
+    st.warning("以下修改未通过校验，请修正后再保存：\n" + "\n".join(f"- {issue}" for issue in validation_issues))
+
+# 保存按钮（只写入与快照相比发生变化的部分）
+if st.button("保存所有更改", disabled=bool(validation_issues)):
+    if not changes:
+        st.info("数据没有变化，无需保存")
+    elif save_schedule_changes(schedule_data, changes, class_context.schedule_file, class_context.backup_dir):
+        st.success(f"数据已保存成功！（共 {len(changes)} 处修改）")
         st.session_state.schedule_data = schedule_data
+        st.session_state.schedule_snapshot = copy.deepcopy(schedule_data)
     else:
         st.error("数据保存失败！")
 
@@ -51,3 +82,6 @@ if st.button("保存所有更改"):
 st.markdown("---")
 if st.button("返回主页面"):
     st.switch_page("温馨提醒生成器.py")
+
+# 调试模式下显示各阶段耗时（放在页面末尾，包含本次运行的统计）
+render_debug_sidebar()
@@ -0,0 +1,41 @@
+"""
+HTTP接口 format=html 的转义测试
+"""
+import http.client
+import threading
+from urllib.parse import urlencode
+
+import pytest
+
+from lezhiban_api import PooledHTTPServer, ReminderRequestHandler
+
+
+@pytest.fixture
+def api_server():
+    server = PooledHTTPServer(("127.0.0.1", 0), ReminderRequestHandler, workers=2)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _get(server, params):
+    connection = http.client.HTTPConnection("127.0.0.1", server.server_port, timeout=10)
+    connection.request("GET", "/api/reminder?" + urlencode(params))
+    response = connection.getresponse()
+    return response.status, response.read().decode("utf-8")
+
+
+def test_html_escapes_notes_and_weather(api_server):
+    status, body = _get(api_server, {
+        "date": "2025-09-01",
+        "format": "html",
+        "notes": "<script>alert(1)</script>带好《读本》",
+        "weather": "<img src=x onerror=alert(2)>",
+    })
+    assert status == 200
+    assert "<script>alert(1)</script>" not in body
+    assert "&lt;script&gt;alert(1)&lt;/script&gt;" in body
+    assert "<img src=x" not in body
+    # 转义后仍然高亮书名号中的内容
+    assert '<span class="highlight">《读本》</span>' in body
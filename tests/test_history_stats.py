@@ -0,0 +1,63 @@
+"""
+删除和裁剪历史记录后统计汇总的更新测试
+"""
+from datetime import date
+
+from utils import history_manager
+from utils.history_analytics import load_history_stats, rebuild_history_stats
+from utils.history_manager import delete_history_records, load_history_records, save_history_record
+from utils.reminder_generator import generate_reminder_content
+
+
+def _save(history_file, day, note="带水彩笔", weather="晴"):
+    weather = f"{weather}，低温 20℃~高温 28℃"
+    save_history_record({
+        "date": f"2025年09月{day:02d}日",
+        "weekday": "星期二",
+        "weather": weather,
+        "special_notes": note,
+        "reminder_content": generate_reminder_content(date(2025, 9, day), "星期二", weather, {}, note),
+    }, history_file)
+
+
+def _rebuilt(history_file, tmp_path):
+    """按剩余记录从头计算的统计（写入另一个目录，不影响被测的统计文件）"""
+    stats = rebuild_history_stats(load_history_records(history_file), str(tmp_path / "rebuilt" / "history.json"))
+    stats.pop("updated_at")
+    return stats
+
+
+def _current(history_file):
+    stats = load_history_stats(history_file)
+    stats.pop("updated_at")
+    return stats
+
+
+def test_delete_removes_days_from_stats(tmp_path):
+    history_file = str(tmp_path / "history.json")
+    _save(history_file, 1)
+    _save(history_file, 2, weather="小雨")
+    _save(history_file, 2, weather="阴")
+    _save(history_file, 3)
+
+    records = load_history_records(history_file)
+    # 删除9月1日，以及9月2日最后保存的一条（统计改用同一天剩下的那条）
+    assert delete_history_records([records[0].timestamp, records[2].timestamp], history_file)
+
+    stats = _current(history_file)
+    assert sorted(stats["days"]) == ["2025-09-02", "2025-09-03"]
+    assert stats["days"]["2025-09-02"]["weather"] == "小雨"
+    assert stats["notice_dates"] == ["2025-09-02", "2025-09-03"]
+    assert stats == _rebuilt(history_file, tmp_path)
+
+
+def test_trimmed_records_leave_stats(tmp_path, monkeypatch):
+    history_file = str(tmp_path / "history.json")
+    monkeypatch.setattr(history_manager, "MAX_HISTORY_RECORDS", 2)
+    for day in (1, 2, 3):
+        _save(history_file, day)
+
+    stats = _current(history_file)
+    assert sorted(stats["days"]) == ["2025-09-02", "2025-09-03"]
+    assert stats["totals"]["days"] == 2
+    assert stats == _rebuilt(history_file, tmp_path)
@@ -0,0 +1,59 @@
+"""
+模板热加载后各级缓存的失效测试
+"""
+import os
+import shutil
+from datetime import date
+
+import pytest
+
+from utils import precompute
+from utils.class_manager import get_class_context
+from utils.data_manager import load_schedule_data
+from utils.reminder_service import build_reminder, render_reminder
+from utils.template_registry import TEMPLATES
+
+MARKER = "<!-- template-reload-test -->"
+
+
+@pytest.fixture
+def work_dir(tmp_path, monkeypatch):
+    """在仓库副本中运行，测试修改的模板和预生成结果不影响仓库"""
+    repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    for name in ("templates", "schedule_data.json"):
+        source = os.path.join(repo_root, name)
+        if os.path.isdir(source):
+            shutil.copytree(source, tmp_path / name)
+        else:
+            shutil.copy(source, tmp_path / name)
+    monkeypatch.chdir(tmp_path)
+    # 每次都检查模板文件，不等待检查间隔
+    monkeypatch.setattr(TEMPLATES, "check_interval", 0)
+    TEMPLATES.clear()
+    yield tmp_path
+    TEMPLATES.clear()
+
+
+def _edit_template(path):
+    with open(path, "r", encoding="utf-8") as f:
+        source = f.read()
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(source.replace("</body>", MARKER + "\n</body>", 1))
+
+
+def test_template_edit_reaches_cached_and_precomputed_pages(work_dir):
+    target = date(2025, 9, 2)
+    context = get_class_context("lezhiban")
+    precompute.precompute_reminders(context, target, 1, weather_lookup=lambda city, day: "晴")
+    schedule_data = load_schedule_data(context.schedule_file)
+    assert precompute.get_precomputed(context, target, "晴", schedule_data) is not None
+
+    before = render_reminder(build_reminder("lezhiban", target, weather="晴"), "html")
+    assert MARKER not in before
+
+    _edit_template(os.path.join("templates", "image_template.html"))
+
+    # 预生成的网页骨架使用旧模板，不再命中
+    assert precompute.get_precomputed(context, target, "晴", schedule_data) is None
+    after = render_reminder(build_reminder("lezhiban", target, weather="晴"), "html")
+    assert MARKER in after
@@ -0,0 +1,35 @@
+"""
+后台写入队列的批处理窗口测试
+"""
+import time
+
+from utils.write_behind import WriteBehindQueue
+
+
+def test_steady_stream_is_written_in_one_batch(tmp_path):
+    batches = []
+    queue = WriteBehindQueue(delay=0.5)
+    path = str(tmp_path / "history.json")
+    try:
+        # 批处理窗口内陆续到达的条目合并为一次写入
+        for item in range(5):
+            queue.append(path, item, lambda items, _: batches.append(list(items)))
+            time.sleep(0.05)
+        assert queue.flush(timeout=5)
+    finally:
+        queue.close()
+    assert batches == [[0, 1, 2, 3, 4]]
+
+
+def test_flush_does_not_wait_for_the_window(tmp_path):
+    queue = WriteBehindQueue(delay=30)
+    path = str(tmp_path / "page.html")
+    try:
+        queue.write_text(path, "<html></html>")
+        started = time.monotonic()
+        assert queue.flush(timeout=5)
+        assert time.monotonic() - started < 5
+    finally:
+        queue.close()
+    with open(path, encoding="utf-8") as f:
+        assert f.read() == "<html></html>"
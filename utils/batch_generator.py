@@ -0,0 +1,264 @@
+import os
+import re
+import logging
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from datetime import date, timedelta
+from typing import Dict, Any, List, Optional, Iterable, Tuple
+
+from utils.class_manager import get_class_context, check_class_ids, ClassContext
+from utils.data_manager import load_schedule_data
+from utils.weather_service import get_weather_info
+from utils.reminder_generator import (
+    generate_reminder_content, build_reminder_data, render_reminder_text,
+    build_student_index, personalize_reminder_data
+)
+from utils.mobile_page_generator import generate_mobile_page, render_mobile_html
+from utils.history_manager import save_history_record
+from utils.term_calendar import WEEKDAY_NAMES
+from utils.storage import write_text as write_text_file
+from utils.metrics import timed
+
+logger = logging.getLogger(__name__)
+
+# 默认并发数
+DEFAULT_WORKERS = 4
+# 学生个人提醒的输出目录（位于班级输出目录下，按日期分子目录）
+STUDENT_OUTPUT_DIR = 'students'
+# 文件名中不允许出现的字符（路径分隔符、Windows保留字符和控制字符）
+UNSAFE_FILENAME_CHARS = re.compile(r'[\\/:*?"<>|\x00-\x1f]')
+
+
+def date_range(start: date, end: date) -> List[date]:
+    """
+    生成闭区间内的所有日期
+
+    Args:
+        start (date): 开始日期
+        end (date): 结束日期
+
+    Returns:
+        List[date]: 日期列表
+    """
+    return [start + timedelta(days=offset) for offset in range((end - start).days + 1)]
+
+
+def get_text_output_path(context: ClassContext, target_date: date) -> str:
+    """
+    获取文本版提醒的输出路径（与网页文件同目录同名）
+
+    Args:
+        context (ClassContext): 班级上下文
+        target_date (date): 目标日期
+
+    Returns:
+        str: 文本文件路径
+    """
+    return os.path.join(context.output_dir, f'lezhiban_reminder_{target_date.strftime("%Y%m%d")}.txt')
+
+
+def generate_for_date(class_id: str, target_date: date, special_notes: str = "",
+                      weather: Optional[str] = None, write_text: bool = True,
+                      write_html: bool = True, save_history: bool = True) -> Dict[str, Any]:
+    """
+    为一个班级生成一天的温馨提醒，并写出文本、网页和历史记录
+
+    Args:
+        class_id (str): 班级ID
+        target_date (date): 目标日期
+        special_notes (str): 特别注意事项
+        weather (Optional[str]): 天气信息，为空时查询天气服务（带缓存）
+        write_text (bool): 是否写出文本文件
+        write_html (bool): 是否写出手机网页
+        save_history (bool): 是否保存历史记录
+
+    Returns:
+        Dict[str, Any]: 生成结果，包含班级、日期、提醒内容和输出文件路径
+    """
+    context = get_class_context(class_id)
+    schedule_data = load_schedule_data(context.schedule_file)
+    weekday = WEEKDAY_NAMES[target_date.weekday()]
+    if weather is None:
+        weather = get_weather_info(context.city, target_date)
+
+    reminder_text = generate_reminder_content(
+        target_date, weekday, weather, schedule_data, special_notes, context.name
+    )
+
+    result = {
+        "class_id": context.class_id,
+        "date": target_date.isoformat(),
+        "weather": weather,
+        "reminder_text": reminder_text,
+        "text_path": None,
+        "html_path": None,
+    }
+
+    if write_text:
+        result["text_path"] = get_text_output_path(context, target_date)
+        write_text_file(result["text_path"], reminder_text)
+
+    if write_html:
+        _, result["html_path"] = generate_mobile_page(reminder_text, target_date, context.output_dir)
+
+    if save_history:
+        save_history_record({
+            "date": target_date.strftime('%Y年%m月%d日'),
+            "weekday": weekday,
+            "weather": weather,
+            "special_notes": special_notes,
+            "reminder_content": reminder_text
+        }, context.history_file)
+
+    return result
+
+
+def _generate_job(job: Tuple[str, date, str, Optional[str], bool, bool, bool]) -> Dict[str, Any]:
+    """
+    进程池/线程池中执行的单个任务，出错时返回错误信息而不是中断整个批次
+    """
+    class_id, target_date = job[0], job[1]
+    try:
+        return generate_for_date(*job)
+    except Exception as e:
+        logger.exception("生成 %s %s 的提醒失败", class_id, target_date)
+        return {"class_id": class_id, "date": target_date.isoformat(), "error": str(e)}
+
+
+def run_batch(class_ids: Iterable[str], dates: Iterable[date], special_notes: str = "",
+              weather: Optional[str] = None, workers: int = DEFAULT_WORKERS,
+              use_processes: bool = False, write_text: bool = True,
+              write_html: bool = True, save_history: bool = True) -> List[Dict[str, Any]]:
+    """
+    批量生成多个班级、多个日期的温馨提醒
+
+    同一城市同一日期的天气只查询一次，再分发给各班级的任务。
+
+    Args:
+        class_ids (Iterable[str]): 班级ID列表
+        dates (Iterable[date]): 日期列表
+        special_notes (str): 特别注意事项（所有班级共用）
+        weather (Optional[str]): 指定天气信息，为空时查询天气服务
+        workers (int): 并发数
+        use_processes (bool): 使用进程池（默认使用线程池）
+        write_text (bool): 是否写出文本文件
+        write_html (bool): 是否写出手机网页
+        save_history (bool): 是否保存历史记录
+
+    Returns:
+        List[Dict[str, Any]]: 每个任务的生成结果，失败的任务包含error字段
+
+    Raises:
+        UnknownClassError: 有未注册的班级ID
+    """
+    class_ids = list(dict.fromkeys(class_ids))
+    check_class_ids(class_ids)
+    contexts = [get_class_context(class_id) for class_id in class_ids]
+    dates = list(dates)
+
+    # 预先按(城市, 日期)查询天气，避免多个班级重复请求
+    weather_by_key: Dict[Tuple[str, date], Optional[str]] = {}
+    if weather is None:
+        keys = list(dict.fromkeys((context.city, target_date) for context in contexts for target_date in dates))
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+            for key, info in zip(keys, executor.map(lambda key: get_weather_info(*key), keys)):
+                weather_by_key[key] = info
+
+    jobs = [
+        (context.class_id, target_date, special_notes,
+         weather if weather is not None else weather_by_key[(context.city, target_date)],
+         write_text, write_html, save_history)
+        for context in contexts
+        for target_date in dates
+    ]
+
+    executor_class = ProcessPoolExecutor if use_processes else ThreadPoolExecutor
+    with executor_class(max_workers=max(1, workers)) as executor:
+        return list(executor.map(_generate_job, jobs))
+
+
+def safe_filename(name: str) -> str:
+    """
+    把学生姓名转换为安全的文件名，不会跳出输出目录
+
+    Args:
+        name (str): 学生姓名
+
+    Returns:
+        str: 文件名（不含扩展名）
+    """
+    # 替换路径分隔符等字符，并去掉开头的点（"."、".."和隐藏文件）
+    cleaned = UNSAFE_FILENAME_CHARS.sub('_', name).strip().lstrip('.').strip()
+    return cleaned or '_'
+
+
+def get_student_output_path(context: ClassContext, target_date: date, student: str, extension: str) -> str:
+    """
+    获取学生个人提醒的输出路径，如 output/students/20250902/张三.html
+
+    Args:
+        context (ClassContext): 班级上下文
+        target_date (date): 目标日期
+        student (str): 学生姓名
+        extension (str): 文件扩展名（html / txt）
+
+    Returns:
+        str: 文件路径
+    """
+    return os.path.join(context.output_dir, STUDENT_OUTPUT_DIR, target_date.strftime("%Y%m%d"),
+                        f"{safe_filename(student)}.{extension}")
+
+
+@timed("student_batch")
+def generate_student_reminders(class_id: str, target_date: date, special_notes: str = "",
+                               weather: Optional[str] = None, students: Optional[Iterable[str]] = None,
+                               write_text: bool = True, write_html: bool = True,
+                               workers: int = 1) -> List[Dict[str, Any]]:
+    """
+    一次生成全班每名学生的个人提醒（只含该生的社团和值日）
+
+    全班共用的课程、天气、着装和注意事项只生成一次，每名学生只替换社团和值日部分，
+    不会为每名学生重新查询课程安排。
+
+    Args:
+        class_id (str): 班级ID
+        target_date (date): 目标日期
+        special_notes (str): 特别注意事项
+        weather (Optional[str]): 天气信息，为空时查询天气服务（带缓存）
+        students (Optional[Iterable[str]]): 学生姓名，默认为值日表和社团名单中的所有学生
+        write_text (bool): 是否写出文本文件
+        write_html (bool): 是否写出手机网页
+        workers (int): 并发数，大于1时使用线程池渲染
+
+    Returns:
+        List[Dict[str, Any]]: 每名学生的结果，包含学生、提醒内容和输出文件路径
+
+    Raises:
+        UnknownClassError: 班级ID未注册
+    """
+    check_class_ids([class_id])
+    context = get_class_context(class_id)
+    schedule_data = load_schedule_data(context.schedule_file)
+    if weather is None:
+        weather = get_weather_info(context.city, target_date)
+
+    weekday = WEEKDAY_NAMES[target_date.weekday()]
+    class_data = build_reminder_data(target_date, weekday, weather, schedule_data, special_notes, context.name)
+    student_index = build_student_index(schedule_data)
+    students = list(student_index) if students is None else list(students)
+
+    def render(student: str) -> Dict[str, Any]:
+        student_data = personalize_reminder_data(class_data, student, student_index)
+        reminder_text = render_reminder_text(student_data)
+        result = {"student": student, "reminder_text": reminder_text, "text_path": None, "html_path": None}
+        if write_text:
+            result["text_path"] = get_student_output_path(context, target_date, student, "txt")
+            write_text_file(result["text_path"], reminder_text)
+        if write_html:
+            result["html_path"] = get_student_output_path(context, target_date, student, "html")
+            write_text_file(result["html_path"], render_mobile_html(reminder_text, student_data))
+        return result
+
+    if workers > 1:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(render, students))
+    return [render(student) for student in students]
@@ -0,0 +1,148 @@
+import os
+import threading
+from dataclasses import dataclass
+from typing import Dict, Any, Iterable, List, Optional
+from utils.storage import read_json
+from utils.errors import UnknownClassError
+
+# 班级注册表文件路径
+CLASSES_FILE = 'data/classes.json'
+# 各班级独立数据的根目录
+CLASS_DATA_ROOT = 'data/classes'
+# 静态网站的根目录，每个班级一个子目录
+SITE_ROOT = 'site'
+# 默认班级ID，沿用单班级部署时的文件路径
+DEFAULT_CLASS_ID = 'lezhiban'
+# 默认城市设置为上饶市信州区
+DEFAULT_CITY = '101240301'
+
+# 未配置注册表时的默认班级
+DEFAULT_CLASSES = {
+    DEFAULT_CLASS_ID: {"名称": "乐知班", "城市": DEFAULT_CITY}
+}
+
+
+@dataclass(frozen=True)
+class ClassContext:
+    """
+    单个班级的数据命名空间
+
+    课程安排、历史记录、备份和输出目录按班级隔离；
+    天气缓存按城市代码共享，同城班级共用同一份缓存。
+    """
+    class_id: str
+    name: str
+    city: str
+    schedule_file: str
+    history_file: str
+    backup_dir: str
+    output_dir: str
+    site_dir: str
+
+
+_registry_lock = threading.Lock()
+_registry_cache: Dict[str, Any] = {"mtime": None, "classes": None}
+_context_cache: Dict[str, ClassContext] = {}
+
+
+def load_class_registry() -> Dict[str, Dict[str, Any]]:
+    """
+    加载班级注册表，文件未变化时直接复用进程内缓存
+
+    Returns:
+        Dict[str, Dict[str, Any]]: 班级ID到班级配置（名称、城市）的映射
+    """
+    try:
+        mtime = os.path.getmtime(CLASSES_FILE)
+    except OSError:
+        mtime = None
+
+    with _registry_lock:
+        if _registry_cache["classes"] is not None and _registry_cache["mtime"] == mtime:
+            return _registry_cache["classes"]
+
+        classes = read_json(CLASSES_FILE, default=None) if mtime is not None else None
+        if not classes:
+            classes = DEFAULT_CLASSES
+        _registry_cache["classes"] = classes
+        _registry_cache["mtime"] = mtime
+        # 注册表变化后，旧的班级上下文可能已失效
+        _context_cache.clear()
+        return classes
+
+
+def list_classes() -> List[str]:
+    """
+    获取所有班级ID
+
+    Returns:
+        List[str]: 班级ID列表
+    """
+    return list(load_class_registry().keys())
+
+
+def check_class_ids(class_ids: Iterable[str]) -> None:
+    """
+    检查班级ID是否都已注册（get_class_context对未注册的ID会回到默认班级，批量生成前需要先检查）
+
+    Args:
+        class_ids (Iterable[str]): 班级ID列表
+
+    Raises:
+        UnknownClassError: 有未注册的班级ID
+    """
+    classes = list_classes()
+    unknown = [class_id for class_id in class_ids if class_id not in classes]
+    if unknown:
+        raise UnknownClassError(f"未注册的班级：{'、'.join(unknown)}，可选：{'、'.join(classes)}")
+
+
+def _build_context(class_id: str, config: Dict[str, Any]) -> ClassContext:
+    """
+    根据班级配置构建数据路径
+    """
+    if class_id == DEFAULT_CLASS_ID:
+        # 默认班级沿用原有路径，已有部署无需迁移数据
+        return ClassContext(
+            class_id=class_id,
+            name=config.get("名称", "乐知班"),
+            city=config.get("城市", DEFAULT_CITY),
+            schedule_file='schedule_data.json',
+            history_file='data/history_records.json',
+            backup_dir='data/backups',
+            output_dir='output',
+            site_dir=os.path.join(SITE_ROOT, class_id),
+        )
+
+    class_dir = os.path.join(CLASS_DATA_ROOT, class_id)
+    return ClassContext(
+        class_id=class_id,
+        name=config.get("名称", class_id),
+        city=config.get("城市", DEFAULT_CITY),
+        schedule_file=os.path.join(class_dir, 'schedule_data.json'),
+        history_file=os.path.join(class_dir, 'history_records.json'),
+        backup_dir=os.path.join(class_dir, 'backups'),
+        output_dir=os.path.join('output', class_id),
+        site_dir=os.path.join(SITE_ROOT, class_id),
+    )
+
+
+def get_class_context(class_id: Optional[str] = None) -> ClassContext:
+    """
+    获取班级上下文，同一进程内的所有会话共享同一个对象
+
+    Args:
+        class_id (Optional[str]): 班级ID，为空或未注册时使用默认班级
+
+    Returns:
+        ClassContext: 班级上下文
+    """
+    classes = load_class_registry()
+    if not class_id or class_id not in classes:
+        class_id = DEFAULT_CLASS_ID if DEFAULT_CLASS_ID in classes else next(iter(classes))
+
+    context = _context_cache.get(class_id)
+    if context is None:
+        context = _build_context(class_id, classes[class_id])
+        _context_cache[class_id] = context
+    return context
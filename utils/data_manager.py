@@ -1,79 +1,206 @@
 import json
-import streamlit as st
-from typing import Dict, Any
+import copy
+import logging
+import threading
+from typing import Dict, Any, Optional, List, Tuple
 import os
+from utils.storage import read_json, write_json, file_lock
+from utils.schema_validator import SCHEDULE_VALIDATOR
+from utils.errors import ScheduleDataError, ScheduleValidationError
+from utils.metrics import timed
+from utils.term_calendar import schedule_version, remember_schedule_version
+
+logger = logging.getLogger(__name__)
 
 # 定义数据文件路径
 DATA_FILE_PATH = 'schedule_data.json'
 BACKUP_DIR = 'data/backups'
 
-def load_schedule_data() -> Dict[str, Any]:
+# 进程内共享的课程数据缓存：文件路径 -> (文件签名, 数据, 版本号)
+# 多个班级、多个会话共用一份解析结果，文件变化时才重新读取
+# 原子写入每次都会替换inode，因此(inode, 修改时间, 大小)足以识别文件变化
+_schedule_cache: Dict[str, Any] = {}
+_schedule_cache_lock = threading.Lock()
+
+@timed("schedule_load")
+def load_schedule_data(file_path: Optional[str] = None) -> Dict[str, Any]:
     """
     从JSON文件加载课程安排数据
     
+    Args:
+        file_path (Optional[str]): 数据文件路径，默认为DATA_FILE_PATH
+        
     Returns:
-        Dict[str, Any]: 课程安排数据
+        Dict[str, Any]: 课程安排数据（调用方可以自由修改的副本；
+            get_schedule_version查询未修改的副本时直接返回加载时的版本号）
+        
+    Raises:
+        ScheduleDataError: 文件不存在或格式错误
     """
+    file_path = file_path or DATA_FILE_PATH
     try:
-        with open(DATA_FILE_PATH, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        stat = os.stat(file_path)
+        signature = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        with _schedule_cache_lock:
+            cached = _schedule_cache.get(file_path)
+            if cached is None or cached[0] != signature:
+                data = read_json(file_path)
+                # 版本号每次读取文件时只计算一次
+                cached = (signature, data, schedule_version(data))
+                _schedule_cache[file_path] = cached
+        data = copy.deepcopy(cached[1])
+        remember_schedule_version(data, cached[2])
         return data
-    except FileNotFoundError:
-        st.error(f"找不到{DATA_FILE_PATH}文件，请确保文件存在")
-        return {}
+    except FileNotFoundError as e:
+        raise ScheduleDataError(f"找不到{file_path}文件，请确保文件存在") from e
     except json.JSONDecodeError as e:
-        st.error(f"{DATA_FILE_PATH}文件格式错误，请检查JSON格式: {str(e)}")
-        return {}
+        raise ScheduleDataError(f"{file_path}文件格式错误，请检查JSON格式: {str(e)}") from e
     except Exception as e:
-        st.error(f"加载数据时发生未知错误: {str(e)}")
-        return {}
+        raise ScheduleDataError(f"加载数据时发生未知错误: {str(e)}") from e
 
-def save_schedule_data(data: Dict[str, Any]) -> bool:
+@timed("schedule_save")
+def save_schedule_data(data: Dict[str, Any], file_path: Optional[str] = None,
+                       backup_dir: Optional[str] = None, validate: bool = True) -> None:
     """
-    将课程安排数据保存到JSON文件
+    将课程安排数据保存到JSON文件，格式不正确的数据会被拒绝
     
     Args:
         data (Dict[str, Any]): 要保存的课程安排数据
+        file_path (Optional[str]): 数据文件路径，默认为DATA_FILE_PATH
+        backup_dir (Optional[str]): 备份目录，默认为BACKUP_DIR
+        validate (bool): 是否校验整份数据；调用方已校验过修改部分时可传False
         
-    Returns:
-        bool: 保存是否成功
+    Raises:
+        ScheduleValidationError: 数据未通过校验
+        ScheduleDataError: 写入文件失败
     """
+    file_path = file_path or DATA_FILE_PATH
+    if validate:
+        issues = SCHEDULE_VALIDATOR.validate(data)
+        if issues:
+            raise ScheduleValidationError(issues)
     try:
-        # 创建备份
-        create_backup()
+        # 持有锁期间完成备份和写入，避免两个保存交叉进行
+        with file_lock(file_path):
+            # 创建备份
+            create_backup(file_path, backup_dir)
         
-        # 保存数据
-        with open(DATA_FILE_PATH, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
-        return True
+            # 原子写入数据
+            write_json(file_path, data)
+        logger.info("课程安排数据已保存: %s", file_path)
     except Exception as e:
-        st.error(f"保存数据时出错：{str(e)}")
-        return False
+        raise ScheduleDataError(f"保存数据时出错：{str(e)}") from e
+
+# 按星期细分比较的数据段，其余数据段（如学期安排）整体比较
+WEEKDAY_SECTIONS = ("课程安排", "社团安排", "值日安排")
+
+def diff_schedule_data(original: Dict[str, Any], edited: Dict[str, Any]) -> List[Tuple[str, Optional[str]]]:
+    """
+    比较编辑前后的课程安排数据，找出发生变化的部分
+    
+    Args:
+        original (Dict[str, Any]): 加载时的数据快照
+        edited (Dict[str, Any]): 编辑后的数据
+        
+    Returns:
+        List[Tuple[str, Optional[str]]]: 变化位置列表，(数据段, 星期)；整段变化时星期为None
+    """
+    changes = []
+    for section in dict.fromkeys(list(original.keys()) + list(edited.keys())):
+        old_value = original.get(section)
+        new_value = edited.get(section)
+        if old_value == new_value:
+            continue
+        if section in WEEKDAY_SECTIONS and isinstance(old_value, dict) and isinstance(new_value, dict):
+            for weekday in dict.fromkeys(list(old_value.keys()) + list(new_value.keys())):
+                if old_value.get(weekday) != new_value.get(weekday):
+                    changes.append((section, weekday))
+        else:
+            changes.append((section, None))
+    return changes
+
+@timed("schedule_save_changes")
+def save_schedule_changes(edited: Dict[str, Any], changes: List[Tuple[str, Optional[str]]],
+                          file_path: Optional[str] = None, backup_dir: Optional[str] = None) -> None:
+    """
+    只把发生变化的部分合并写回数据文件
+    
+    在文件锁内基于磁盘上的最新数据合并，其他会话同时修改的其他星期不会被覆盖；
+    只校验变化的部分，没有变化时不写文件也不创建备份。
+    
+    Args:
+        edited (Dict[str, Any]): 编辑后的数据
+        changes (List[Tuple[str, Optional[str]]]): diff_schedule_data返回的变化位置
+        file_path (Optional[str]): 数据文件路径，默认为DATA_FILE_PATH
+        backup_dir (Optional[str]): 备份目录，默认为BACKUP_DIR
+        
+    Raises:
+        ScheduleValidationError: 修改的部分未通过校验
+        ScheduleDataError: 写入文件失败
+    """
+    if not changes:
+        return
+    
+    # 只校验修改过的数据段或星期
+    issues = SCHEDULE_VALIDATOR.validate_changes(edited, changes)
+    if issues:
+        raise ScheduleValidationError(issues)
+    
+    file_path = file_path or DATA_FILE_PATH
+    try:
+        with file_lock(file_path):
+            current = read_json(file_path, default={})
+            for section, weekday in changes:
+                if weekday is None:
+                    if section in edited:
+                        current[section] = copy.deepcopy(edited[section])
+                    else:
+                        current.pop(section, None)
+                    continue
+                
+                target = current.setdefault(section, {})
+                if weekday in edited.get(section, {}):
+                    target[weekday] = copy.deepcopy(edited[section][weekday])
+                else:
+                    target.pop(weekday, None)
+            
+            save_schedule_data(current, file_path, backup_dir, validate=False)
+    except ScheduleDataError:
+        raise
+    except Exception as e:
+        raise ScheduleDataError(f"保存数据时出错：{str(e)}") from e
 
-def create_backup() -> bool:
+def create_backup(file_path: Optional[str] = None, backup_dir: Optional[str] = None) -> bool:
     """
     创建数据文件备份
     
+    Args:
+        file_path (Optional[str]): 数据文件路径，默认为DATA_FILE_PATH
+        backup_dir (Optional[str]): 备份目录，默认为BACKUP_DIR
+        
     Returns:
         bool: 备份是否成功
     """
+    file_path = file_path or DATA_FILE_PATH
+    backup_dir = backup_dir or BACKUP_DIR
     try:
         # 确保备份目录存在
-        os.makedirs(BACKUP_DIR, exist_ok=True)
+        os.makedirs(backup_dir, exist_ok=True)
         
         # 生成备份文件名（带时间戳）
         import datetime
         timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-        backup_path = os.path.join(BACKUP_DIR, f"schedule_data_backup_{timestamp}.json")
+        backup_path = os.path.join(backup_dir, f"schedule_data_backup_{timestamp}.json")
         
         # 复制当前数据文件作为备份
-        if os.path.exists(DATA_FILE_PATH):
+        if os.path.exists(file_path):
             import shutil
-            shutil.copy2(DATA_FILE_PATH, backup_path)
+            shutil.copy2(file_path, backup_path)
             return True
         return False
     except Exception as e:
-        st.warning(f"创建备份时出错：{str(e)}")
+        # 备份失败不阻止保存
+        logger.warning("创建备份时出错：%s", e)
         return False
 
 def validate_schedule_data(data: Dict[str, Any]) -> bool:
@@ -84,51 +211,9 @@ def validate_schedule_data(data: Dict[str, Any]) -> bool:
         data (Dict[str, Any]): 要验证的课程安排数据
         
     Returns:
-        bool: 数据是否有效
+        bool: 数据是否有效（错误详情见SCHEDULE_VALIDATOR.validate）
     """
-    try:
-        # 检查必需的顶级键
-        required_keys = ["课程安排", "社团安排", "值日安排"]
-        for key in required_keys:
-            if key not in data:
-                st.error(f"数据缺少必需的键: {key}")
-                return False
-        
-        # 验证课程安排结构
-        course_data = data.get("课程安排", {})
-        weekdays = ["星期一", "星期二", "星期三", "星期四", "星期五"]
-        for weekday in weekdays:
-            if weekday in course_data:
-                day_data = course_data[weekday]
-                if not isinstance(day_data, dict):
-                    st.error(f"{weekday}的课程安排格式错误")
-                    return False
-                if "上午" not in day_data or "下午" not in day_data:
-                    st.error(f"{weekday}的课程安排缺少上午或下午字段")
-                    return False
-        
-        # 验证社团安排结构
-        club_data = data.get("社团安排", {})
-        for weekday in weekdays:
-            if weekday in club_data:
-                clubs = club_data[weekday]
-                if not isinstance(clubs, list):
-                    st.error(f"{weekday}的社团安排格式错误")
-                    return False
-                for club in clubs:
-                    if not isinstance(club, dict) or "社团名称" not in club or "成员" not in club:
-                        st.error(f"{weekday}的社团信息格式错误")
-                        return False
-        
-        # 验证值日安排结构
-        duty_data = data.get("值日安排", {})
-        for weekday in weekdays:
-            if weekday in duty_data:
-                if not isinstance(duty_data[weekday], str):
-                    st.error(f"{weekday}的值日安排格式错误")
-                    return False
-        
-        return True
-    except Exception as e:
-        st.error(f"验证数据时出错：{str(e)}")
-        return False
\ No newline at end of file
+    issues = SCHEDULE_VALIDATOR.validate(data)
+    for issue in issues:
+        logger.warning("课程安排数据校验失败：%s", issue)
+    return not issues
@@ -0,0 +1,37 @@
+from typing import List, Any
+
+
+class LezhibanError(Exception):
+    """所有业务错误的基类"""
+
+
+class ScheduleDataError(LezhibanError):
+    """课程安排数据读取或保存失败"""
+
+
+class ScheduleValidationError(ScheduleDataError):
+    """课程安排数据未通过结构校验"""
+
+    def __init__(self, issues: List[Any]):
+        self.issues = list(issues)
+        super().__init__("数据校验未通过：\n" + "\n".join(f"- {issue}" for issue in self.issues))
+
+
+class WeatherServiceError(LezhibanError):
+    """天气查询失败（网络错误、接口异常等）"""
+
+
+class WeatherOutOfRangeError(WeatherServiceError):
+    """目标日期不在天气预报范围内"""
+
+
+class UnknownClassError(LezhibanError):
+    """班级ID未在班级注册表中登记"""
+
+
+class HistoryError(LezhibanError):
+    """历史记录读写失败"""
+
+
+class ImageRenderError(LezhibanError):
+    """提醒图片生成失败（缺少Pillow或中文字体等）"""
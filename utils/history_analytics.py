@@ -0,0 +1,242 @@
+import os
+import re
+import logging
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Iterable
+
+from utils.mobile_page_generator import parse_reminder_content
+from utils.storage import read_json, update_json, remove_file
+from utils.records import HistoryRecord
+
+logger = logging.getLogger(__name__)
+
+# 统计文件名，与历史记录文件放在同一目录
+STATS_FILE_NAME = 'history_stats.json'
+
+# 天气描述中的温度，例如 "小雨，低温 25℃~高温 33℃"
+TEMPERATURE_PATTERN = re.compile(r'低温\s*(-?\d+)℃.*?高温\s*(-?\d+)℃')
+
+
+def get_stats_path(history_file: str) -> str:
+    """
+    获取历史记录统计文件路径
+
+    Args:
+        history_file (str): 历史记录文件路径
+
+    Returns:
+        str: 统计文件路径
+    """
+    return os.path.join(os.path.dirname(history_file), STATS_FILE_NAME)
+
+
+def empty_stats() -> Dict[str, Any]:
+    """
+    空的统计数据
+
+    Returns:
+        Dict[str, Any]: 统计数据
+    """
+    return {
+        "days": {},
+        "totals": {"days": 0, "notice_days": 0, "notices": 0, "club_sessions": 0},
+        "clubs": {},
+        "weather": {},
+        "temperature": {"days": 0, "low_sum": 0, "high_sum": 0},
+        "notice_dates": [],
+        "updated_at": None,
+    }
+
+
+def extract_day_summary(record: HistoryRecord) -> Optional[Dict[str, Any]]:
+    """
+    从一条历史记录中提取当天对统计的贡献
+
+    Args:
+        record (HistoryRecord): 历史记录（也可以是旧格式的字典）
+
+    Returns:
+        Optional[Dict[str, Any]]: 当天的社团、注意事项和天气；日期无法识别时为None
+    """
+    record = HistoryRecord.coerce(record)
+    if record.day is None:
+        return None
+
+    info = parse_reminder_content(record.reminder_content)
+    weather = record.weather or info["weather"]
+    temperature = TEMPERATURE_PATTERN.search(weather)
+    return {
+        "date": record.day.isoformat(),
+        "weekday": record.weekday or info["weekday"],
+        "clubs": [club["name"] for club in info["clubs"]],
+        "notices": info["special_notes"],
+        "weather": weather.split("，")[0].strip() or "未知",
+        "low": int(temperature.group(1)) if temperature else None,
+        "high": int(temperature.group(2)) if temperature else None,
+    }
+
+
+def _adjust(counter: Dict[str, int], key: str, amount: int) -> None:
+    """计数器加减，减到0时删除该项"""
+    value = counter.get(key, 0) + amount
+    if value:
+        counter[key] = value
+    else:
+        counter.pop(key, None)
+
+
+def _apply_day(stats: Dict[str, Any], summary: Dict[str, Any], sign: int) -> None:
+    """把一天的贡献加入（sign=1）或移出（sign=-1）汇总"""
+    totals = stats["totals"]
+    totals["days"] += sign
+    totals["club_sessions"] += sign * len(summary["clubs"])
+    for club in summary["clubs"]:
+        _adjust(stats["clubs"], club, sign)
+    _adjust(stats["weather"], summary["weather"], sign)
+
+    if summary["low"] is not None and summary["high"] is not None:
+        temperature = stats["temperature"]
+        temperature["days"] += sign
+        temperature["low_sum"] += sign * summary["low"]
+        temperature["high_sum"] += sign * summary["high"]
+
+    if summary["notices"]:
+        totals["notice_days"] += sign
+        totals["notices"] += sign * len(summary["notices"])
+        notice_dates = stats["notice_dates"]
+        if sign > 0:
+            notice_dates.append(summary["date"])
+            notice_dates.sort()
+        elif summary["date"] in notice_dates:
+            notice_dates.remove(summary["date"])
+
+
+def apply_record(stats: Dict[str, Any], record: HistoryRecord) -> Dict[str, Any]:
+    """
+    把一条新保存的历史记录计入汇总
+
+    同一日期以最后保存的记录为准：先移出该日期之前的贡献，再加入新的贡献，
+    重复生成同一天的提醒不会重复计数。
+
+    Args:
+        stats (Dict[str, Any]): 统计数据（原地修改）
+        record (HistoryRecord): 历史记录
+
+    Returns:
+        Dict[str, Any]: 更新后的统计数据
+    """
+    summary = extract_day_summary(record)
+    if summary is None:
+        return stats
+
+    previous = stats["days"].get(summary["date"])
+    if previous is not None:
+        _apply_day(stats, previous, -1)
+    _apply_day(stats, summary, 1)
+    stats["days"][summary["date"]] = summary
+    stats["updated_at"] = record.get("timestamp") or datetime.now().isoformat()
+    return stats
+
+
+def record_history_stats(records: List[HistoryRecord], history_file: str) -> None:
+    """
+    保存历史记录后更新统计（在文件锁内读取-修改-写回，一批记录只写一次）
+
+    统计出错只记录日志，不影响历史记录的保存。
+
+    Args:
+        records (List[HistoryRecord]): 刚保存的历史记录（按保存顺序）
+        history_file (str): 历史记录文件路径
+    """
+    def _apply(stats):
+        for record in records:
+            apply_record(stats, record)
+        return stats
+
+    try:
+        update_json(get_stats_path(history_file), _apply, default=empty_stats())
+    except Exception as e:
+        logger.warning("更新历史记录统计失败: %s", e)
+
+
+def refresh_history_days(records: List[HistoryRecord], dates: Iterable[str], history_file: str) -> None:
+    """
+    删除或裁剪历史记录后，按剩余记录更新受影响日期的统计
+
+    每个日期先移出原来的贡献，剩余记录中还有该日期时再计入其中最后保存的一条，
+    不需要重新扫描全部历史记录。统计出错只记录日志，不影响历史记录的删除。
+
+    Args:
+        records (List[HistoryRecord]): 剩余的历史记录
+        dates (Iterable[str]): 受影响的日期（ISO格式）
+        history_file (str): 历史记录文件路径
+    """
+    dates = set(dates)
+    if not dates:
+        return
+    latest: Dict[str, HistoryRecord] = {}
+    for record in sorted(records, key=lambda item: item.get("timestamp", "")):
+        if record.day is not None and record.day.isoformat() in dates:
+            latest[record.day.isoformat()] = record
+
+    def _refresh(stats):
+        for day in dates:
+            previous = stats["days"].pop(day, None)
+            if previous is not None:
+                _apply_day(stats, previous, -1)
+            if day in latest:
+                apply_record(stats, latest[day])
+        stats["updated_at"] = datetime.now().isoformat()
+        return stats
+
+    try:
+        update_json(get_stats_path(history_file), _refresh, default=empty_stats())
+    except Exception as e:
+        logger.warning("更新历史记录统计失败: %s", e)
+
+
+def load_history_stats(history_file: str) -> Dict[str, Any]:
+    """
+    读取历史记录统计（只读取汇总结果，不扫描历史记录）
+
+    Args:
+        history_file (str): 历史记录文件路径
+
+    Returns:
+        Dict[str, Any]: 统计数据
+    """
+    try:
+        return read_json(get_stats_path(history_file), default=empty_stats())
+    except Exception as e:
+        logger.error("读取历史记录统计失败: %s", e)
+        return empty_stats()
+
+
+def rebuild_history_stats(records: List[HistoryRecord], history_file: str) -> Dict[str, Any]:
+    """
+    根据现有历史记录重新计算统计（统计文件丢失或首次启用时使用）
+
+    Args:
+        records (List[HistoryRecord]): 历史记录
+        history_file (str): 历史记录文件路径
+
+    Returns:
+        Dict[str, Any]: 重新计算的统计数据
+    """
+    def _rebuild(_):
+        stats = empty_stats()
+        for record in sorted(records, key=lambda item: item.get("timestamp", "")):
+            apply_record(stats, record)
+        return stats
+
+    return update_json(get_stats_path(history_file), _rebuild, default=empty_stats())
+
+
+def clear_history_stats(history_file: str) -> None:
+    """
+    清空历史记录统计
+
+    Args:
+        history_file (str): 历史记录文件路径
+    """
+    remove_file(get_stats_path(history_file))
@@ -1,81 +1,179 @@
-import json
-import os
+import logging
 from datetime import datetime
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterable, Optional
+from utils.storage import read_json, update_json, remove_file
+from utils.metrics import timed
+from utils.history_analytics import record_history_stats, refresh_history_days, clear_history_stats
+from utils.write_behind import WRITE_QUEUE
+from utils.records import HistoryRecord, decode_history, encode_history
+
+logger = logging.getLogger(__name__)
 
 # 历史记录文件路径
 HISTORY_FILE = "data/history_records.json"
 
-def save_history_record(record: Dict[str, Any]) -> bool:
+# 历史记录文件最多保留的记录条数
+MAX_HISTORY_RECORDS = 100
+
+# 清空、删除前等待后台写入队列写完的最长时间（秒）
+FLUSH_TIMEOUT = 5.0
+
+def _record_dates(records: Iterable[HistoryRecord]) -> List[str]:
+    """记录涉及的日期（ISO格式），日期无法识别的记录不计入统计，直接跳过"""
+    return [record.day.isoformat() for record in records if record.day is not None]
+
+def _append_records(records: List[Dict[str, Any]], history_file: str) -> None:
+    """
+    把一批记录追加到历史文件并更新统计（出错时抛出异常，由调用方处理）
+    
+    Args:
+        records (List[Dict[str, Any]]): 要追加的记录（已带时间戳）
+        history_file (str): 历史记录文件路径
+    """
+    records = [HistoryRecord.coerce(record) for record in records]
+    kept: List[HistoryRecord] = []
+    dropped: List[HistoryRecord] = []
+    
+    def _append(raw):
+        # 添加到记录列表（只保留最近MAX_HISTORY_RECORDS条记录），旧格式的文件同时迁移为紧凑格式
+        existing = decode_history(raw)
+        existing.extend(records)
+        kept[:] = existing[-MAX_HISTORY_RECORDS:]
+        dropped[:] = existing[:-MAX_HISTORY_RECORDS]
+        return encode_history(kept)
+    
+    # 在锁内读取-追加-写回，避免并发保存丢失记录
+    update_json(history_file, _append, default=[])
+    
+    # 增量更新统计汇总，统计页面无需重新扫描历史记录；超出条数被移除的记录不再计入统计
+    record_history_stats(records, history_file)
+    if dropped:
+        refresh_history_days(kept, _record_dates(dropped), history_file)
+
+@timed("history_save")
+def save_history_record(record: Dict[str, Any], history_file: Optional[str] = None) -> bool:
     """
     保存生成记录到历史文件
     
     Args:
         record (Dict[str, Any]): 生成记录数据
+        history_file (Optional[str]): 历史记录文件路径，默认为HISTORY_FILE
         
     Returns:
         bool: 保存成功返回True，否则返回False
     """
     try:
-        # 确保data目录存在
-        os.makedirs("data", exist_ok=True)
-        
-        # 读取现有记录
-        records = load_history_records()
-        
         # 添加时间戳
         record["timestamp"] = datetime.now().isoformat()
-        
-        # 添加到记录列表
-        records.append(record)
-        
-        # 保存到文件（只保留最近100条记录）
-        with open(HISTORY_FILE, "w", encoding="utf-8") as f:
-            json.dump(records[-100:], f, ensure_ascii=False, indent=2)
-        
+        _append_records([record], history_file or HISTORY_FILE)
         return True
     except Exception as e:
-        print(f"保存历史记录时出错: {e}")
+        logger.error("保存历史记录时出错: %s", e)
         return False
 
-def load_history_records() -> List[Dict[str, Any]]:
+def queue_history_record(record: Dict[str, Any], history_file: Optional[str] = None) -> None:
     """
-    从文件加载历史记录
+    把生成记录交给后台写入队列后立即返回（页面使用，不等待写盘）
     
+    短时间内的多条记录合并为一次写入；写入前load_history_records也能读到这些记录。
+    
+    Args:
+        record (Dict[str, Any]): 生成记录数据
+        history_file (Optional[str]): 历史记录文件路径，默认为HISTORY_FILE
+    """
+    record["timestamp"] = datetime.now().isoformat()
+    WRITE_QUEUE.append(history_file or HISTORY_FILE, record, _append_records)
+
+@timed("history_load")
+def load_history_records(history_file: Optional[str] = None) -> List[HistoryRecord]:
+    """
+    从文件加载历史记录（包括后台队列中尚未写盘的记录）
+    
+    Args:
+        history_file (Optional[str]): 历史记录文件路径，默认为HISTORY_FILE
+        
     Returns:
-        List[Dict[str, Any]]: 历史记录列表
+        List[HistoryRecord]: 历史记录列表，支持record.get("date")等字典式读取
     """
     try:
-        if os.path.exists(HISTORY_FILE):
-            with open(HISTORY_FILE, "r", encoding="utf-8") as f:
-                return json.load(f)
-        else:
-            return []
+        records = decode_history(read_json(history_file or HISTORY_FILE, default=[]))
+        pending = WRITE_QUEUE.pending_items(history_file or HISTORY_FILE)
+        if pending:
+            # 正在写入的记录可能已经落盘，按时间戳去重
+            saved = {record.timestamp for record in records}
+            records.extend(HistoryRecord.from_dict(record) for record in pending
+                           if record.get("timestamp") not in saved)
+            records = records[-MAX_HISTORY_RECORDS:]
+        return records
     except Exception as e:
-        print(f"加载历史记录时出错: {e}")
+        logger.error("加载历史记录时出错: %s", e)
         return []
 
-def clear_history_records() -> bool:
+@timed("history_delete")
+def clear_history_records(history_file: Optional[str] = None) -> bool:
     """
     清空历史记录
     
+    Args:
+        history_file (Optional[str]): 历史记录文件路径，默认为HISTORY_FILE
+        
     Returns:
-        bool: 清空成功返回True，否则返回False
+        bool: 清空成功返回True，否则返回False（包括等待后台写入超时）
     """
     try:
-        if os.path.exists(HISTORY_FILE):
-            os.remove(HISTORY_FILE)
+        # 先写完排队中的记录，避免清空后又被写回
+        if not WRITE_QUEUE.flush(timeout=FLUSH_TIMEOUT):
+            logger.error("等待后台写入超时，未清空历史记录")
+            return False
+        remove_file(history_file or HISTORY_FILE)
+        clear_history_stats(history_file or HISTORY_FILE)
+        return True
+    except Exception as e:
+        logger.error("清空历史记录时出错: %s", e)
+        return False
+
+@timed("history_delete")
+def delete_history_records(timestamps: Iterable[str], history_file: Optional[str] = None) -> bool:
+    """
+    按时间戳删除历史记录
+    
+    Args:
+        timestamps (Iterable[str]): 要删除的记录时间戳
+        history_file (Optional[str]): 历史记录文件路径，默认为HISTORY_FILE
+        
+    Returns:
+        bool: 删除成功返回True，否则返回False（包括等待后台写入超时）
+    """
+    try:
+        timestamps = set(timestamps)
+        if not WRITE_QUEUE.flush(timeout=FLUSH_TIMEOUT):
+            logger.error("等待后台写入超时，未删除历史记录")
+            return False
+        
+        remaining: List[HistoryRecord] = []
+        removed: List[HistoryRecord] = []
+        
+        def _remove(raw):
+            records = decode_history(raw)
+            remaining[:] = [record for record in records if record.timestamp not in timestamps]
+            removed[:] = [record for record in records if record.timestamp in timestamps]
+            return encode_history(remaining)
+        
+        # 在锁内基于文件中的最新记录删除，不会覆盖其他会话刚保存的记录
+        update_json(history_file or HISTORY_FILE, _remove, default=[])
+        # 被删除的日期不再计入统计（同一天还有其他记录时以剩余的最后一条为准）
+        refresh_history_days(remaining, _record_dates(removed), history_file or HISTORY_FILE)
         return True
     except Exception as e:
-        print(f"清空历史记录时出错: {e}")
+        logger.error("删除历史记录时出错: %s", e)
         return False
 
-def format_history_record(record: Dict[str, Any]) -> str:
+def format_history_record(record: HistoryRecord) -> str:
     """
     格式化历史记录为显示文本
     
     Args:
-        record (Dict[str, Any]): 历史记录数据
+        record (HistoryRecord): 历史记录数据（也可以是旧格式的字典）
         
     Returns:
         str: 格式化后的显示文本
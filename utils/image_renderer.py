@@ -0,0 +1,498 @@
+"""
+在服务器端把温馨提醒绘制为PNG图片（不需要浏览器）
+
+网页中的"下载为图片"在家长手机上用html2canvas截图，低端手机上很慢，且依赖CDN上的脚本。
+这里用Pillow按解析后的提醒内容直接绘制图片，图片按内容哈希缓存在 output/ 中网页文件的旁边，
+同一份提醒只绘制一次，之后所有家长的请求都直接读取缓存文件。
+
+Pillow是可选依赖（pip install Pillow），未安装时抛出ImageRenderError，网页中的下载按钮仍可使用。
+中文字体依次使用 fonts/ 目录中另外放入的字体、常见的系统中文字体和随仓库附带的
+Noto Sans CJK SC子集字体（GB2312字符集，SIL OFL 1.1授权）。
+"""
+import io
+import os
+import re
+import hashlib
+import logging
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from utils.errors import ImageRenderError
+from utils.metrics import timed, increment
+from utils.mobile_page_generator import parse_reminder_content
+from utils.reminder_formats import strip_emoji
+from utils.storage import write_bytes
+from utils.term_calendar import WEEKDAY_NAMES
+
+logger = logging.getLogger(__name__)
+
+# 字体目录（另外放入的字体优先于系统字体）
+FONTS_DIR = 'fonts'
+FONT_EXTENSIONS = ('.ttf', '.ttc', '.otf')
+
+# 随仓库附带的字体（Noto Sans CJK SC的GB2312子集），找不到其他中文字体时使用
+BUNDLED_FONT = 'NotoSansCJKsc-Regular-Subset.otf'
+
+# 常见的系统中文字体（Linux、macOS、Windows）
+SYSTEM_FONTS = (
+    '/usr/share/fonts/opentype/noto/NotoSansCJK-Regular.ttc',
+    '/usr/share/fonts/noto-cjk/NotoSansCJK-Regular.ttc',
+    '/usr/share/fonts/google-noto-cjk/NotoSansCJK-Regular.ttc',
+    '/usr/share/fonts/truetype/wqy/wqy-microhei.ttc',
+    '/usr/share/fonts/wqy-microhei/wqy-microhei.ttc',
+    '/usr/share/fonts/truetype/wqy/wqy-zenhei.ttc',
+    '/System/Library/Fonts/PingFang.ttc',
+    '/System/Library/Fonts/STHeiti Medium.ttc',
+    'C:/Windows/Fonts/msyh.ttc',
+    'C:/Windows/Fonts/simhei.ttf',
+)
+
+# 绘制样式的版本号，修改图片样式后递增，已缓存的图片随之失效
+IMAGE_RENDER_VERSION = 2
+
+# 按手机屏幕宽度（375像素）的2倍绘制
+SCALE = 2
+IMAGE_WIDTH = 375 * SCALE
+PAGE_PADDING = 12 * SCALE
+CARD_PADDING = 14 * SCALE
+CARD_GAP = 12 * SCALE
+CARD_RADIUS = 12 * SCALE
+CHIP_GAP = 6 * SCALE
+LINE_SPACING = 1.5
+
+# 字号
+FONT_SIZES = {
+    "title": 22 * SCALE,
+    "date": 17 * SCALE,
+    "card_title": 19 * SCALE,
+    "text": 16 * SCALE,
+    "chip": 15 * SCALE,
+    "badge": 10 * SCALE,
+}
+
+# 颜色（与 templates/image_template.html 的样式一致）
+COLORS = {
+    "background": "#f8f4ff",
+    "card": "#ffffff",
+    "text": "#333333",
+    "accent": "#ff6b6b",
+    "course": "#c2e9fb",
+    "duty": "#d4fc79",
+    "leader": "#ff9a9e",
+    "notice": "#fff59d",
+    "notice_text": "#5d4037",
+    "highlight": "#d32f2f",
+}
+
+# 日期栏按星期使用不同的渐变色（星期一到星期日）
+DATE_GRADIENTS = (
+    ("#ff9a9e", "#fad0c4"),
+    ("#a1c4fd", "#c2e9fb"),
+    ("#d4fc79", "#96e6a1"),
+    ("#f6d365", "#fda085"),
+    ("#84fab0", "#8fd3f4"),
+    ("#ffecd2", "#fcb69f"),
+    ("#a6c0fe", "#f68084"),
+)
+
+# 注意事项中书名号的内容高亮显示
+HIGHLIGHT_PATTERN = re.compile(r'(《.*?》)')
+
+# 一行文字中的片段：(文字, 颜色)
+Run = Tuple[str, str]
+
+
+def _require_pillow():
+    """导入Pillow，未安装时抛出ImageRenderError"""
+    try:
+        from PIL import Image, ImageDraw, ImageFont
+    except ImportError as e:
+        raise ImageRenderError('生成图片需要安装Pillow（pip install Pillow），也可以使用网页中的"下载为图片"按钮') from e
+    return Image, ImageDraw, ImageFont
+
+
+def find_font_file(fonts_dir: Optional[str] = None) -> Optional[str]:
+    """
+    查找绘制图片使用的中文字体
+
+    Args:
+        fonts_dir (Optional[str]): 字体目录，默认为FONTS_DIR
+
+    Returns:
+        Optional[str]: 依次为字体目录中按文件名排序的第一个另外放入的字体、第一个存在的系统中文字体、
+            附带的子集字体（字符更全的字体优先），都没有时为None
+    """
+    fonts_dir = fonts_dir or FONTS_DIR
+    if os.path.isdir(fonts_dir):
+        for name in sorted(os.listdir(fonts_dir)):
+            if name.lower().endswith(FONT_EXTENSIONS) and name != BUNDLED_FONT:
+                return os.path.join(fonts_dir, name)
+    for path in SYSTEM_FONTS:
+        if os.path.exists(path):
+            return path
+    bundled = os.path.join(fonts_dir, BUNDLED_FONT)
+    return bundled if os.path.exists(bundled) else None
+
+
+def check_image_support() -> Optional[str]:
+    """
+    检查能否绘制图片（只检查Pillow和字体，不绘制）
+
+    Returns:
+        Optional[str]: 可以绘制时为None，否则为原因说明
+    """
+    try:
+        _require_pillow()
+    except ImageRenderError as e:
+        return str(e)
+    if find_font_file() is None:
+        return f"找不到中文字体，请把字体文件（.ttf/.ttc/.otf）放入 {FONTS_DIR}/ 目录"
+    return None
+
+
+@lru_cache(maxsize=None)
+def _load_fonts(font_file: str) -> Dict[str, Any]:
+    """按字号加载字体（进程内只加载一次）"""
+    _, _, ImageFont = _require_pillow()
+    try:
+        return {name: ImageFont.truetype(font_file, size) for name, size in FONT_SIZES.items()}
+    except OSError as e:
+        raise ImageRenderError(f"无法读取字体文件 {font_file}: {e}") from e
+
+
+class _Painter:
+    """
+    按从上到下的顺序排版；draw为None时只计算高度，不绘制
+    """
+
+    def __init__(self, image, draw, fonts: Dict[str, Any]):
+        self.image = image
+        self.draw = draw
+        self.fonts = fonts
+
+    def measuring(self) -> "_Painter":
+        """只计算高度的排版器"""
+        return _Painter(None, None, self.fonts)
+
+    def line_height(self, font: str) -> int:
+        return int(FONT_SIZES[font] * LINE_SPACING)
+
+    def text(self, xy: Tuple[int, int], text: str, font: str, fill: str, bold: bool = False,
+             anchor: str = "la") -> None:
+        if self.draw is not None:
+            # 只有一个字体文件，粗体用描边模拟
+            self.draw.text(xy, text, font=self.fonts[font], fill=fill, anchor=anchor,
+                           stroke_width=1 if bold else 0, stroke_fill=fill)
+
+    def box(self, box: Tuple[int, int, int, int], radius: int, fill: str) -> None:
+        if self.draw is not None:
+            self.draw.rounded_rectangle(box, radius, fill=fill)
+
+    def gradient_box(self, box: Tuple[int, int, int, int], radius: int, colors: Tuple[str, str]) -> None:
+        """从左到右的渐变圆角矩形"""
+        if self.draw is None:
+            return
+        from PIL import Image, ImageDraw, ImageColor
+
+        left, top, right, bottom = box
+        width, height = right - left, bottom - top
+        start, end = ImageColor.getrgb(colors[0]), ImageColor.getrgb(colors[1])
+        gradient = Image.new("RGB", (width, height))
+        gradient_draw = ImageDraw.Draw(gradient)
+        for x in range(width):
+            ratio = x / max(width - 1, 1)
+            gradient_draw.line([(x, 0), (x, height)],
+                               fill=tuple(int(s + (e - s) * ratio) for s, e in zip(start, end)))
+        mask = Image.new("L", (width, height), 0)
+        ImageDraw.Draw(mask).rounded_rectangle((0, 0, width - 1, height - 1), radius, fill=255)
+        self.image.paste(gradient, (left, top), mask)
+
+    def wrap(self, runs: List[Run], font: str, width: int) -> List[List[Run]]:
+        """按宽度逐字折行（中文没有空格分词）"""
+        measure = self.fonts[font].getlength
+        lines: List[List[Run]] = [[]]
+        line_width = 0.0
+        for text, fill in runs:
+            for char in text:
+                if char == '\n':
+                    lines.append([])
+                    line_width = 0.0
+                    continue
+                char_width = measure(char)
+                if line_width + char_width > width and lines[-1]:
+                    lines.append([])
+                    line_width = 0.0
+                line = lines[-1]
+                if line and line[-1][1] == fill:
+                    line[-1] = (line[-1][0] + char, fill)
+                else:
+                    line.append((char, fill))
+                line_width += char_width
+        return lines
+
+    def paragraph(self, x: int, y: int, width: int, runs: List[Run], font: str,
+                  bold: bool = False, center: bool = False) -> int:
+        """绘制自动折行的段落，返回段落下方的y坐标"""
+        measure = self.fonts[font].getlength
+        line_height = self.line_height(font)
+        for line in self.wrap(runs, font, width):
+            offset = x
+            if center:
+                offset += int((width - sum(measure(text) for text, _ in line)) / 2)
+            for text, fill in line:
+                self.text((offset, y), text, font, fill, bold)
+                offset += int(measure(text))
+            y += line_height
+        return y
+
+    def chips(self, x: int, y: int, width: int, items: List[Tuple[str, str, Optional[str]]], font: str) -> int:
+        """
+        绘制自动换行的标签（课程、值日生），返回下方的y坐标
+
+        items中每项为(文字, 背景色, 角标)，角标为None时不显示
+        """
+        measure = self.fonts[font].getlength
+        badge_measure = self.fonts["badge"].getlength
+        pad_x, pad_y = 9 * SCALE, 4 * SCALE
+        chip_height = FONT_SIZES[font] + 2 * pad_y
+        left = x
+        for text, fill, badge in items:
+            chip_width = int(measure(text)) + 2 * pad_x
+            badge_width = int(badge_measure(badge)) + 8 * SCALE if badge else 0
+            if left > x and left + chip_width + badge_width > x + width:
+                left = x
+                y += chip_height + CHIP_GAP
+            self.box((left, y, left + chip_width + badge_width, y + chip_height), chip_height // 2, fill)
+            # 按垂直居中对齐，不受字体上下留白的影响
+            self.text((left + pad_x, y + chip_height // 2), text, font, COLORS["text"], anchor="lm")
+            if badge:
+                badge_left = left + chip_width - pad_x // 2
+                badge_top = y + (chip_height - FONT_SIZES["badge"]) // 2 - 2 * SCALE
+                self.box((badge_left, badge_top, badge_left + badge_width - 2 * SCALE,
+                          badge_top + FONT_SIZES["badge"] + 4 * SCALE), 6 * SCALE, COLORS["leader"])
+                self.text((badge_left + 3 * SCALE, badge_top + FONT_SIZES["badge"] // 2 + 2 * SCALE), badge, "badge",
+                          COLORS["card"], anchor="lm")
+            left += chip_width + badge_width + CHIP_GAP
+        return y + chip_height
+
+    def card(self, y: int, title: str, body: Callable[["_Painter", int, int, int], int]) -> int:
+        """
+        绘制白色卡片（标题 + 内容），返回卡片下方的y坐标
+
+        body(painter, x, y, width) 绘制卡片内容并返回内容下方的y坐标
+        """
+        x = PAGE_PADDING + CARD_PADDING
+        width = IMAGE_WIDTH - 2 * x
+        content_top = y + CARD_PADDING + self.line_height("card_title")
+        # 先排版一次计算卡片高度，再画背景和内容
+        bottom = body(self.measuring(), x, content_top, width) + CARD_PADDING
+        self.box((PAGE_PADDING, y, IMAGE_WIDTH - PAGE_PADDING, bottom), CARD_RADIUS, COLORS["card"])
+        self.text((x, y + CARD_PADDING), title, "card_title", COLORS["accent"], bold=True)
+        body(self, x, content_top, width)
+        return bottom + CARD_GAP
+
+
+def _layout(painter: _Painter, reminder_info: Dict[str, Any]) -> int:
+    """
+    按网页的顺序排版整张图片
+
+    Args:
+        painter (_Painter): 排版器
+        reminder_info (Dict[str, Any]): parse_reminder_content解析出的提醒信息
+
+    Returns:
+        int: 图片高度
+    """
+    width = IMAGE_WIDTH - 2 * PAGE_PADDING
+    y = PAGE_PADDING + 4 * SCALE
+
+    # 标题
+    class_name = strip_emoji(reminder_info.get('class_name') or '') or '乐知班'
+    y = painter.paragraph(PAGE_PADDING, y, width, [(f"{class_name}明日温馨提醒", COLORS["accent"])],
+                          "title", bold=True, center=True) + 4 * SCALE
+
+    # 日期栏
+    weekday = reminder_info.get('weekday', '')
+    colors = DATE_GRADIENTS[WEEKDAY_NAMES.index(weekday)] if weekday in WEEKDAY_NAMES else DATE_GRADIENTS[1]
+    date_text = f"{reminder_info.get('date', '')} {weekday}".strip()
+    date_height = painter.line_height("date") + 2 * 10 * SCALE
+    painter.gradient_box((PAGE_PADDING, y, IMAGE_WIDTH - PAGE_PADDING, y + date_height), CARD_RADIUS, colors)
+    painter.paragraph(PAGE_PADDING, y + 10 * SCALE, width, [(date_text, COLORS["card"])], "date",
+                      bold=True, center=True)
+    y += date_height + CARD_GAP
+
+    # 特别注意事项
+    notes = [strip_emoji(note) for note in reminder_info.get('special_notes') or []]
+    if notes:
+        note_runs = [
+            [("・", COLORS["accent"])] + [
+                (part, COLORS["highlight"] if HIGHLIGHT_PATTERN.fullmatch(part) else COLORS["notice_text"])
+                for part in HIGHLIGHT_PATTERN.split(note) if part
+            ]
+            for note in notes
+        ]
+
+        def notice_body(p: _Painter, x: int, top: int, w: int) -> int:
+            border, pad = 4 * SCALE, 10 * SCALE
+
+            def write_notes(target: _Painter) -> int:
+                line_top = top + pad
+                for runs in note_runs:
+                    line_top = target.paragraph(x + border + pad, line_top, w - border - 2 * pad, runs, "text")
+                return line_top + pad
+
+            # 黄色背景的高度取决于折行后的行数，先排版一次再绘制
+            bottom = write_notes(p.measuring())
+            p.box((x, top, x + w, bottom), 8 * SCALE, COLORS["notice"])
+            p.box((x, top, x + border, bottom), 0, COLORS["accent"])
+            write_notes(p)
+            return bottom
+
+        y = painter.card(y, "特别注意事项", notice_body)
+
+    # 天气
+    weather = reminder_info.get('weather') or ''
+    y = painter.card(y, "明日天气", lambda p, x, top, w: p.paragraph(x, top, w, [(weather, COLORS["text"])], "text"))
+
+    # 课程安排
+    periods = [(label, courses) for label, courses in
+               (("上午", reminder_info.get('morning_courses')), ("下午", reminder_info.get('afternoon_courses')))
+               if courses]
+    if periods:
+        def courses_body(p: _Painter, x: int, top: int, w: int) -> int:
+            for label, courses in periods:
+                top = p.paragraph(x, top, w, [(f"{label}：", COLORS["accent"])], "chip", bold=True)
+                top = p.chips(x, top, w, [(course, COLORS["course"], None) for course in courses], "chip")
+                top += CHIP_GAP
+            return top - CHIP_GAP
+
+        y = painter.card(y, "明日课程安排", courses_body)
+
+    # 社团安排
+    clubs = reminder_info.get('clubs') or []
+    if clubs:
+        def clubs_body(p: _Painter, x: int, top: int, w: int) -> int:
+            for club in clubs:
+                top = p.paragraph(x, top, w, [(f"{club['name']}：", COLORS["accent"]),
+                                              (club['members'], COLORS["text"])], "text")
+            return top
+
+        y = painter.card(y, "社团课程安排", clubs_body)
+
+    # 值日生安排
+    duty = reminder_info.get('duty_students') or []
+    if duty:
+        chips = [(student['name'], COLORS["duty"], "组长" if student['is_leader'] else None) for student in duty]
+    else:
+        chips = [("明日无值日生安排", COLORS["duty"], None)]
+    y = painter.card(y, "值日生安排", lambda p, x, top, w: p.chips(x, top, w, chips, "chip"))
+
+    # 着装提醒
+    dress_code = reminder_info.get('dress_code') or ''
+    if dress_code:
+        y = painter.card(y, "着装提醒",
+                         lambda p, x, top, w: p.paragraph(x, top, w, [(dress_code, COLORS["text"])], "text"))
+
+    return y - CARD_GAP + PAGE_PADDING
+
+
+@timed("image_render")
+def render_reminder_png(reminder_info: Dict[str, Any], font_file: Optional[str] = None) -> bytes:
+    """
+    把提醒内容绘制为PNG图片
+
+    emoji在中文字体中没有字形，绘制前会去掉。
+
+    Args:
+        reminder_info (Dict[str, Any]): parse_reminder_content解析出的提醒信息
+        font_file (Optional[str]): 字体文件，默认由find_font_file查找
+
+    Returns:
+        bytes: PNG图片内容
+
+    Raises:
+        ImageRenderError: 未安装Pillow或找不到可用的中文字体
+    """
+    Image, ImageDraw, _ = _require_pillow()
+    font_file = font_file or find_font_file()
+    if font_file is None:
+        raise ImageRenderError(check_image_support())
+    fonts = _load_fonts(font_file)
+
+    height = _layout(_Painter(None, None, fonts), reminder_info)
+    image = Image.new("RGB", (IMAGE_WIDTH, height), COLORS["background"])
+    _layout(_Painter(image, ImageDraw.Draw(image), fonts), reminder_info)
+
+    buffer = io.BytesIO()
+    image.save(buffer, "PNG", optimize=True)
+    return buffer.getvalue()
+
+
+def image_hash(reminder_text: str) -> str:
+    """
+    图片缓存使用的内容哈希（包含绘制样式的版本号）
+
+    Args:
+        reminder_text (str): 温馨提醒文本内容
+
+    Returns:
+        str: 16位十六进制哈希值
+    """
+    content = f"{IMAGE_RENDER_VERSION}\n{reminder_text}"
+    return hashlib.sha1(content.encode('utf-8')).hexdigest()[:16]
+
+
+def get_image_path(reminder_text: str, target_date, output_dir: str = 'output') -> str:
+    """
+    获取提醒图片的缓存文件路径（与网页文件位于同一目录）
+
+    Args:
+        reminder_text (str): 温馨提醒文本内容
+        target_date (date): 目标日期
+        output_dir (str): 输出目录
+
+    Returns:
+        str: 图片文件路径，如 output/lezhiban_reminder_20250902_<哈希>.png
+    """
+    filename = f'lezhiban_reminder_{target_date.strftime("%Y%m%d")}_{image_hash(reminder_text)}.png'
+    return os.path.join(output_dir, filename)
+
+
+def get_or_render_reminder_image(reminder_text: str, target_date=None, output_dir: str = 'output',
+                                 reminder_info: Optional[Dict[str, Any]] = None) -> Tuple[bytes, str]:
+    """
+    读取已缓存的提醒图片，没有时绘制并保存
+
+    同一日期不同内容的图片（例如不同班级、个人提醒）各自缓存，互不删除；
+    过期的图片由output_archive.archive_old_outputs清理。
+
+    Args:
+        reminder_text (str): 温馨提醒文本内容
+        target_date (date): 目标日期，为None时使用明天
+        output_dir (str): 输出目录
+        reminder_info (Optional[Dict[str, Any]]): 已解析的提醒信息，为None时解析reminder_text
+
+    Returns:
+        Tuple[bytes, str]: (PNG图片内容, 图片文件路径)
+
+    Raises:
+        ImageRenderError: 需要绘制时未安装Pillow或找不到可用的中文字体
+    """
+    if target_date is None:
+        target_date = datetime.now().date() + timedelta(days=1)
+    file_path = get_image_path(reminder_text, target_date, output_dir)
+    try:
+        with open(file_path, 'rb') as f:
+            content = f.read()
+        increment("image_cache_hits")
+        return content, file_path
+    except OSError:
+        increment("image_cache_misses")
+
+    if reminder_info is None:
+        reminder_info = parse_reminder_content(reminder_text)
+    content = render_reminder_png(reminder_info)
+    with timed("image_write"):
+        write_bytes(file_path, content)
+    return content, file_path
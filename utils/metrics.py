@@ -0,0 +1,137 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Any, Iterator, Optional
+
+from utils.storage import write_text
+
+# Prometheus文本格式导出文件（可配合node_exporter的textfile采集器使用）
+METRICS_FILE = 'data/metrics.prom'
+# 导出指标名称前缀
+METRIC_PREFIX = 'lezhiban'
+
+# 各阶段的耗时统计：阶段 -> {"count", "total", "max", "last"}（秒）
+_timings: Dict[str, Dict[str, float]] = {}
+# 计数器：名称 -> 值
+_counters: Dict[str, int] = {}
+_lock = threading.Lock()
+
+
+@contextmanager
+def timed(stage: str) -> Iterator[None]:
+    """
+    记录一个阶段的耗时，可用作with语句或函数装饰器
+
+    统计在进程内所有会话间共享，开销只有两次计时和一次加锁。
+
+    Args:
+        stage (str): 阶段名称，如 "weather_http"
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_timing(stage, time.perf_counter() - start)
+
+
+def record_timing(stage: str, seconds: float) -> None:
+    """
+    记录一次阶段耗时
+
+    Args:
+        stage (str): 阶段名称
+        seconds (float): 耗时（秒）
+    """
+    with _lock:
+        stats = _timings.get(stage)
+        if stats is None:
+            stats = _timings[stage] = {"count": 0, "total": 0.0, "max": 0.0, "last": 0.0}
+        stats["count"] += 1
+        stats["total"] += seconds
+        stats["last"] = seconds
+        if seconds > stats["max"]:
+            stats["max"] = seconds
+
+
+def increment(name: str, amount: int = 1) -> None:
+    """
+    计数器加一
+
+    Args:
+        name (str): 计数器名称，如 "weather_cache_hits"
+        amount (int): 增加的数量
+    """
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + amount
+
+
+def snapshot() -> Dict[str, Any]:
+    """
+    获取当前统计的副本
+
+    Returns:
+        Dict[str, Any]: {"timings": {阶段: 统计}, "counters": {名称: 值}}
+    """
+    with _lock:
+        return {
+            "timings": {stage: dict(stats) for stage, stats in _timings.items()},
+            "counters": dict(_counters),
+        }
+
+
+def reset_metrics() -> None:
+    """清空所有统计"""
+    with _lock:
+        _timings.clear()
+        _counters.clear()
+
+
+def _escape_label(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def render_prometheus(data: Optional[Dict[str, Any]] = None) -> str:
+    """
+    按Prometheus文本格式输出统计
+
+    Args:
+        data (Optional[Dict[str, Any]]): snapshot()的结果，默认读取当前统计
+
+    Returns:
+        str: Prometheus文本格式的指标
+    """
+    data = snapshot() if data is None else data
+    name = f'{METRIC_PREFIX}_stage_duration_seconds'
+    lines = [
+        f'# HELP {name} 各处理阶段的耗时',
+        f'# TYPE {name} summary',
+    ]
+    for stage, stats in sorted(data["timings"].items()):
+        label = f'stage="{_escape_label(stage)}"'
+        lines.append(f'{name}_count{{{label}}} {stats["count"]}')
+        lines.append(f'{name}_sum{{{label}}} {stats["total"]:.6f}')
+
+    max_name = f'{METRIC_PREFIX}_stage_duration_max_seconds'
+    lines += [f'# HELP {max_name} 各处理阶段的最长耗时', f'# TYPE {max_name} gauge']
+    for stage, stats in sorted(data["timings"].items()):
+        lines.append(f'{max_name}{{stage="{_escape_label(stage)}"}} {stats["max"]:.6f}')
+
+    for counter, value in sorted(data["counters"].items()):
+        counter_name = f'{METRIC_PREFIX}_{counter}_total'
+        lines += [f'# TYPE {counter_name} counter', f'{counter_name} {value}']
+    return "\n".join(lines) + "\n"
+
+
+def write_prometheus_file(path: Optional[str] = None) -> str:
+    """
+    把统计写入Prometheus文本文件（原子替换，采集器不会读到半个文件）
+
+    Args:
+        path (Optional[str]): 文件路径，默认为METRICS_FILE
+
+    Returns:
+        str: 写入的文件路径
+    """
+    path = path or METRICS_FILE
+    write_text(path, render_prometheus())
+    return path
@@ -6,7 +6,21 @@
 
 import re
 import os
+import html
+import hashlib
 from datetime import datetime, timedelta
+from utils.metrics import timed
+from utils.output_archive import read_archived_file, archived_location
+from utils.write_behind import WRITE_QUEUE
+from utils.storage import write_text
+from utils.template_registry import TEMPLATES, LAYOUT_TEMPLATE
+
+# 写入网页文件中的提醒内容哈希，用于判断已有文件能否直接复用
+REMINDER_HASH_META = '<meta name="reminder-hash" content="{}">'
+REMINDER_HASH_PATTERN = re.compile(r'<meta name="reminder-hash" content="([0-9a-f]+)">')
+
+# 网页先生成不含特别注意事项的骨架，注意事项卡片的位置保留此占位符，再单独填入
+SPECIAL_NOTES_PLACEHOLDER = '<!-- special-notes -->'
 
 def get_club_emoji(club_name):
     """
@@ -74,6 +88,7 @@ def get_club_emoji(club_name):
     else:
         return "🎯"
 
+@timed("page_parse")
 def parse_reminder_content(reminder_text):
     """
     解析温馨提醒内容，提取各个部分信息
@@ -85,6 +100,7 @@ def parse_reminder_content(reminder_text):
         dict: 解析后的提醒信息字典
     """
     result = {
+        'class_name': '',
         'date': '',
         'weekday': '',
         'weather': '',
@@ -97,6 +113,11 @@ def parse_reminder_content(reminder_text):
         'special_notes': []
     }
     
+    # 提取班级名称
+    title_match = re.search(r'🗓(.*?)明日温馨提醒', reminder_text)
+    if title_match:
+        result['class_name'] = title_match.group(1)
+    
     # 提取日期和星期
     date_match = re.search(r'⏰・\[(.*?)\] \[(.*?)\]⏰', reminder_text)
     if date_match:
@@ -170,7 +191,7 @@ def parse_reminder_content(reminder_text):
     
     return result
 
-def generate_mobile_html(reminder_info, template_path='templates/image_template.html'):
+def generate_mobile_html(reminder_info, template_path=LAYOUT_TEMPLATE):
     """
     根据提醒信息生成适合手机阅读的HTML页面
     
@@ -181,144 +202,265 @@ def generate_mobile_html(reminder_info, template_path='templates/image_template.
     Returns:
         str: 生成的HTML内容
     """
+    skeleton = generate_mobile_html_skeleton(reminder_info, template_path)
+    return fill_special_notes(skeleton, reminder_info['special_notes'], template_path)
+
+def build_special_notes_html(special_notes, template_path=LAYOUT_TEMPLATE):
+    """
+    生成特别注意事项卡片，没有注意事项时为空字符串
+    
+    Args:
+        special_notes (list): 每条注意事项
+        template_path (str): 模板文件路径（片段位于同目录的 partials/ 下）
+        
+    Returns:
+        str: 卡片HTML
+    """
+    if not special_notes:
+        # 没有特别注意事项时隐藏整个卡片
+        return ""
+    notice_item = TEMPLATES.partial('notice_item', template_path)
+    notes_html = ''
+    for note in special_notes:
+        # 注意事项可能来自HTTP接口的请求参数，先转义再高亮显示书名号中的内容
+        note_with_highlight = re.sub(r'《(.*?)》', r'<span class="highlight">《\1》</span>', html.escape(note))
+        notes_html += notice_item.render(note=note_with_highlight)
+    return TEMPLATES.partial('notice', template_path).render(notes=notes_html)
+
+def fill_special_notes(skeleton, special_notes, template_path=LAYOUT_TEMPLATE):
+    """
+    在网页骨架中填入特别注意事项
     
-    # 读取模板文件
-    with open(template_path, 'r', encoding='utf-8') as f:
-        template_content = f.read()
+    Args:
+        skeleton (str): generate_mobile_html_skeleton生成的网页骨架
+        special_notes (list): 每条注意事项
+        template_path (str): 模板文件路径
+        
+    Returns:
+        str: 完整的HTML内容
+    """
+    return skeleton.replace(SPECIAL_NOTES_PLACEHOLDER, build_special_notes_html(special_notes, template_path), 1)
+
+@timed("page_render")
+def generate_mobile_html_skeleton(reminder_info, template_path=LAYOUT_TEMPLATE):
+    """
+    生成不含特别注意事项的网页骨架，注意事项的位置保留占位符
+    
+    Args:
+        reminder_info (dict): 解析后的提醒信息（特别注意事项会被忽略）
+        template_path (str): 模板文件路径
+        
+    Returns:
+        str: 网页骨架
+    """
+    # 模板和片段由注册表预编译并常驻内存，文件修改后自动重新加载
     
     # 构建课程安排HTML
     courses_html = ""
-    if reminder_info['morning_courses'] or reminder_info['afternoon_courses']:
+    periods = [('上午', reminder_info['morning_courses']), ('下午', reminder_info['afternoon_courses'])]
+    if any(courses for _, courses in periods):
+        course_block = TEMPLATES.partial('course_block', template_path)
+        course_item = TEMPLATES.partial('course_item', template_path)
         courses_html += '<div class="course-section">'
-        if reminder_info['morning_courses']:
-            courses_html += '<div class="course-period">'
-            courses_html += '<div class="period-label">上午：</div>'
-            courses_html += '<div class="course-list">'
-            for course in reminder_info['morning_courses']:
-                courses_html += f'<div class="course-item">{course}</div>'
-            courses_html += '</div></div>'
-        
-        if reminder_info['afternoon_courses']:
-            courses_html += '<div class="course-period">'
-            courses_html += '<div class="period-label">下午：</div>'
-            courses_html += '<div class="course-list">'
-            for course in reminder_info['afternoon_courses']:
-                courses_html += f'<div class="course-item">{course}</div>'
-            courses_html += '</div></div>'
+        for period, courses in periods:
+            if courses:
+                courses_html += course_block.render(
+                    period=period,
+                    courses=''.join(course_item.render(course=course) for course in courses)
+                )
         courses_html += '</div>'
     
     # 构建社团安排HTML
-    clubs_html = ""
-    for club in reminder_info['clubs']:
-        club_emoji = get_club_emoji(club["name"])
-        clubs_html += '<div class="club-item">'
-        clubs_html += f'<span class="emoji">{club_emoji}</span>'
-        clubs_html += f'<span><strong>{club["name"]}：</strong>{club["members"]}</span>'
-        clubs_html += '</div>'
+    club_item = TEMPLATES.partial('club_item', template_path)
+    clubs_html = ''.join(
+        club_item.render(emoji=get_club_emoji(club["name"]), name=club["name"], members=club["members"])
+        for club in reminder_info['clubs']
+    )
     
     # 构建值日生安排HTML
-    duty_html = ""
+    duty_item = TEMPLATES.partial('duty_item', template_path)
     if reminder_info['duty_students']:
-        duty_html += '<div class="duty-list">'
-        for duty in reminder_info['duty_students']:
-            leader_class = ' group-leader' if duty['is_leader'] else ''
-            duty_html += f'<div class="duty-item{leader_class}">{duty["name"]}</div>'
-        duty_html += '</div>'
-    
-    # 构建特别注意事项HTML
-    special_html = ""
-    if reminder_info['special_notes']:
-        special_html += '<div class="notice-content">'
-        for note in reminder_info['special_notes']:
-            # 高亮显示书名号中的内容
-            note_with_highlight = re.sub(r'《(.*?)》', r'<span class="highlight">《\1》</span>', note)
-            special_html += f'<span class="emoji">❗️</span> {note_with_highlight} <span class="emoji">☺️</span>'
-        special_html += '</div>'
-    # print(f'special_html: {special_html}')
-    
-    # 替换模板中的占位符
-    html_content = template_content.replace(
-        '<h2><span class="emoji">⏰</span> 9月23日 星期二 </h2>',
-        f'<h2><span class="emoji">⏰</span> {reminder_info["date"]} {reminder_info["weekday"]}</h2>'
-    )
+        duty_html = ''.join(
+            duty_item.render(leader_class=' group-leader' if duty['is_leader'] else '', name=duty["name"])
+            for duty in reminder_info['duty_students']
+        )
+    else:
+        duty_html = duty_item.render(leader_class='', name='明日无值日生安排')
     
-    html_content = html_content.replace(
-        '<span class="emoji">🌧️</span>\n                <span>小雨，低温 25℃~高温 33℃</span>',
-        f'<span class="emoji">{reminder_info["weather_emoji"]}</span>\n                <span>{reminder_info["weather"]}</span>'
+    # 没有班级名称时沿用模板默认的标题
+    class_name = reminder_info.get('class_name') or '乐知班'
+    header_html = TEMPLATES.partial('header', template_path).render(
+        class_name=class_name, date=reminder_info["date"], weekday=reminder_info["weekday"]
     )
     
-    html_content = html_content.replace(
-        '<div class="course-section">\n                <div class="course-period">\n                    <div class="period-label">上午：</div>\n                    <div class="course-list">\n                        <div class="course-item">数学</div>\n                        <div class="course-item">语文</div>\n                        <div class="course-item">书法</div>\n                        <div class="course-item">道德与法治</div>\n                    </div>\n                </div>\n                <div class="course-period">\n                    <div class="period-label">下午：</div>\n                    <div class="course-list">\n                        <div class="course-item">体育</div>\n                        <div class="course-item">音乐</div>\n                        <div class="course-item">数学作业辅导</div>\n                        <div class="course-item">经典领读</div>\n                    </div>\n                </div>\n            </div>',
-        courses_html
+    # 特别注意事项卡片先留占位符，由fill_special_notes填入
+    return TEMPLATES.layout(template_path).render(
+        class_name=class_name,
+        header=header_html,
+        notice=SPECIAL_NOTES_PLACEHOLDER,
+        weather_emoji=reminder_info["weather_emoji"],
+        # 天气可以由HTTP接口的请求参数指定，需要转义
+        weather=html.escape(reminder_info["weather"]),
+        courses=courses_html,
+        clubs=clubs_html,
+        duty=duty_html,
+        dress_code=reminder_info["dress_code"],
     )
+
+def reminder_hash(reminder_text):
+    """
+    计算提醒内容的哈希值
     
-    html_content = html_content.replace(
-        '<div class="club-item">\n                <span class="emoji">🥋</span>\n                <span><strong>武术：</strong>夏润修</span>\n            </div>',
-        clubs_html
-    )
+    Args:
+        reminder_text (str): 温馨提醒文本内容
+        
+    Returns:
+        str: 16位十六进制哈希值
+    """
+    return hashlib.sha1(reminder_text.encode('utf-8')).hexdigest()[:16]
+
+def get_output_path(target_date, output_dir='output'):
+    """
+    获取指定日期的网页文件路径
     
-    html_content = html_content.replace(
-        '<div class="duty-list">\n                <div class="duty-item group-leader">周致远</div>\n                <div class="duty-item">苏心怡</div>\n                <div class="duty-item">徐之妍</div>\n                <div class="duty-item">徐之恒</div>\n                <div class="duty-item">余书洛</div>\n                <div class="duty-item">王赟艺</div>\n                <div class="duty-item">王宸亿</div>\n                <div class="duty-item">郑子其</div>\n            </div>',
-        duty_html
-    )
+    Args:
+        target_date (date): 目标日期
+        output_dir (str): 输出目录
+        
+    Returns:
+        str: 网页文件路径
+    """
+    filename = f'lezhiban_reminder_{target_date.strftime("%Y%m%d")}.html'
+    return os.path.join(output_dir, filename)
+
+@timed("page_load")
+def load_mobile_page(reminder_text, target_date, output_dir='output'):
+    """
+    读取已生成的网页文件，仅当文件对应同一份提醒内容时返回
     
-    html_content = html_content.replace(
-        '<p>干净舒适即可</p>',
-        f'<p>{reminder_info["dress_code"]}</p>'
-    )
+    后台队列中尚未写盘的网页优先返回；输出目录中没有该文件时从按月归档的压缩包中读取。
     
-    if special_html:
-        html_content = html_content.replace(
-            '<div class="notice-content"><span class="emoji">❗️</span>特别注意事项</div>',
-            special_html
-        )
-    else:
-        # 如果没有特别注意事项，隐藏整个特别注意事项卡片
-        html_content = html_content.replace(
-            '''<div class="card">
-            <div class="notice-section">
-                <div class="notice-title">
-                    <span class="emoji">⚠️</span>
-                    <span>特别注意事项</span>
-                </div>
-                <div class="notice-content"><span class="emoji">❗️</span>特别注意事项</div>
-            </div>
-        </div>''',
-            special_html
-        )
-    return html_content
+    Args:
+        reminder_text (str): 温馨提醒文本内容
+        target_date (date): 目标日期
+        output_dir (str): 输出目录
+        
+    Returns:
+        tuple: (html_content, file_path)，文件不存在或内容已变化时返回None
+    """
+    file_path = get_output_path(target_date, output_dir)
+    html_content = WRITE_QUEUE.pending_text(file_path)
+    try:
+        if html_content is None:
+            with open(file_path, 'r', encoding='utf-8') as f:
+                html_content = f.read()
+    except OSError:
+        file_name = os.path.basename(file_path)
+        html_content = read_archived_file(output_dir, file_name)
+        if html_content is None:
+            return None
+        file_path = archived_location(output_dir, file_name)
+    
+    match = REMINDER_HASH_PATTERN.search(html_content)
+    if match and match.group(1) == reminder_hash(reminder_text):
+        return html_content, file_path
+    return None
+
+def get_or_generate_mobile_page(reminder_text, target_date, output_dir='output', background=False):
+    """
+    优先复用 output/ 中已写好的网页文件，没有或已过期时再重新生成
+    
+    Args:
+        reminder_text (str): 温馨提醒文本内容
+        target_date (date): 目标日期
+        output_dir (str): 输出目录
+        background (bool): 是否交给后台队列写盘（不等待写入完成）
+        
+    Returns:
+        tuple: (html_content, file_path) 网页内容和文件路径
+    """
+    existing = load_mobile_page(reminder_text, target_date, output_dir)
+    if existing is not None:
+        return existing
+    return generate_mobile_page(reminder_text, target_date, output_dir, background)
+
+def render_mobile_html(reminder_text, reminder_info=None):
+    """
+    生成网页内容（不写文件），并记录对应的提醒内容哈希
+    
+    Args:
+        reminder_text (str): 温馨提醒文本内容
+        reminder_info (dict): 已解析的提醒信息，为None时解析reminder_text
+        
+    Returns:
+        str: 生成的HTML内容
+    """
+    if reminder_info is None:
+        reminder_info = parse_reminder_content(reminder_text)
+    return add_reminder_hash(generate_mobile_html(reminder_info), reminder_text)
 
-def generate_mobile_page(reminder_text, target_date=None):
+def add_reminder_hash(html_content, reminder_text):
+    """
+    在网页中记录对应的提醒内容哈希
+    
+    Args:
+        html_content (str): 网页内容
+        reminder_text (str): 温馨提醒文本内容
+        
+    Returns:
+        str: 带哈希标记的网页内容
+    """
+    return html_content.replace(
+        '<meta charset="UTF-8">',
+        '<meta charset="UTF-8">\n    ' + REMINDER_HASH_META.format(reminder_hash(reminder_text)),
+        1
+    )
+
+def generate_mobile_page(reminder_text, target_date=None, output_dir='output', background=False):
     """
     生成手机网页文件
     
     Args:
         reminder_text (str): 温馨提醒文本内容
         target_date (datetime): 目标日期，如果为None则使用明天
+        output_dir (str): 输出目录，多班级部署时每个班级使用独立目录
+        background (bool): 是否交给后台队列写盘（不等待写入完成）
         
     Returns:
         tuple: (html_content, file_path) 生成的HTML内容和文件路径
     """
-    # 解析提醒内容
-    reminder_info = parse_reminder_content(reminder_text)
-    
     # 生成HTML内容
-    html_content = generate_mobile_html(reminder_info)
+    html_content = render_mobile_html(reminder_text)
     
     # 确定输出文件名
     if target_date is None:
         target_date = datetime.now().date() + timedelta(days=1)
     
-    # 创建输出目录
-    output_dir = 'output'
-    if not os.path.exists(output_dir):
-        os.makedirs(output_dir)
+    return html_content, save_mobile_page(html_content, target_date, output_dir, background)
+
+def save_mobile_page(html_content, target_date, output_dir='output', background=False):
+    """
+    把已生成的网页内容写入输出目录
+    
+    background为True时只把内容交给后台写入队列，同一文件的多次写入只写最后一次。
     
-    # 保存文件
-    filename = f'lezhiban_reminder_{target_date.strftime("%Y%m%d")}.html'
-    file_path = os.path.join(output_dir, filename)
+    Args:
+        html_content (str): 网页内容
+        target_date (date): 目标日期
+        output_dir (str): 输出目录
+        background (bool): 是否交给后台队列写盘（不等待写入完成）
+        
+    Returns:
+        str: 网页文件路径
+    """
+    # 保存文件（写入临时文件后替换，读取方不会读到写了一半的网页；输出目录不存在时自动创建）
+    file_path = get_output_path(target_date, output_dir)
+    
+    if background:
+        WRITE_QUEUE.write_text(file_path, html_content)
+        return file_path
     
-    with open(file_path, 'w', encoding='utf-8') as f:
-        f.write(html_content)
+    with timed("page_write"):
+        write_text(file_path, html_content)
     
-    return html_content, file_path
+    return file_path
@@ -0,0 +1,186 @@
+import os
+import re
+import logging
+import tempfile
+import zipfile
+from datetime import date, datetime, timedelta
+from typing import Dict, Optional, List
+
+from utils.storage import file_lock, copy_target_mode
+
+logger = logging.getLogger(__name__)
+
+# 归档目录（位于输出目录下），每月一个压缩包
+ARCHIVE_DIR = 'archive'
+# 默认保留为普通网页的最近天数
+RETENTION_DAYS = 30
+# 需要归档的输出文件：手机网页和命令行写出的文本提醒
+OUTPUT_FILE_PATTERN = re.compile(r'^lezhiban_reminder_(\d{4})(\d{2})(\d{2})\.(html|txt)$')
+# 服务器端生成的提醒图片（按内容哈希缓存，随时可以重新生成，过期后直接删除而不归档）
+IMAGE_FILE_PATTERN = re.compile(r'^lezhiban_reminder_(\d{4})(\d{2})(\d{2})_[0-9a-f]+\.png$')
+
+
+def get_archive_path(output_dir: str, year: int, month: int) -> str:
+    """
+    获取某月归档压缩包的路径
+
+    Args:
+        output_dir (str): 输出目录
+        year (int): 年
+        month (int): 月
+
+    Returns:
+        str: 压缩包路径，如 output/archive/2025-09.zip
+    """
+    return os.path.join(output_dir, ARCHIVE_DIR, f'{year}-{month:02d}.zip')
+
+
+def _archive_path_for(output_dir: str, file_name: str) -> Optional[str]:
+    """根据输出文件名确定所属月份的压缩包"""
+    match = OUTPUT_FILE_PATTERN.match(file_name)
+    if not match:
+        return None
+    return get_archive_path(output_dir, int(match.group(1)), int(match.group(2)))
+
+
+def _add_to_archive(archive_path: str, files: Dict[str, str]) -> None:
+    """
+    把文件加入压缩包，同名文件以新文件为准
+
+    压缩包写入临时文件后原子替换，中途失败不会损坏已有归档。
+    """
+    os.makedirs(os.path.dirname(archive_path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(archive_path) + '.',
+                                    suffix='.tmp', dir=os.path.dirname(archive_path))
+    os.close(fd)
+    try:
+        with zipfile.ZipFile(tmp_path, 'w', compression=zipfile.ZIP_DEFLATED, compresslevel=9) as target:
+            if os.path.exists(archive_path):
+                with zipfile.ZipFile(archive_path) as source:
+                    for name in source.namelist():
+                        if name not in files:
+                            target.writestr(source.getinfo(name), source.read(name))
+            for name, path in sorted(files.items()):
+                target.write(path, name)
+        copy_target_mode(tmp_path, archive_path)
+        os.replace(tmp_path, archive_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def archive_old_outputs(output_dir: str, keep_days: int = RETENTION_DAYS,
+                        today: Optional[date] = None) -> Dict[str, int]:
+    """
+    把较早日期的网页和文本提醒移入按月压缩的归档
+
+    最近keep_days天（以及未来日期）的文件保留为普通文件；较早日期的提醒图片直接删除。
+
+    Args:
+        output_dir (str): 输出目录
+        keep_days (int): 保留的最近天数
+        today (Optional[date]): 当前日期，默认今天
+
+    Returns:
+        Dict[str, int]: 统计，包含archived（归档的文件数）、archives（更新的压缩包数）和removed_images（删除的图片数）
+    """
+    cutoff = (today or datetime.now().date()) - timedelta(days=keep_days)
+    by_archive: Dict[str, Dict[str, str]] = {}
+    removed_images = 0
+    if os.path.isdir(output_dir):
+        for name in os.listdir(output_dir):
+            image_match = IMAGE_FILE_PATTERN.match(name)
+            if image_match:
+                image_date = date(int(image_match.group(1)), int(image_match.group(2)), int(image_match.group(3)))
+                if image_date < cutoff:
+                    os.remove(os.path.join(output_dir, name))
+                    removed_images += 1
+                continue
+            match = OUTPUT_FILE_PATTERN.match(name)
+            if not match:
+                continue
+            file_date = date(int(match.group(1)), int(match.group(2)), int(match.group(3)))
+            if file_date < cutoff:
+                by_archive.setdefault(_archive_path_for(output_dir, name), {})[name] = os.path.join(output_dir, name)
+
+    archived = 0
+    for archive_path, files in by_archive.items():
+        with file_lock(archive_path):
+            _add_to_archive(archive_path, files)
+            # 归档写入成功后才删除原文件
+            for path in files.values():
+                os.remove(path)
+        archived += len(files)
+        logger.info("已归档 %d 个文件到 %s", len(files), archive_path)
+    return {"archived": archived, "archives": len(by_archive), "removed_images": removed_images}
+
+
+def read_archived_file(output_dir: str, file_name: str) -> Optional[str]:
+    """
+    从归档中读取一个输出文件
+
+    Args:
+        output_dir (str): 输出目录
+        file_name (str): 文件名，如 lezhiban_reminder_20250902.html
+
+    Returns:
+        Optional[str]: 文件内容，未归档时为None
+    """
+    archive_path = _archive_path_for(output_dir, file_name)
+    if archive_path is None or not os.path.exists(archive_path):
+        return None
+    with file_lock(archive_path, shared=True):
+        with zipfile.ZipFile(archive_path) as archive:
+            try:
+                return archive.read(file_name).decode('utf-8')
+            except KeyError:
+                return None
+
+
+def archived_location(output_dir: str, file_name: str) -> str:
+    """
+    归档文件的显示位置，如 output/archive/2025-09.zip:lezhiban_reminder_20250902.html
+
+    Args:
+        output_dir (str): 输出目录
+        file_name (str): 文件名
+
+    Returns:
+        str: 显示位置
+    """
+    return f'{_archive_path_for(output_dir, file_name)}:{file_name}'
+
+
+def list_archived_files(output_dir: str) -> List[str]:
+    """
+    列出归档中的所有输出文件名（读取各压缩包的目录，不解压内容）
+
+    Args:
+        output_dir (str): 输出目录
+
+    Returns:
+        List[str]: 文件名，如 lezhiban_reminder_20250902.html
+    """
+    names = []
+    for archive_path in list_archives(output_dir):
+        with file_lock(archive_path, shared=True):
+            with zipfile.ZipFile(archive_path) as archive:
+                names.extend(archive.namelist())
+    return names
+
+
+def list_archives(output_dir: str) -> List[str]:
+    """
+    列出输出目录中的归档压缩包
+
+    Args:
+        output_dir (str): 输出目录
+
+    Returns:
+        List[str]: 压缩包路径（按月份排序）
+    """
+    archive_dir = os.path.join(output_dir, ARCHIVE_DIR)
+    if not os.path.isdir(archive_dir):
+        return []
+    return [os.path.join(archive_dir, name) for name in sorted(os.listdir(archive_dir)) if name.endswith('.zip')]
@@ -0,0 +1,220 @@
+import os
+import logging
+import threading
+from datetime import date, datetime, timedelta
+from typing import Dict, Any, Optional, Callable, List, Tuple
+
+from utils.class_manager import ClassContext
+from utils.data_manager import load_schedule_data
+from utils.weather_service import get_weather_info
+from utils.reminder_generator import (
+    build_reminder_data, render_reminder_text, splice_special_notes, split_special_notes
+)
+from utils.mobile_page_generator import (
+    parse_reminder_content, generate_mobile_html_skeleton, fill_special_notes, add_reminder_hash
+)
+from utils.term_calendar import WEEKDAY_NAMES, get_schedule_version
+from utils.template_registry import TEMPLATES
+from utils.storage import read_json, update_json
+from utils.metrics import increment
+
+logger = logging.getLogger(__name__)
+
+# 预生成结果目录，每个班级一个文件
+PRECOMPUTE_DIR = 'data/precomputed'
+# 默认预生成的天数（从明天起）
+PRECOMPUTE_DAYS = 7
+
+# 已读取的预生成结果：文件路径 -> (修改时间, 文件大小, 内容)，文件变化时才重新读取
+_loaded: Dict[str, Tuple[int, int, Dict[str, Any]]] = {}
+_loaded_lock = threading.Lock()
+
+
+def get_precompute_path(context: ClassContext) -> str:
+    """
+    获取班级预生成结果的文件路径
+
+    Args:
+        context (ClassContext): 班级上下文
+
+    Returns:
+        str: 文件路径
+    """
+    return os.path.join(PRECOMPUTE_DIR, f'{context.class_id}.json')
+
+
+def precompute_key(context: ClassContext, version: str, target_date: date, weather: str) -> str:
+    """
+    预生成结果的版本键
+
+    课程安排版本号包含学期日历（节假日、调休），模板版本号对应网页骨架使用的模板，
+    任何一项变化都会使预生成结果失效。
+
+    Args:
+        context (ClassContext): 班级上下文
+        version (str): 课程安排版本号
+        target_date (date): 目标日期
+        weather (str): 天气信息
+
+    Returns:
+        str: 版本键
+    """
+    return "|".join((context.name, version, TEMPLATES.version(), target_date.isoformat(), weather))
+
+
+def precompute_reminders(context: ClassContext, start: Optional[date] = None,
+                         days: int = PRECOMPUTE_DAYS,
+                         weather_lookup: Callable[[str, date], str] = get_weather_info) -> List[date]:
+    """
+    预先生成未来几天不含特别注意事项的提醒和网页骨架（适合每晚定时运行）
+
+    Args:
+        context (ClassContext): 班级上下文
+        start (Optional[date]): 开始日期，默认明天
+        days (int): 天数
+        weather_lookup (Callable[[str, date], str]): 查询天气的函数
+
+    Returns:
+        List[date]: 已预生成的日期
+    """
+    start = start or datetime.now().date() + timedelta(days=1)
+    schedule_data = load_schedule_data(context.schedule_file)
+    version = get_schedule_version(schedule_data)
+
+    entries = {}
+    for offset in range(days):
+        target_date = start + timedelta(days=offset)
+        weather = weather_lookup(context.city, target_date)
+        weekday = WEEKDAY_NAMES[target_date.weekday()]
+        data = build_reminder_data(target_date, weekday, weather, schedule_data, "", context.name)
+        text = render_reminder_text(data)
+        entries[target_date.isoformat()] = {
+            "key": precompute_key(context, version, target_date, weather),
+            "text": text,
+            # 不含特别注意事项的结构化提醒数据，命中时其他格式也无需重新生成
+            "data": data,
+            "skeleton": generate_mobile_html_skeleton(parse_reminder_content(text)),
+            "generated_at": datetime.now().isoformat(),
+        }
+
+    def _merge(current):
+        # 只保留今天及以后的结果
+        today = datetime.now().date().isoformat()
+        current = {day: entry for day, entry in current.items() if day >= today}
+        current.update(entries)
+        return current
+
+    update_json(get_precompute_path(context), _merge, default={})
+    logger.info("已预生成 %s 的 %d 天提醒", context.class_id, len(entries))
+    return [start + timedelta(days=offset) for offset in range(days)]
+
+
+def _load_entries(path: str) -> Dict[str, Any]:
+    """读取预生成结果，文件的修改时间和大小不变时直接使用内存中的内容"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return {}
+    signature = (stat.st_mtime_ns, stat.st_size)
+    cached = _loaded.get(path)
+    if cached is not None and cached[:2] == signature:
+        return cached[2]
+
+    try:
+        entries = read_json(path, default={})
+    except Exception as e:
+        logger.warning("读取预生成结果失败: %s", e)
+        return {}
+    with _loaded_lock:
+        _loaded[path] = (signature[0], signature[1], entries)
+    return entries
+
+
+def get_precomputed(context: ClassContext, target_date: date, weather: str,
+                    schedule_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    查找与当前课程安排、天气一致的预生成结果
+
+    Args:
+        context (ClassContext): 班级上下文
+        target_date (date): 目标日期
+        weather (str): 天气信息
+        schedule_data (Dict[str, Any]): 当前课程安排数据
+
+    Returns:
+        Optional[Dict[str, Any]]: 预生成结果，没有或已失效时为None
+    """
+    entry = _load_entries(get_precompute_path(context)).get(target_date.isoformat())
+    # 旧版本生成的结果没有结构化数据，按未命中处理
+    if (entry and "data" in entry
+            and entry.get("key") == precompute_key(context, get_schedule_version(schedule_data), target_date, weather)):
+        increment("precompute_hits")
+        return entry
+    increment("precompute_misses")
+    return None
+
+
+def reminder_from_precomputed(entry: Dict[str, Any], special_notes: str = "") -> str:
+    """
+    在预生成的提醒中插入特别注意事项
+
+    Args:
+        entry (Dict[str, Any]): 预生成结果
+        special_notes (str): 特别注意事项
+
+    Returns:
+        str: 完整的提醒内容
+    """
+    return splice_special_notes(entry["text"], special_notes)
+
+
+def reminder_data_from_precomputed(entry: Dict[str, Any], special_notes: str = "") -> Dict[str, Any]:
+    """
+    在预生成的结构化提醒数据中填入特别注意事项
+
+    Args:
+        entry (Dict[str, Any]): 预生成结果
+        special_notes (str): 特别注意事项
+
+    Returns:
+        Dict[str, Any]: 与build_reminder_data相同的提醒数据（其余字段与预生成结果共用，只读）
+    """
+    return dict(entry["data"], special_notes=split_special_notes(special_notes))
+
+
+def page_from_precomputed(entry: Dict[str, Any], special_notes: str = "") -> str:
+    """
+    在预生成的网页骨架中填入特别注意事项
+
+    Args:
+        entry (Dict[str, Any]): 预生成结果
+        special_notes (str): 特别注意事项
+
+    Returns:
+        str: 完整的网页内容
+    """
+    html_content = fill_special_notes(entry["skeleton"], split_special_notes(special_notes))
+    return add_reminder_hash(html_content, reminder_from_precomputed(entry, special_notes))
+
+
+def build_reminder_content(context: ClassContext, target_date: date, weather: str,
+                           schedule_data: Dict[str, Any], special_notes: str = "") -> Tuple[str, Dict[str, Any]]:
+    """
+    生成提醒内容和结构化的提醒数据：优先使用预生成结果，只重新计算特别注意事项部分
+
+    Args:
+        context (ClassContext): 班级上下文
+        target_date (date): 目标日期
+        weather (str): 天气信息
+        schedule_data (Dict[str, Any]): 课程安排数据
+        special_notes (str): 特别注意事项
+
+    Returns:
+        Tuple[str, Dict[str, Any]]: (提醒内容, build_reminder_data生成的提醒数据)
+    """
+    entry = get_precomputed(context, target_date, weather, schedule_data)
+    if entry is not None:
+        return reminder_from_precomputed(entry, special_notes), reminder_data_from_precomputed(entry, special_notes)
+    weekday = WEEKDAY_NAMES[target_date.weekday()]
+    data = build_reminder_data(target_date, weekday, weather, schedule_data, special_notes, context.name)
+    return render_reminder_text(data), data
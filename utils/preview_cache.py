@@ -0,0 +1,136 @@
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple
+
+# 每个会话最多缓存的网页预览数量
+DEFAULT_MAX_PREVIEWS = 5
+# 共享缓存默认最多保存的条目数量
+DEFAULT_CACHE_SIZE = 256
+
+
+class PreviewCache:
+    """
+    按最近使用顺序淘汰的网页预览缓存（每个会话一个实例）
+
+    缓存项为 (html_content, file_path)，超过容量时淘汰最久未查看的预览，
+    无论老师打开多少条记录，会话占用的内存都有上限。
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_PREVIEWS):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[str, str]]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[Tuple[str, str]]:
+        """
+        获取预览并标记为最近使用
+
+        Args:
+            key (str): 记录键
+
+        Returns:
+            Optional[Tuple[str, str]]: (html_content, file_path)，未缓存时为None
+        """
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    def peek(self, key: str) -> Optional[Tuple[str, str]]:
+        """
+        获取预览但不改变淘汰顺序（列表中逐条显示下载按钮时使用）
+
+        Args:
+            key (str): 记录键
+
+        Returns:
+            Optional[Tuple[str, str]]: (html_content, file_path)，未缓存时为None
+        """
+        return self._entries.get(key)
+
+    def put(self, key: str, html_content: str, file_path: str) -> None:
+        """
+        缓存预览，超出容量时淘汰最久未使用的一项
+
+        Args:
+            key (str): 记录键
+            html_content (str): 网页内容
+            file_path (str): 网页文件路径
+        """
+        self._entries[key] = (html_content, file_path)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def discard(self, key: str) -> None:
+        """
+        移除一项预览（记录被删除时调用）
+
+        Args:
+            key (str): 记录键
+        """
+        self._entries.pop(key, None)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class ResponseCache:
+    """
+    线程安全的提醒缓存，按最近使用顺序淘汰（进程内所有会话和请求共享）
+
+    HTTP接口用它缓存生成的提醒（缓存键包含课程安排版本、天气和特别注意事项），
+    多格式输出用它缓存每种格式的结果。
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Tuple) -> Optional[Dict[str, Any]]:
+        """
+        获取缓存项并标记为最近使用
+
+        Args:
+            key (Tuple): 缓存键
+
+        Returns:
+            Optional[Dict[str, Any]]: 缓存项，未缓存时为None
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key: Tuple, entry: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        保存缓存项，超出容量时淘汰最久未使用的一项；已有同键缓存项时返回已有项
+
+        Args:
+            key (Tuple): 缓存键
+            entry (Dict[str, Any]): 缓存项
+
+        Returns:
+            Dict[str, Any]: 实际保存的缓存项
+        """
+        with self._lock:
+            existing = self._entries.get(key)
+            if existing is not None:
+                self._entries.move_to_end(key)
+                return existing
+            self._entries[key] = entry
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            return entry
+
+    def clear(self) -> None:
+        """清空缓存"""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
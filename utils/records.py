@@ -0,0 +1,369 @@
+"""
+紧凑记录类型：历史记录和天气缓存条目
+
+磁盘上使用带版本号的紧凑格式（短键、ISO日期），内存中使用带 __slots__ 的记录对象：
+
+- 历史记录不再保存可由日期推算的星期和格式化日期，天气与提醒内容中的天气一致时也不重复保存
+- 星期使用进程内共享（intern）的字符串
+- 记录对象支持 record.get("date") / record["reminder_content"] 等旧的字典式读取
+
+旧格式（字典列表 / 以完整字段名保存的缓存条目）读取时自动转换，下次写入时保存为新格式；
+也可以用 migrate_history_file 一次性迁移。
+"""
+import re
+import sys
+from datetime import date, datetime, timedelta
+from typing import Dict, Any, List, Optional, Iterable, Union
+
+from utils.storage import update_json
+from utils.term_calendar import WEEKDAY_NAMES
+
+# 紧凑格式版本号
+HISTORY_FORMAT_VERSION = 2
+WEATHER_FORMAT_VERSION = 2
+
+# 星期名称（共享字符串，按date.weekday()索引）
+WEEKDAYS = tuple(sys.intern(name) for name in WEEKDAY_NAMES)
+
+# 提醒内容中的天气行
+WEATHER_LINE_PATTERN = re.compile(r'明日天气：\n・([^\n]*)')
+
+# 旧格式历史记录的日期，例如 "2025年09月28日"
+LEGACY_DATE_PATTERN = re.compile(r'^(\d{4})年(\d{1,2})月(\d{1,2})日$')
+
+# 历史记录的字段（旧格式字段名）
+HISTORY_FIELDS = ("date", "weekday", "weather", "special_notes", "reminder_content", "timestamp")
+
+
+def _format_date(day: date) -> str:
+    """格式化为历史记录使用的日期写法"""
+    return f"{day.year:04d}年{day.month:02d}月{day.day:02d}日"
+
+
+def _parse_legacy_date(text: str) -> Optional[date]:
+    """解析旧格式的日期写法，无法识别时返回None"""
+    match = LEGACY_DATE_PATTERN.match(text or "")
+    if not match:
+        return None
+    try:
+        return date(int(match.group(1)), int(match.group(2)), int(match.group(3)))
+    except ValueError:
+        return None
+
+
+def _content_weather(reminder_content: str) -> Optional[str]:
+    """提醒内容中的天气信息"""
+    match = WEATHER_LINE_PATTERN.search(reminder_content or "")
+    return match.group(1) if match else None
+
+
+class HistoryRecord:
+    """
+    一条历史记录
+
+    星期和天气只在与日期、提醒内容推算的结果不同时保存（用户手动修改过），
+    其余情况读取时再推算。
+    """
+    __slots__ = ("timestamp", "day", "special_notes", "reminder_content", "_weekday", "_weather", "extra")
+
+    def __init__(self, timestamp: str, day: Optional[date], special_notes: str = "", reminder_content: str = "",
+                 weekday: Optional[str] = None, weather: Optional[str] = None,
+                 extra: Optional[Dict[str, Any]] = None):
+        self.timestamp = timestamp
+        self.day = day
+        self.special_notes = special_notes
+        self.reminder_content = reminder_content
+        # 与推算结果相同的值不保存
+        self._weekday = None if weekday is None or (day and weekday == WEEKDAYS[day.weekday()]) \
+            else sys.intern(weekday)
+        self._weather = None if weather is None or weather == _content_weather(reminder_content) else weather
+        # 其他字段和无法识别的日期原样保留
+        self.extra = extra or None
+
+    @property
+    def date(self) -> Optional[str]:
+        """日期，例如 2025年09月28日"""
+        if self.day is not None:
+            return _format_date(self.day)
+        return self.extra.get("date") if self.extra else None
+
+    @property
+    def weekday(self) -> Optional[str]:
+        """星期"""
+        if self._weekday is not None:
+            return self._weekday
+        return WEEKDAYS[self.day.weekday()] if self.day is not None else None
+
+    @property
+    def weather(self) -> Optional[str]:
+        """天气信息"""
+        if self._weather is not None:
+            return self._weather
+        return _content_weather(self.reminder_content)
+
+    def _value(self, key: str) -> Any:
+        """按旧格式字段名读取，没有该字段时返回None"""
+        if key in HISTORY_FIELDS:
+            return getattr(self, key)
+        return self.extra.get(key) if self.extra else None
+
+    def __getitem__(self, key: str) -> Any:
+        value = self._value(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key: str) -> bool:
+        return self._value(key) is not None
+
+    def get(self, key: str, default: Any = None) -> Any:
+        value = self._value(key)
+        return default if value is None else value
+
+    def keys(self) -> List[str]:
+        return list(self.to_dict())
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, HistoryRecord):
+            return self.to_compact() == other.to_compact()
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"HistoryRecord(timestamp={self.timestamp!r}, date={self.date!r})"
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        转换为旧格式的字典（完整字段名）
+
+        Returns:
+            Dict[str, Any]: 历史记录字典
+        """
+        data = dict(self.extra or {})
+        for key in HISTORY_FIELDS:
+            value = getattr(self, key)
+            if value is not None:
+                data[key] = value
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "HistoryRecord":
+        """
+        从旧格式的字典创建记录
+
+        Args:
+            data (Dict[str, Any]): 历史记录字典
+
+        Returns:
+            HistoryRecord: 历史记录
+        """
+        extra = {key: value for key, value in data.items() if key not in HISTORY_FIELDS}
+        day = _parse_legacy_date(data.get("date", ""))
+        if day is None and data.get("date"):
+            extra["date"] = data["date"]
+        return cls(data.get("timestamp", ""), day, data.get("special_notes") or "",
+                   data.get("reminder_content") or "", data.get("weekday"), data.get("weather"), extra)
+
+    @classmethod
+    def coerce(cls, record: Union["HistoryRecord", Dict[str, Any]]) -> "HistoryRecord":
+        """字典转换为记录对象，记录对象原样返回"""
+        return record if isinstance(record, HistoryRecord) else cls.from_dict(record)
+
+    def to_compact(self) -> Dict[str, Any]:
+        """
+        转换为紧凑格式：t=时间戳，d=ISO日期，c=提醒内容，n=特别注意事项，
+        k/w=与推算结果不同的星期/天气，x=其他字段
+
+        Returns:
+            Dict[str, Any]: 紧凑格式的记录
+        """
+        item: Dict[str, Any] = {"t": self.timestamp, "d": self.day.isoformat() if self.day else None,
+                                "c": self.reminder_content}
+        if self.special_notes:
+            item["n"] = self.special_notes
+        if self._weekday is not None:
+            item["k"] = self._weekday
+        if self._weather is not None:
+            item["w"] = self._weather
+        if self.extra:
+            item["x"] = self.extra
+        return item
+
+    @classmethod
+    def from_compact(cls, item: Dict[str, Any]) -> "HistoryRecord":
+        """
+        从紧凑格式创建记录（不重新比较推算结果）
+
+        Args:
+            item (Dict[str, Any]): 紧凑格式的记录
+
+        Returns:
+            HistoryRecord: 历史记录
+        """
+        record = cls.__new__(cls)
+        record.timestamp = item.get("t", "")
+        record.day = date.fromisoformat(item["d"]) if item.get("d") else None
+        record.special_notes = item.get("n", "")
+        record.reminder_content = item.get("c", "")
+        weekday = item.get("k")
+        record._weekday = sys.intern(weekday) if weekday is not None else None
+        record._weather = item.get("w")
+        record.extra = item.get("x") or None
+        return record
+
+
+def decode_history(raw: Any) -> List[HistoryRecord]:
+    """
+    解析历史记录文件内容（兼容旧格式的字典列表）
+
+    Args:
+        raw (Any): 文件中的JSON数据
+
+    Returns:
+        List[HistoryRecord]: 历史记录
+
+    Raises:
+        ValueError: 文件版本高于当前程序支持的版本
+    """
+    if not raw:
+        return []
+    if isinstance(raw, list):
+        return [HistoryRecord.from_dict(item) for item in raw]
+    version = raw.get("v", 0)
+    if version > HISTORY_FORMAT_VERSION:
+        raise ValueError(f"历史记录文件版本 {version} 高于当前程序支持的版本 {HISTORY_FORMAT_VERSION}")
+    return [HistoryRecord.from_compact(item) for item in raw.get("records", [])]
+
+
+def encode_history(records: Iterable[Union[HistoryRecord, Dict[str, Any]]]) -> Dict[str, Any]:
+    """
+    把历史记录转换为紧凑格式的文件内容
+
+    Args:
+        records (Iterable[Union[HistoryRecord, Dict[str, Any]]]): 历史记录（记录对象或旧格式字典）
+
+    Returns:
+        Dict[str, Any]: 文件内容
+    """
+    return {"v": HISTORY_FORMAT_VERSION,
+            "records": [HistoryRecord.coerce(record).to_compact() for record in records]}
+
+
+def migrate_history_file(history_file: str) -> bool:
+    """
+    把旧格式的历史记录文件迁移为紧凑格式（在文件锁内读取-转换-写回）
+
+    Args:
+        history_file (str): 历史记录文件路径
+
+    Returns:
+        bool: 文件原为旧格式并已迁移返回True，已是新格式或文件不存在返回False
+    """
+    migrated = []
+
+    def _migrate(raw):
+        if isinstance(raw, list) and raw:
+            migrated.append(True)
+            return encode_history(decode_history(raw))
+        return raw
+
+    update_json(history_file, _migrate, default=[])
+    return bool(migrated)
+
+
+class WeatherEntry:
+    """一条天气缓存：天气信息和查询时间"""
+    __slots__ = ("weather_info", "fetched_at")
+
+    def __init__(self, weather_info: str, fetched_at: datetime):
+        self.weather_info = weather_info
+        self.fetched_at = fetched_at
+
+    def is_expired(self, max_age: timedelta, now: Optional[datetime] = None) -> bool:
+        """
+        是否已超过有效期
+
+        Args:
+            max_age (timedelta): 有效期
+            now (Optional[datetime]): 当前时间，默认datetime.now()
+
+        Returns:
+            bool: 已过期返回True
+        """
+        return (now or datetime.now()) - self.fetched_at > max_age
+
+    def to_compact(self) -> List[str]:
+        """紧凑格式：[天气信息, 查询时间]"""
+        return [self.weather_info, self.fetched_at.isoformat()]
+
+    @classmethod
+    def from_raw(cls, value: Any) -> "WeatherEntry":
+        """
+        从紧凑格式或旧格式（{"weather_info", "timestamp"}）创建条目
+
+        Args:
+            value (Any): 缓存文件中的条目
+
+        Returns:
+            WeatherEntry: 天气缓存条目
+        """
+        if isinstance(value, dict):
+            return cls(value["weather_info"], datetime.fromisoformat(value["timestamp"]))
+        return cls(value[0], datetime.fromisoformat(value[1]))
+
+
+def weather_cache_items(raw: Any) -> Dict[str, Any]:
+    """
+    天气缓存文件中的原始条目（缓存键 -> 条目），兼容旧格式
+
+    Args:
+        raw (Any): 文件中的JSON数据
+
+    Returns:
+        Dict[str, Any]: 未解析的条目，用WeatherEntry.from_raw解析
+
+    Raises:
+        ValueError: 文件版本高于当前程序支持的版本
+    """
+    if not raw:
+        return {}
+    if "v" not in raw:
+        return raw
+    if raw["v"] > WEATHER_FORMAT_VERSION:
+        raise ValueError(f"天气缓存文件版本 {raw['v']} 高于当前程序支持的版本 {WEATHER_FORMAT_VERSION}")
+    return raw.get("entries", {})
+
+
+def encode_weather_cache(entries: Dict[str, WeatherEntry]) -> Dict[str, Any]:
+    """
+    把天气缓存条目转换为紧凑格式的文件内容
+
+    Args:
+        entries (Dict[str, WeatherEntry]): 缓存键 -> 条目
+
+    Returns:
+        Dict[str, Any]: 文件内容
+    """
+    return {"v": WEATHER_FORMAT_VERSION,
+            "entries": {key: entry.to_compact() for key, entry in entries.items()}}
+
+
+def migrate_weather_cache(cache_file: str) -> bool:
+    """
+    把旧格式的天气缓存文件迁移为紧凑格式（在文件锁内读取-转换-写回）
+
+    Args:
+        cache_file (str): 天气缓存文件路径
+
+    Returns:
+        bool: 文件原为旧格式并已迁移返回True，已是新格式或文件不存在返回False
+    """
+    migrated = []
+
+    def _migrate(raw):
+        if raw and "v" not in raw:
+            migrated.append(True)
+            return encode_weather_cache({key: WeatherEntry.from_raw(value) for key, value in raw.items()})
+        return raw
+
+    update_json(cache_file, _migrate, default={})
+    return bool(migrated)
@@ -0,0 +1,233 @@
+import re
+import json
+import hashlib
+import logging
+from typing import Dict, Any, List, Optional, Iterable
+
+from utils.reminder_generator import render_reminder_text
+from utils.mobile_page_generator import render_mobile_html
+from utils.preview_cache import ResponseCache
+from utils.metrics import timed, increment
+from utils.template_registry import TEMPLATES
+
+logger = logging.getLogger(__name__)
+
+# 支持的输出格式及说明
+OUTPUT_FORMATS = {
+    "text": "温馨提示文本",
+    "markdown": "Markdown（通知、邮件）",
+    "wechat": "微信群短版",
+    "sms": "短信摘要",
+    "html": "手机网页",
+}
+
+# 短信摘要的最大长度（一条中文短信70个字）
+SMS_MAX_LENGTH = 70
+
+# 部分手机和微信版本显示为方框的emoji、变体选择符和零宽连接符
+EMOJI_PATTERN = re.compile('[\U0001F000-\U0001FAFF\u2600-\u27BF\u2B00-\u2BFF\uFE0F\u200D]')
+
+# Markdown中需要转义的字符
+MARKDOWN_SPECIAL = re.compile(r'([\\`*_\[\]#|<>])')
+
+# 进程内共享的多格式输出缓存，每份提醒数据一个缓存项，各格式在首次需要时生成
+FORMAT_CACHE = ResponseCache()
+
+
+def strip_emoji(text: str) -> str:
+    """
+    去除文本中的emoji
+
+    Args:
+        text (str): 原始文本
+
+    Returns:
+        str: 去除emoji后的文本
+    """
+    return EMOJI_PATTERN.sub('', text).strip()
+
+
+def _md(text: str) -> str:
+    """转义Markdown特殊字符"""
+    return MARKDOWN_SPECIAL.sub(r'\\\1', text)
+
+
+def _course_lines(reminder_data: Dict[str, Any]) -> List[str]:
+    """课程安排的每一行（不含项目符号）"""
+    if reminder_data["holiday"]:
+        return [f"明日{reminder_data['holiday']}放假，无课程安排"]
+    if not reminder_data["has_courses"]:
+        return ["明日无课程安排"]
+    lines = []
+    if reminder_data["swapped"]:
+        lines.append(f"明日调休上课，按{reminder_data['timetable_weekday']}课表")
+    lines.append("上午：" + "、".join(reminder_data["morning_courses"]))
+    lines.append("下午：" + "、".join(reminder_data["afternoon_courses"]))
+    return lines
+
+
+def render_markdown(reminder_data: Dict[str, Any]) -> str:
+    """
+    渲染为Markdown（学校通知、邮件）
+
+    Args:
+        reminder_data (Dict[str, Any]): build_reminder_data生成的提醒数据
+
+    Returns:
+        str: Markdown文本
+    """
+    lines = [f"## 🗓 {_md(reminder_data['class_name'])}明日温馨提醒", "",
+             f"**{reminder_data['date']} {reminder_data['weekday']}**", ""]
+
+    def section(title: str, items: Iterable[str]) -> None:
+        lines.append(f"### {title}")
+        lines.extend(f"- {item}" for item in items)
+        lines.append("")
+
+    if reminder_data["special_notes"]:
+        section("⚠️ 特别注意事项", (f"**{_md(note)}**" for note in reminder_data["special_notes"]))
+    section(f"{reminder_data['weather_emoji']} 明日天气", [_md(reminder_data["weather"])])
+    section("📚 明日课程安排", (_md(line) for line in _course_lines(reminder_data)))
+    if reminder_data["clubs"]:
+        section("🎨 社团课程安排",
+                (f"**{_md(club['name'])}**：{_md(club['members'])}" for club in reminder_data["clubs"]))
+    else:
+        section("🎨 社团课程安排", ["明日无社团活动"])
+    if reminder_data["duty_students"]:
+        section("🧹 值日生安排", ["、".join(
+            f"**{_md(duty['name'])}**（组长）" if duty["is_leader"] else _md(duty["name"])
+            for duty in reminder_data["duty_students"])])
+    else:
+        section("🧹 值日生安排", ["明日无值日生安排"])
+    section("👔 着装提醒", [_md(reminder_data["dress_code"])])
+    if reminder_data["other_notes"]:
+        section("📌 其他注意事项", (_md(note) for note in reminder_data["other_notes"]))
+    return "\n".join(lines)
+
+
+def render_wechat(reminder_data: Dict[str, Any]) -> str:
+    """
+    渲染为微信群短版：每项一行，不含emoji和Markdown标记，粘贴到任何微信版本都能正常显示
+
+    Args:
+        reminder_data (Dict[str, Any]): build_reminder_data生成的提醒数据
+
+    Returns:
+        str: 短版文本
+    """
+    lines = [f"【{reminder_data['class_name']}明日提醒】{reminder_data['date']} {reminder_data['weekday']}"]
+    for index, note in enumerate(reminder_data["special_notes"], 1):
+        lines.append(f"注意{index}：{strip_emoji(note)}")
+    lines.append(f"天气：{strip_emoji(reminder_data['weather'])}")
+    lines.append("课程：" + "；".join(_course_lines(reminder_data)))
+    if reminder_data["clubs"]:
+        lines.append("社团：" + "；".join(
+            f"{club['name']}（{club['members'].replace(', ', '、')}）" for club in reminder_data["clubs"]))
+    if reminder_data["duty_students"]:
+        lines.append("值日：" + "、".join(
+            duty["name"] + ("（组长）" if duty["is_leader"] else "") for duty in reminder_data["duty_students"]))
+    lines.append(f"着装：{strip_emoji(reminder_data['dress_code'])}")
+    lines.extend(strip_emoji(note) for note in reminder_data["other_notes"])
+    return "\n".join(lines)
+
+
+def _short_dress_code(reminder_data: Dict[str, Any]) -> str:
+    """着装要求的短信写法：去掉emoji、句末标点和重复日期的分句（如"明天是星期一"）"""
+    weekdays = {reminder_data["weekday"], reminder_data["timetable_weekday"]}
+    clauses = strip_emoji(reminder_data["dress_code"]).rstrip("。").split("，")
+    return "，".join(clause for clause in clauses if not any(day in clause for day in weekdays))
+
+
+def render_sms(reminder_data: Dict[str, Any], max_length: int = SMS_MAX_LENGTH) -> str:
+    """
+    渲染为短信摘要：按重要程度依次拼接（注意事项、天气、课程、着装、社团、值日），超出长度时截断
+
+    Args:
+        reminder_data (Dict[str, Any]): build_reminder_data生成的提醒数据
+        max_length (int): 最大长度
+
+    Returns:
+        str: 短信摘要
+    """
+    parts = []
+    if reminder_data["special_notes"]:
+        parts.append("注意：" + "，".join(strip_emoji(note) for note in reminder_data["special_notes"]))
+    parts.append(strip_emoji(reminder_data["weather"]))
+    if reminder_data["holiday"]:
+        parts.append(f"{reminder_data['holiday']}放假")
+    elif reminder_data["has_courses"]:
+        parts.append("上午" + "、".join(reminder_data["morning_courses"]) +
+                     " 下午" + "、".join(reminder_data["afternoon_courses"]))
+    if reminder_data["is_uniform_day"]:
+        parts.append(_short_dress_code(reminder_data))
+    if reminder_data["clubs"]:
+        parts.append("社团" + "、".join(club["name"] for club in reminder_data["clubs"]))
+    if reminder_data["duty_students"]:
+        parts.append("值日" + "、".join(duty["name"] for duty in reminder_data["duty_students"]))
+
+    summary = f"【{reminder_data['class_name']}】{reminder_data['date']}{reminder_data['weekday']}：" + "；".join(parts)
+    if len(summary) > max_length:
+        summary = summary[:max_length - 1] + "…"
+    return summary
+
+
+def _fingerprint(reminder_data: Dict[str, Any]) -> str:
+    """提醒数据的内容哈希，作为缓存键"""
+    payload = json.dumps(reminder_data, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+@timed("format_render")
+def render_formats(reminder_data: Dict[str, Any], formats: Optional[Iterable[str]] = None,
+                   cache: Optional[ResponseCache] = None) -> Dict[str, str]:
+    """
+    一次调用把同一份提醒数据渲染为多种格式，结果按格式缓存
+
+    网页直接使用提醒数据生成，不再从文本重新解析。
+
+    Args:
+        reminder_data (Dict[str, Any]): build_reminder_data生成的提醒数据
+        formats (Optional[Iterable[str]]): 需要的格式，默认全部（见OUTPUT_FORMATS）
+        cache (Optional[ResponseCache]): 缓存，默认使用进程内共享缓存
+
+    Returns:
+        Dict[str, str]: 格式到内容的映射
+
+    Raises:
+        ValueError: 不支持的输出格式
+    """
+    formats = list(OUTPUT_FORMATS) if formats is None else list(formats)
+    unknown = [fmt for fmt in formats if fmt not in OUTPUT_FORMATS]
+    if unknown:
+        raise ValueError(f"不支持的输出格式：{'、'.join(unknown)}，可选：{'、'.join(OUTPUT_FORMATS)}")
+
+    cache = FORMAT_CACHE if cache is None else cache
+    # 网页格式依赖模板，模板修改后使用新的缓存项
+    key = (_fingerprint(reminder_data), TEMPLATES.version())
+    entry = cache.get(key)
+    if entry is None:
+        entry = cache.put(key, {})
+
+    # 并发调用可能同时生成同一格式，结果相同，直接覆盖即可
+    outputs = {}
+    for fmt in formats:
+        rendered = entry.get(fmt)
+        if rendered is not None:
+            increment("format_cache_hits")
+        else:
+            increment("format_cache_misses")
+            if fmt == "text":
+                rendered = render_reminder_text(reminder_data)
+            elif fmt == "markdown":
+                rendered = render_markdown(reminder_data)
+            elif fmt == "wechat":
+                rendered = render_wechat(reminder_data)
+            elif fmt == "sms":
+                rendered = render_sms(reminder_data)
+            else:
+                text = entry.get("text") or render_reminder_text(reminder_data)
+                entry["text"] = text
+                rendered = render_mobile_html(text, reminder_data)
+            entry[fmt] = rendered
+        outputs[fmt] = rendered
+    return outputs
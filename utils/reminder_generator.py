@@ -1,5 +1,7 @@
-from typing import Dict, Any
+from typing import Dict, Any, List
 from datetime import date
+from utils.term_calendar import resolve_day
+from utils.metrics import timed
 
 def get_weather_emoji(weather: str) -> str:
     """
@@ -38,12 +40,14 @@ def get_weather_emoji(weather: str) -> str:
     else:
         return "🌤️"
 
+@timed("reminder_generate")
 def generate_reminder_content(
     selected_date: date, 
     selected_weekday: str, 
     weather: str, 
     schedule_data: Dict[str, Any],
-    special_notes: str = ""
+    special_notes: str = "",
+    class_name: str = "乐知班"
 ) -> str:
     """
     生成班级温馨提示内容
@@ -54,83 +58,239 @@ def generate_reminder_content(
         weather (str): 天气信息
         schedule_data (Dict[str, Any]): 课程安排数据
         special_notes (str): 特别注意事项（可选）
+        class_name (str): 班级名称
         
     Returns:
         str: 生成的提醒内容
     """
-    # 提取选定日期的信息
-    courses = schedule_data.get("课程安排", {}).get(selected_weekday, {})
-    clubs = schedule_data.get("社团安排", {}).get(selected_weekday, [])
-    duty_students = schedule_data.get("值日安排", {}).get(selected_weekday, "")
+    reminder_data = build_reminder_data(selected_date, selected_weekday, weather, schedule_data,
+                                        special_notes, class_name)
+    return render_reminder_text(reminder_data)
+
+def build_reminder_data(
+    selected_date: date, 
+    selected_weekday: str, 
+    weather: str, 
+    schedule_data: Dict[str, Any],
+    special_notes: str = "",
+    class_name: str = "乐知班"
+) -> Dict[str, Any]:
+    """
+    生成结构化的提醒数据，各种输出格式（文本、Markdown、网页等）都由它渲染
+    
+    字段与parse_reminder_content的解析结果一致，另外包含节假日、调休等原始信息。
+    
+    Args:
+        selected_date (datetime): 选定的日期
+        selected_weekday (str): 选定的星期
+        weather (str): 天气信息
+        schedule_data (Dict[str, Any]): 课程安排数据
+        special_notes (str): 特别注意事项（可选）
+        class_name (str): 班级名称
+        
+    Returns:
+        Dict[str, Any]: 结构化的提醒数据
+    """
+    # 从学期安排表中查询选定日期的实际安排（已处理节假日、调休和单双周）
+    day_plan = resolve_day(schedule_data, selected_date, weekday=selected_weekday)
+    courses = day_plan["courses"]
+    duty_students = day_plan["duty"]
+    # 调休日按被调换的星期执行课表
+    timetable_weekday = day_plan["timetable_weekday"]
+    is_monday = timetable_weekday == "星期一" and not day_plan["holiday"]
     
-    # 格式化日期
-    date_str = f"{selected_date.month}月{selected_date.day}日"
+    return {
+        "class_name": class_name,
+        "date": f"{selected_date.month}月{selected_date.day}日",
+        "weekday": selected_weekday,
+        "weather": weather,
+        "weather_emoji": get_weather_emoji(weather),
+        "holiday": day_plan["holiday"],
+        "swapped": day_plan["swapped"],
+        "timetable_weekday": timetable_weekday,
+        "has_courses": bool(courses),
+        "morning_courses": list(courses.get("上午", [])) if courses else [],
+        "afternoon_courses": list(courses.get("下午", [])) if courses else [],
+        "clubs": [{"name": club["社团名称"], "members": ", ".join(club["成员"])} for club in day_plan["clubs"]],
+        "duty": duty_students or "",
+        # 值日生（识别组长）
+        "duty_students": [
+            {"name": item.replace("[组长]", ""), "is_leader": "[组长]" in item}
+            for item in duty_students.split("、")
+        ] if duty_students else [],
+        # 是否需要穿校服（按课表执行星期一的上学日）
+        "is_uniform_day": is_monday,
+        "dress_code": "🔴明天是星期一，大家穿校服，戴红领巾。" if is_monday else "干净舒适即可",
+        # 其他注意事项（仅在周一显示）
+        "other_notes": [
+            "请带好明天所需的学习用品和课本",
+            "注意休息，保证充足睡眠，准时到校",
+        ] if is_monday else [],
+        "special_notes": split_special_notes(special_notes),
+    }
+
+def render_reminder_text(reminder_data: Dict[str, Any]) -> str:
+    """
+    把结构化的提醒数据渲染为温馨提示文本
     
+    Args:
+        reminder_data (Dict[str, Any]): build_reminder_data生成的提醒数据
+        
+    Returns:
+        str: 提醒内容
+    """
     # 构建提示内容
-    reminder = f"🗓乐知班明日温馨提醒\n"
-    reminder += f"⏰・[{date_str}] [{selected_weekday}]⏰\n\n"
+    reminder = f"🗓{reminder_data['class_name']}明日温馨提醒\n"
+    reminder += f"⏰・[{reminder_data['date']}] [{reminder_data['weekday']}]⏰\n\n"
     
     # 特别注意事项
-    if special_notes and special_notes.strip():
-        reminder += f"⚠️📢特别注意事项：\n"
-        # 将特别注意事项按行分割并添加项目符号
-        notes_lines = special_notes.strip().split('\n')
-        for line in notes_lines:
-            if line.strip():  # 忽略空行
-                reminder += f"・❗️{line.strip()}\n"
-        reminder += "\n"
+    reminder += format_special_notes("\n".join(reminder_data["special_notes"]))
 
     # 天气信息
-    weather_emoji = get_weather_emoji(weather)
-    reminder += f"{weather_emoji}明日天气：\n"
-    reminder += f"・{weather}\n\n"
+    reminder += f"{reminder_data['weather_emoji']}明日天气：\n"
+    reminder += f"・{reminder_data['weather']}\n\n"
     
     # 课程安排
     reminder += f"📚明日课程安排：\n"
-    if courses:
-        morning_classes = courses.get("上午", [])
-        afternoon_classes = courses.get("下午", [])
-        reminder += f"・上午：{', '.join([f'【{cls}】' for cls in morning_classes])}\n"
-        reminder += f"・下午：{', '.join([f'【{cls}】' for cls in afternoon_classes])}\n\n"
+    if reminder_data["holiday"]:
+        reminder += f"・明日{reminder_data['holiday']}放假，无课程安排\n\n"
+    elif reminder_data["has_courses"]:
+        if reminder_data["swapped"]:
+            reminder += f"・明日调休上课，按{reminder_data['timetable_weekday']}课表\n"
+        reminder += f"・上午：{', '.join([f'【{cls}】' for cls in reminder_data['morning_courses']])}\n"
+        reminder += f"・下午：{', '.join([f'【{cls}】' for cls in reminder_data['afternoon_courses']])}\n\n"
     else:
         reminder += f"・明日无课程安排\n\n"
     
     # 社团安排
     reminder += f"🎨社团课程安排：\n"
-    if clubs:
-        for club in clubs:
-            # 提取社团名称的主要部分（去除括号内容）
-            # club_name = club["社团名称"].split("（")[0]
-            club_name = club["社团名称"]
-            # 处理特殊字符，如"-"或"/"
-            # if "-" in club_name or "/" in club_name:
-            #     club_name = club_name.split("-")[0].split("/")[0]
-            members = ", ".join(club["成员"])
-            # reminder += f"・{club_name}小组：{members}\n"
-            reminder += f"・【{club_name}】：{members}\n"
+    if reminder_data["clubs"]:
+        for club in reminder_data["clubs"]:
+            reminder += f"・【{club['name']}】：{club['members']}\n"
         reminder += "\n"
     else:
         reminder += f"・明日无社团活动\n\n"
     
     # 值日生安排
     reminder += f"🧹值日生安排：\n"
-    reminder += f"・{duty_students}\n\n" if duty_students else "・明日无值日生安排\n\n"
+    reminder += f"・{reminder_data['duty']}\n\n" if reminder_data["duty"] else "・明日无值日生安排\n\n"
     
     # 着装提醒
     reminder += f"👔着装提醒：\n"
-    if selected_weekday == "星期一":
-        reminder += f"・🔴明天是星期一，大家穿校服，戴红领巾。\n\n"
-    else:
-        reminder += f"・干净舒适即可\n\n"
+    reminder += f"・{reminder_data['dress_code']}\n\n"
     
     # 其他注意事项（仅在周一显示）
-    if selected_weekday == "星期一":
+    if reminder_data["other_notes"]:
         reminder += f"📌其他注意事项\n"
-        reminder += "・请带好明天所需的学习用品和课本\n"
-        reminder += "・注意休息，保证充足睡眠，准时到校\n\n"
+        reminder += "".join(f"・{note}\n" for note in reminder_data["other_notes"])
+        reminder += "\n"
     
     return reminder
 
+def build_student_index(schedule_data: Dict[str, Any]) -> Dict[str, Dict[str, Dict[str, Any]]]:
+    """
+    建立学生姓名索引：每名学生每个星期参加的社团和值日安排
+    
+    Args:
+        schedule_data (Dict[str, Any]): 课程安排数据
+        
+    Returns:
+        Dict[str, Dict[str, Dict[str, Any]]]: 学生 -> 星期 -> {"clubs": 社团名称列表, "duty": 值日写法（如"张三[组长]"）或None}；
+            学生按值日表、社团名单中首次出现的顺序排列
+    """
+    index: Dict[str, Dict[str, Dict[str, Any]]] = {}
+    
+    def day_entry(student: str, weekday: str) -> Dict[str, Any]:
+        return index.setdefault(student, {}).setdefault(weekday, {"clubs": [], "duty": None})
+    
+    for weekday, duty_text in (schedule_data.get("值日安排") or {}).items():
+        for item in (duty_text or "").split("、"):
+            student = item.replace("[组长]", "").strip()
+            if student:
+                day_entry(student, weekday)["duty"] = item.strip()
+    for weekday, clubs in (schedule_data.get("社团安排") or {}).items():
+        for club in clubs:
+            for student in club.get("成员", []):
+                if student.strip():
+                    day_entry(student.strip(), weekday)["clubs"].append(club["社团名称"])
+    return index
+
+def personalize_reminder_data(reminder_data: Dict[str, Any], student: str,
+                              student_index: Dict[str, Dict[str, Dict[str, Any]]]) -> Dict[str, Any]:
+    """
+    把全班的提醒数据改为某名学生的提醒：只保留该生参加的社团和该生的值日
+    
+    课程、天气、着装和注意事项等全班共用的部分直接复用，不重新查询课程安排。
+    
+    Args:
+        reminder_data (Dict[str, Any]): build_reminder_data生成的全班提醒数据
+        student (str): 学生姓名
+        student_index (Dict[str, Dict[str, Dict[str, Any]]]): build_student_index生成的姓名索引
+        
+    Returns:
+        Dict[str, Any]: 该生的提醒数据（新对象，不修改reminder_data）
+    """
+    # 调休日按被调换的星期执行社团和值日安排
+    day = student_index.get(student, {}).get(reminder_data["timetable_weekday"], {"clubs": [], "duty": None})
+    duty = day["duty"] if reminder_data["duty"] else None
+    personalized = dict(reminder_data)
+    personalized.update({
+        "class_name": f"{reminder_data['class_name']}·{student}",
+        "student": student,
+        "clubs": [{"name": club["name"], "members": student}
+                  for club in reminder_data["clubs"] if club["name"] in day["clubs"]],
+        "duty": duty or "",
+        "duty_students": [{"name": student, "is_leader": "[组长]" in duty}] if duty else [],
+    })
+    return personalized
+
+def split_special_notes(special_notes: str) -> List[str]:
+    """
+    将特别注意事项按行分割，忽略空行
+    
+    Args:
+        special_notes (str): 特别注意事项
+        
+    Returns:
+        List[str]: 每条注意事项
+    """
+    return [line.strip() for line in (special_notes or "").strip().split('\n') if line.strip()]
+
+def format_special_notes(special_notes: str) -> str:
+    """
+    生成"特别注意事项"段落，没有注意事项时为空字符串
+    
+    Args:
+        special_notes (str): 特别注意事项
+        
+    Returns:
+        str: 段落文本（以空行结尾）
+    """
+    notes_lines = split_special_notes(special_notes)
+    if not notes_lines:
+        return ""
+    # 按行添加项目符号
+    return "⚠️📢特别注意事项：\n" + "".join(f"・❗️{line}\n" for line in notes_lines) + "\n"
+
+def splice_special_notes(reminder_text: str, special_notes: str) -> str:
+    """
+    把特别注意事项插入到不含注意事项的提醒中（标题和日期之后），其余部分保持不变
+    
+    结果与直接调用generate_reminder_content并传入special_notes相同。
+    
+    Args:
+        reminder_text (str): 不含特别注意事项的提醒内容
+        special_notes (str): 特别注意事项
+        
+    Returns:
+        str: 完整的提醒内容
+    """
+    notes_section = format_special_notes(special_notes)
+    if not notes_section:
+        return reminder_text
+    header_end = reminder_text.index("\n\n") + 2
+    return reminder_text[:header_end] + notes_section + reminder_text[header_end:]
+
 def format_club_name(club_name: str) -> str:
     """
     格式化社团名称，去除括号和特殊字符
@@ -0,0 +1,140 @@
+import json
+import logging
+from datetime import date
+from typing import Dict, Any, Optional, Tuple
+
+from utils.class_manager import get_class_context
+from utils.data_manager import load_schedule_data
+from utils.weather_service import get_weather_info
+from utils.precompute import build_reminder_content
+from utils.reminder_formats import render_formats
+from utils.image_renderer import get_or_render_reminder_image, image_hash
+from utils.preview_cache import ResponseCache
+from utils.term_calendar import WEEKDAY_NAMES, get_schedule_version
+from utils.template_registry import TEMPLATES
+
+logger = logging.getLogger(__name__)
+
+# 支持的输出格式及其Content-Type
+RESPONSE_FORMATS = {
+    "text": "text/plain; charset=utf-8",
+    "json": "application/json; charset=utf-8",
+    "html": "text/html; charset=utf-8",
+    "markdown": "text/markdown; charset=utf-8",
+    "wechat": "text/plain; charset=utf-8",
+    "sms": "text/plain; charset=utf-8",
+}
+
+# 图片格式（二进制内容，由render_reminder_image生成）
+IMAGE_FORMATS = {
+    "png": "image/png",
+}
+
+
+# 进程内共享的响应缓存
+RESPONSE_CACHE = ResponseCache()
+
+
+def build_reminder(class_id: str, target_date: date, special_notes: str = "",
+                   weather: Optional[str] = None,
+                   cache: Optional[ResponseCache] = None) -> Dict[str, Any]:
+    """
+    生成（或从缓存读取）一个班级一天的温馨提醒
+
+    Args:
+        class_id (str): 班级ID
+        target_date (date): 目标日期
+        special_notes (str): 特别注意事项
+        weather (Optional[str]): 天气信息，为空时查询天气服务（带缓存）
+        cache (Optional[ResponseCache]): 响应缓存，默认使用进程内共享缓存
+
+    Returns:
+        Dict[str, Any]: 缓存项，包含班级、日期、天气、课程安排版本、提醒文本和结构化的提醒数据
+
+    Raises:
+        ScheduleDataError: 课程安排数据读取失败
+    """
+    cache = RESPONSE_CACHE if cache is None else cache
+    context = get_class_context(class_id)
+    schedule_data = load_schedule_data(context.schedule_file)
+    if weather is None:
+        weather = get_weather_info(context.city, target_date)
+
+    version = get_schedule_version(schedule_data)
+    # 预生成的网页骨架和网页格式依赖模板，模板版本号变化时重新生成
+    key = (context.class_id, context.name, version, TEMPLATES.version(), target_date.isoformat(), weather,
+           special_notes)
+    entry = cache.get(key)
+    if entry is not None:
+        return entry
+
+    # 有每晚预生成的结果时只插入特别注意事项
+    weekday = WEEKDAY_NAMES[target_date.weekday()]
+    reminder_text, reminder_data = build_reminder_content(context, target_date, weather, schedule_data, special_notes)
+    entry = {
+        "class_id": context.class_id,
+        "class_name": context.name,
+        "date": target_date.isoformat(),
+        "weekday": weekday,
+        "weather": weather,
+        "special_notes": special_notes,
+        "schedule_version": version,
+        "text": reminder_text,
+        # 其他格式都由结构化数据渲染，不再从文本重新解析
+        "data": reminder_data,
+    }
+    return cache.put(key, entry)
+
+
+def render_reminder(entry: Dict[str, Any], fmt: str = "text") -> str:
+    """
+    按指定格式输出提醒，生成结果缓存供后续请求复用
+
+    Args:
+        entry (Dict[str, Any]): build_reminder返回的缓存项
+        fmt (str): 输出格式，text / json / html / markdown / wechat / sms
+
+    Returns:
+        str: 响应内容
+
+    Raises:
+        ValueError: 不支持的输出格式
+    """
+    if fmt not in RESPONSE_FORMATS:
+        raise ValueError(f"不支持的输出格式：{fmt}，可选：{'、'.join(RESPONSE_FORMATS)}")
+    if fmt == "text":
+        return entry["text"]
+
+    if fmt != "json":
+        return render_formats(entry["data"], [fmt])[fmt]
+
+    # 并发请求可能同时生成，结果相同，直接覆盖即可
+    rendered = entry.get(fmt)
+    if rendered is None:
+        payload = {key: entry[key] for key in
+                   ("class_id", "class_name", "date", "weekday", "weather",
+                    "special_notes", "schedule_version", "text")}
+        payload["sections"] = entry["data"]
+        rendered = json.dumps(payload, ensure_ascii=False)
+        entry[fmt] = rendered
+    return rendered
+
+
+def render_reminder_image(entry: Dict[str, Any]) -> Tuple[bytes, str]:
+    """
+    获取提醒的PNG图片，图片按内容哈希缓存在班级的输出目录中，同一份提醒只绘制一次
+
+    Args:
+        entry (Dict[str, Any]): build_reminder返回的缓存项
+
+    Returns:
+        Tuple[bytes, str]: (图片内容, 内容哈希)
+
+    Raises:
+        ImageRenderError: 未安装Pillow或找不到可用的中文字体
+    """
+    context = get_class_context(entry["class_id"])
+    content, _ = get_or_render_reminder_image(
+        entry["text"], date.fromisoformat(entry["date"]), context.output_dir
+    )
+    return content, image_hash(entry["text"])
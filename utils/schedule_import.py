@@ -0,0 +1,409 @@
+"""
+从CSV或Excel批量导入课程表和社团名单
+
+文件每行一条记录（年级表格可包含多个班级），逐行读取，不会把整个文件载入内存：
+
+- 课程表：星期、时段（上午/下午）、节次、课程，可选班级
+- 社团名单：星期、社团名称、学生（每行一名学生，也可用顿号或逗号分隔多名），可选班级
+
+导入结果按星期整体替换文件中出现的星期，其余星期保持不变；
+先与当前数据比较并校验，确认后通过save_schedule_changes一次原子保存。
+"""
+
+import io
+import os
+import re
+import csv
+import copy
+import logging
+from dataclasses import dataclass, field
+from typing import Dict, Any, List, Optional, Iterable, Iterator, Tuple, Union, BinaryIO
+
+from utils.data_manager import load_schedule_data, diff_schedule_data, save_schedule_changes
+from utils.schema_validator import SCHEDULE_VALIDATOR, WEEKDAYS
+from utils.errors import ScheduleDataError, ScheduleValidationError
+
+logger = logging.getLogger(__name__)
+
+# 导入文件类型
+KIND_TIMETABLE = "课程表"
+KIND_CLUBS = "社团名单"
+
+# 表头别名 -> 标准列名
+COLUMN_ALIASES = {
+    "星期": "星期", "周几": "星期", "weekday": "星期",
+    "时段": "时段", "上下午": "时段", "period": "时段",
+    "节次": "节次", "第几节": "节次", "lesson": "节次",
+    "课程": "课程", "课程名称": "课程", "科目": "课程", "course": "课程",
+    "社团名称": "社团名称", "社团": "社团名称", "club": "社团名称",
+    "学生": "学生", "成员": "学生", "姓名": "学生", "student": "学生",
+    "班级": "班级", "class": "班级",
+}
+REQUIRED_COLUMNS = {
+    KIND_TIMETABLE: ("星期", "时段", "课程"),
+    KIND_CLUBS: ("星期", "社团名称", "学生"),
+}
+
+# 星期的常见写法
+WEEKDAY_ALIASES = {}
+for _index, _weekday in enumerate(WEEKDAYS):
+    _short = _weekday[-1]
+    for _alias in (_weekday, f"周{_short}", f"礼拜{_short}", _short, str(_index + 1)):
+        WEEKDAY_ALIASES[_alias] = _weekday
+WEEKDAY_ALIASES.update({"周天": "星期日", "星期天": "星期日", "礼拜天": "星期日"})
+
+PERIOD_ALIASES = {"上午": "上午", "am": "上午", "下午": "下午", "pm": "下午"}
+
+# 一个单元格中多名学生的分隔符
+MEMBER_SEPARATORS = re.compile(r'[、，,;；\s]+')
+
+Source = Union[str, BinaryIO]
+
+
+@dataclass(frozen=True)
+class ImportIssue:
+    """导入时发现的一条问题：行号、原因，以及是否阻止导入"""
+    row: int
+    message: str
+    blocking: bool = True
+
+    def __str__(self) -> str:
+        prefix = f"第{self.row}行：" if self.row else ""
+        return prefix + self.message + ("" if self.blocking else "（仅提示）")
+
+
+@dataclass
+class ImportResult:
+    """一个导入文件的解析结果"""
+    kind: str
+    file_name: str
+    # 数据段 -> 星期 -> 当天的数据
+    sections: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    rows: int = 0
+    skipped_rows: int = 0
+    issues: List[ImportIssue] = field(default_factory=list)
+
+    @property
+    def blocking_issues(self) -> List[ImportIssue]:
+        return [issue for issue in self.issues if issue.blocking]
+
+
+def _cell(value: Any) -> str:
+    """单元格转为去除首尾空白的文本（Excel中的整数可能读成浮点数）"""
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip()
+
+
+def _open_binary(source: Source) -> Tuple[BinaryIO, bool]:
+    """返回二进制文件对象，以及是否需要由调用方关闭"""
+    if isinstance(source, str):
+        try:
+            return open(source, 'rb'), True
+        except OSError as e:
+            raise ScheduleDataError(f"无法读取{source}：{e}") from e
+    return source, False
+
+
+def iter_rows(source: Source, file_name: Optional[str] = None,
+              encoding: str = 'utf-8-sig') -> Iterator[Tuple[int, List[str]]]:
+    """
+    逐行读取CSV或Excel文件（第一行为表头）
+
+    Excel文件使用openpyxl的只读模式读取第一个工作表，需要安装openpyxl。
+
+    Args:
+        source (Source): 文件路径或二进制文件对象（如Streamlit上传的文件）
+        file_name (Optional[str]): 文件名，用于判断格式；source为路径时可省略
+        encoding (str): CSV文件编码，Excel导出的中文CSV可能是gbk
+
+    Yields:
+        Tuple[int, List[str]]: (行号, 单元格文本)，行号从1开始，跳过空行
+
+    Raises:
+        ScheduleDataError: 不支持的文件格式、缺少openpyxl或文件无法读取
+    """
+    file_name = file_name or (source if isinstance(source, str) else getattr(source, "name", ""))
+    extension = os.path.splitext(file_name)[1].lower()
+    handle, should_close = _open_binary(source)
+    try:
+        if extension == '.csv':
+            text = io.TextIOWrapper(handle, encoding=encoding, newline='')
+            try:
+                for row_number, row in enumerate(csv.reader(text), 1):
+                    cells = [_cell(value) for value in row]
+                    if any(cells):
+                        yield row_number, cells
+            except UnicodeDecodeError as e:
+                raise ScheduleDataError(f"{file_name}不是{encoding}编码，请选择正确的文件编码") from e
+            finally:
+                # 不关闭调用方传入的文件对象
+                text.detach()
+        elif extension in ('.xlsx', '.xlsm'):
+            try:
+                from openpyxl import load_workbook
+            except ImportError as e:
+                raise ScheduleDataError("导入Excel文件需要安装openpyxl（pip install openpyxl），也可以另存为CSV后导入") from e
+            workbook = load_workbook(handle, read_only=True, data_only=True)
+            try:
+                sheet = workbook.worksheets[0]
+                for row_number, row in enumerate(sheet.iter_rows(values_only=True), 1):
+                    cells = [_cell(value) for value in row]
+                    if any(cells):
+                        yield row_number, cells
+            finally:
+                workbook.close()
+        else:
+            raise ScheduleDataError(f"不支持的文件格式：{file_name}，请使用CSV或Excel（.xlsx）文件")
+    finally:
+        if should_close:
+            handle.close()
+
+
+def _read_header(cells: List[str]) -> Dict[str, int]:
+    """表头 -> 标准列名到列下标的映射"""
+    columns = {}
+    for index, name in enumerate(cells):
+        standard = COLUMN_ALIASES.get(name.strip().lower()) or COLUMN_ALIASES.get(name.strip())
+        if standard and standard not in columns:
+            columns[standard] = index
+    return columns
+
+
+def detect_kind(columns: Dict[str, int]) -> Optional[str]:
+    """
+    根据表头判断导入文件类型
+
+    Args:
+        columns (Dict[str, int]): 标准列名到列下标的映射
+
+    Returns:
+        Optional[str]: KIND_TIMETABLE / KIND_CLUBS，无法判断时为None
+    """
+    for kind, required in REQUIRED_COLUMNS.items():
+        if all(column in columns for column in required):
+            return kind
+    return None
+
+
+def parse_import_file(source: Source, file_name: Optional[str] = None,
+                      class_names: Iterable[str] = (), encoding: str = 'utf-8-sig') -> ImportResult:
+    """
+    逐行解析一个导入文件，并检查每一行
+
+    Args:
+        source (Source): 文件路径或二进制文件对象
+        file_name (Optional[str]): 文件名
+        class_names (Iterable[str]): 当前班级的ID和名称；文件有班级列时只导入这些班级的行
+        encoding (str): CSV文件编码
+
+    Returns:
+        ImportResult: 解析结果
+
+    Raises:
+        ScheduleDataError: 文件无法读取、为空或缺少必需的列
+    """
+    file_name = file_name or (source if isinstance(source, str) else getattr(source, "name", ""))
+    class_names = {name for name in class_names if name}
+    rows = iter_rows(source, file_name, encoding)
+    try:
+        header = next(rows, None)
+        if header is None:
+            raise ScheduleDataError(f"{file_name}是空文件")
+        columns = _read_header(header[1])
+        kind = detect_kind(columns)
+        if kind is None:
+            expected = "；".join(f"{name}：{'、'.join(required)}" for name, required in REQUIRED_COLUMNS.items())
+            raise ScheduleDataError(f"{file_name}缺少必需的列（{expected}）")
+
+        result = ImportResult(kind=kind, file_name=os.path.basename(file_name))
+        class_column = columns.get("班级")
+        if class_column is not None and not class_names:
+            result.issues.append(ImportIssue(0, "文件包含班级列但未指定班级，将导入所有行", blocking=False))
+
+        # 课程表：星期 -> 时段 -> [(节次, 行号, 课程)]；社团：星期 -> 社团 -> {学生: 行号}
+        lessons: Dict[str, Dict[str, List[Tuple[int, int, str]]]] = {}
+        clubs: Dict[str, Dict[str, Dict[str, int]]] = {}
+
+        for row_number, cells in rows:
+            def value(column: str) -> str:
+                index = columns.get(column)
+                return cells[index] if index is not None and index < len(cells) else ""
+
+            if class_column is not None and class_names and value("班级") not in class_names:
+                result.skipped_rows += 1
+                continue
+            result.rows += 1
+
+            weekday = WEEKDAY_ALIASES.get(value("星期"))
+            if weekday is None:
+                result.issues.append(ImportIssue(row_number, f"无法识别的星期：{value('星期') or '（空）'}"))
+                continue
+
+            if kind == KIND_TIMETABLE:
+                period = PERIOD_ALIASES.get(value("时段").lower())
+                if period is None:
+                    result.issues.append(ImportIssue(row_number, f"时段应为上午或下午：{value('时段') or '（空）'}"))
+                    continue
+                course = value("课程")
+                if not course:
+                    result.issues.append(ImportIssue(row_number, "课程为空，已跳过", blocking=False))
+                    continue
+                day_lessons = lessons.setdefault(weekday, {"上午": [], "下午": []})[period]
+                order_text = value("节次")
+                if order_text:
+                    order_match = re.search(r'\d+', order_text)
+                    if not order_match:
+                        result.issues.append(ImportIssue(row_number, f"节次应为数字：{order_text}"))
+                        continue
+                    order = int(order_match.group())
+                else:
+                    # 没有节次列时按文件中的顺序排列
+                    order = len(day_lessons) + 1
+                duplicate = next((item for item in day_lessons if item[0] == order), None)
+                if duplicate is not None:
+                    result.issues.append(ImportIssue(
+                        row_number, f"{weekday}{period}第{order}节与第{duplicate[1]}行重复"))
+                    continue
+                day_lessons.append((order, row_number, course))
+            else:
+                club_name = value("社团名称")
+                members = [name for name in MEMBER_SEPARATORS.split(value("学生")) if name]
+                if not club_name or not members:
+                    result.issues.append(ImportIssue(row_number, "社团名称或学生为空"))
+                    continue
+                day_clubs = clubs.setdefault(weekday, {})
+                for member in members:
+                    other = next((name for name, roster in day_clubs.items()
+                                  if name != club_name and member in roster), None)
+                    if other is not None:
+                        result.issues.append(ImportIssue(
+                            row_number, f"{member}在{weekday}同时参加{other}和{club_name}", blocking=False))
+                    day_clubs.setdefault(club_name, {}).setdefault(member, row_number)
+    finally:
+        # 提前结束时关闭文件
+        rows.close()
+
+    if kind == KIND_TIMETABLE:
+        result.sections["课程安排"] = {
+            weekday: {period: [course for _, _, course in sorted(items)] for period, items in periods.items()}
+            for weekday, periods in lessons.items()
+        }
+    else:
+        result.sections["社团安排"] = {
+            weekday: [{"社团名称": name, "成员": list(roster)} for name, roster in day_clubs.items()]
+            for weekday, day_clubs in clubs.items()
+        }
+
+    if result.rows == 0:
+        result.issues.append(ImportIssue(0, "没有可导入的行" + ("（请检查班级列）" if result.skipped_rows else "")))
+    logger.info("已解析%s %s：%d 行，跳过 %d 行，%d 个问题",
+                kind, result.file_name, result.rows, result.skipped_rows, len(result.issues))
+    return result
+
+
+def merge_import(current: Dict[str, Any], results: Iterable[ImportResult]) -> Dict[str, Any]:
+    """
+    把导入结果合并到当前数据（文件中出现的星期整体替换）
+
+    Args:
+        current (Dict[str, Any]): 当前的课程安排数据
+        results (Iterable[ImportResult]): 导入结果
+
+    Returns:
+        Dict[str, Any]: 合并后的数据（新对象，不修改current）
+    """
+    merged = copy.deepcopy(current)
+    for result in results:
+        for section, days in result.sections.items():
+            merged.setdefault(section, {}).update(copy.deepcopy(days))
+    return merged
+
+
+def _summarize(section: str, value: Any) -> str:
+    """一天数据的简短说明，用于预览修改"""
+    if value is None:
+        return "（无）"
+    if section == "课程安排":
+        return "；".join(f"{period}：{'、'.join(value.get(period, []))}" for period in ("上午", "下午"))
+    if section == "社团安排":
+        return "；".join(f"{club['社团名称']}（{len(club['成员'])}人）" for club in value) or "（无社团）"
+    return str(value)
+
+
+def describe_changes(current: Dict[str, Any], merged: Dict[str, Any],
+                     changes: List[Tuple[str, Optional[str]]]) -> List[Dict[str, str]]:
+    """
+    列出导入前后每处变化，用于确认前预览
+
+    Args:
+        current (Dict[str, Any]): 当前数据
+        merged (Dict[str, Any]): 合并导入结果后的数据
+        changes (List[Tuple[str, Optional[str]]]): diff_schedule_data返回的变化位置
+
+    Returns:
+        List[Dict[str, str]]: 每处变化的数据段、星期、导入前和导入后
+    """
+    rows = []
+    for section, weekday in changes:
+        before = current.get(section, {})
+        after = merged.get(section, {})
+        if weekday is not None:
+            before, after = before.get(weekday), after.get(weekday)
+        rows.append({
+            "数据段": section,
+            "星期": weekday or "",
+            "导入前": _summarize(section, before),
+            "导入后": _summarize(section, after),
+        })
+    return rows
+
+
+def plan_import(current: Dict[str, Any],
+                results: List[ImportResult]) -> Tuple[Dict[str, Any], List[Tuple[str, Optional[str]]], List[str]]:
+    """
+    合并导入结果、比较并校验，不写入文件
+
+    Args:
+        current (Dict[str, Any]): 当前的课程安排数据
+        results (List[ImportResult]): 导入结果
+
+    Returns:
+        Tuple: (合并后的数据, 变化位置, 阻止导入的问题)
+    """
+    problems = [f"{result.file_name} {issue}" for result in results for issue in result.blocking_issues]
+    merged = merge_import(current, results)
+    changes = diff_schedule_data(current, merged)
+    problems.extend(str(issue) for issue in SCHEDULE_VALIDATOR.validate_changes(merged, changes))
+    return merged, changes, problems
+
+
+def apply_import(results: List[ImportResult], file_path: Optional[str] = None,
+                 backup_dir: Optional[str] = None,
+                 current: Optional[Dict[str, Any]] = None) -> List[Tuple[str, Optional[str]]]:
+    """
+    校验并一次原子保存导入结果（保存前自动备份）
+
+    Args:
+        results (List[ImportResult]): 导入结果
+        file_path (Optional[str]): 数据文件路径
+        backup_dir (Optional[str]): 备份目录
+        current (Optional[Dict[str, Any]]): 当前数据，默认从file_path读取
+
+    Returns:
+        List[Tuple[str, Optional[str]]]: 写入的变化位置，没有变化时为空列表
+
+    Raises:
+        ScheduleValidationError: 导入文件有阻止导入的问题或数据未通过校验
+        ScheduleDataError: 读取或写入失败
+    """
+    if current is None:
+        current = load_schedule_data(file_path)
+    merged, changes, problems = plan_import(current, results)
+    if problems:
+        raise ScheduleValidationError(problems)
+    # 只合并变化的星期，其他会话同时修改的其他部分不会被覆盖
+    save_schedule_changes(merged, changes, file_path, backup_dir)
+    return changes
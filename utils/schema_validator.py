@@ -0,0 +1,254 @@
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+# 课程、社团、值日安排中允许出现的星期
+WEEKDAYS = ["星期一", "星期二", "星期三", "星期四", "星期五", "星期六", "星期日"]
+
+# 课程安排数据的结构定义
+#   type: object / array / string
+#   required: 对象必须包含的键
+#   properties: 已知键及其结构
+#   keys / values: 键名（字符串）和值的统一结构，用于按星期或日期索引的对象
+#   items: 数组元素的结构
+#   enum / format: 字符串的取值范围或格式
+STRING_LIST = {"type": "array", "items": {"type": "string"}}
+DATE_STRING = {"type": "string", "format": "date"}
+WEEKDAY_KEY = {"type": "string", "enum": WEEKDAYS}
+
+SECTION_SCHEMAS: Dict[str, Dict[str, Any]] = {
+    "课程安排": {
+        "type": "object",
+        "keys": WEEKDAY_KEY,
+        "values": {
+            "type": "object",
+            "required": ["上午", "下午"],
+            "properties": {"上午": STRING_LIST, "下午": STRING_LIST},
+        },
+    },
+    "社团安排": {
+        "type": "object",
+        "keys": WEEKDAY_KEY,
+        "values": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "required": ["社团名称", "成员"],
+                "properties": {"社团名称": {"type": "string"}, "成员": STRING_LIST},
+            },
+        },
+    },
+    "值日安排": {
+        "type": "object",
+        "keys": WEEKDAY_KEY,
+        "values": {"type": "string"},
+    },
+    "学期安排": {
+        "type": "object",
+        "properties": {
+            "开学日期": DATE_STRING,
+            "结束日期": DATE_STRING,
+            "节假日": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "required": ["开始日期"],
+                    "properties": {
+                        "名称": {"type": "string"},
+                        "开始日期": DATE_STRING,
+                        "结束日期": DATE_STRING,
+                    },
+                },
+            },
+            "调休上课": {"type": "object", "keys": DATE_STRING, "values": WEEKDAY_KEY},
+        },
+    },
+}
+
+SCHEDULE_SCHEMA = {
+    "type": "object",
+    "required": ["课程安排", "社团安排", "值日安排"],
+    "properties": SECTION_SCHEMAS,
+}
+
+_TYPE_NAMES = {"object": "对象", "array": "列表", "string": "字符串"}
+_PYTHON_TYPES = {"object": dict, "array": list, "string": str}
+
+
+@dataclass(frozen=True)
+class ValidationIssue:
+    """一条校验错误：出错的位置和原因"""
+    path: str
+    message: str
+
+    def __str__(self) -> str:
+        return f"{self.path}: {self.message}" if self.path else self.message
+
+
+# 编译后的校验函数：(值, 路径, 错误列表) -> None
+CompiledCheck = Callable[[Any, str, List[ValidationIssue]], None]
+
+
+def _join(path: str, key: Any) -> str:
+    """拼接错误路径，列表下标使用[]"""
+    if isinstance(key, int):
+        return f"{path}[{key}]"
+    return f"{path}.{key}" if path else str(key)
+
+
+def compile_schema(schema: Dict[str, Any]) -> CompiledCheck:
+    """
+    把结构定义编译为校验函数，结构定义只解析一次
+
+    Args:
+        schema (Dict[str, Any]): 结构定义
+
+    Returns:
+        CompiledCheck: 校验函数，发现的所有错误都会追加到错误列表中
+    """
+    expected_type = schema.get("type")
+    python_type = _PYTHON_TYPES.get(expected_type)
+    type_message = f"应为{_TYPE_NAMES.get(expected_type, expected_type)}"
+    checks: List[CompiledCheck] = []
+
+    if expected_type == "object":
+        required = tuple(schema.get("required", ()))
+        properties = {key: compile_schema(sub) for key, sub in schema.get("properties", {}).items()}
+        key_check = compile_schema(schema["keys"]) if "keys" in schema else None
+        value_check = compile_schema(schema["values"]) if "values" in schema else None
+
+        def check_object(value, path, issues):
+            for key in required:
+                if key not in value:
+                    issues.append(ValidationIssue(_join(path, key), "缺少必需字段"))
+            for key, item in value.items():
+                item_path = _join(path, key)
+                if key_check is not None:
+                    key_check(key, item_path, issues)
+                if key in properties:
+                    properties[key](item, item_path, issues)
+                elif value_check is not None:
+                    value_check(item, item_path, issues)
+        checks.append(check_object)
+
+    elif expected_type == "array" and "items" in schema:
+        item_check = compile_schema(schema["items"])
+
+        def check_array(value, path, issues):
+            for index, item in enumerate(value):
+                item_check(item, _join(path, index), issues)
+        checks.append(check_array)
+
+    elif expected_type == "string":
+        if "enum" in schema:
+            allowed = frozenset(schema["enum"])
+            enum_message = f"取值应为：{'、'.join(schema['enum'])}"
+
+            def check_enum(value, path, issues):
+                if value not in allowed:
+                    issues.append(ValidationIssue(path, enum_message))
+            checks.append(check_enum)
+        if schema.get("format") == "date":
+            def check_date(value, path, issues):
+                try:
+                    datetime.strptime(value, "%Y-%m-%d")
+                except ValueError:
+                    issues.append(ValidationIssue(path, "日期格式应为YYYY-MM-DD"))
+            checks.append(check_date)
+
+    def check(value, path, issues):
+        if python_type is not None and not isinstance(value, python_type):
+            issues.append(ValidationIssue(path, type_message))
+            return
+        for sub_check in checks:
+            sub_check(value, path, issues)
+
+    return check
+
+
+class ScheduleValidator:
+    """
+    课程安排数据校验器
+
+    结构定义在创建时编译一次；可以校验整份数据，也可以只校验刚编辑过的
+    某个数据段或某一天，返回所有错误而不是遇到第一个错误就停止。
+    """
+
+    def __init__(self, schema: Dict[str, Any] = SCHEDULE_SCHEMA):
+        self._check_document = compile_schema(schema)
+        self._required = frozenset(schema.get("required", ()))
+        self._section_schemas = schema.get("properties", {})
+        self._section_checks = {name: compile_schema(sub) for name, sub in self._section_schemas.items()}
+        # 按星期索引的数据段：单独编译每天的值校验
+        self._day_checks = {
+            name: compile_schema(sub["values"])
+            for name, sub in self._section_schemas.items()
+            if "values" in sub and sub.get("keys") == WEEKDAY_KEY
+        }
+        self._weekday_check = compile_schema(WEEKDAY_KEY)
+
+    def validate(self, data: Any) -> List[ValidationIssue]:
+        """
+        校验整份数据
+
+        Args:
+            data (Any): 课程安排数据
+
+        Returns:
+            List[ValidationIssue]: 所有错误，数据有效时为空列表
+        """
+        issues: List[ValidationIssue] = []
+        self._check_document(data, "", issues)
+        return issues
+
+    def validate_section(self, section: str, value: Any, weekday: Optional[str] = None) -> List[ValidationIssue]:
+        """
+        只校验一个数据段，或数据段中某一天的数据
+
+        Args:
+            section (str): 数据段名称，如 "课程安排"
+            value (Any): 数据段（weekday为None时）或当天的数据
+            weekday (Optional[str]): 星期，只校验这一天时提供
+
+        Returns:
+            List[ValidationIssue]: 所有错误，数据有效时为空列表
+        """
+        issues: List[ValidationIssue] = []
+        if weekday is not None and section in self._day_checks:
+            path = _join(section, weekday)
+            self._weekday_check(weekday, path, issues)
+            self._day_checks[section](value, path, issues)
+        elif section in self._section_checks:
+            self._section_checks[section](value, section, issues)
+        return issues
+
+    def validate_changes(self, data: Dict[str, Any],
+                         changes: Iterable[Tuple[str, Optional[str]]]) -> List[ValidationIssue]:
+        """
+        只校验发生变化的位置（diff_schedule_data的结果）
+
+        Args:
+            data (Dict[str, Any]): 编辑后的数据
+            changes (Iterable[Tuple[str, Optional[str]]]): 变化位置列表
+
+        Returns:
+            List[ValidationIssue]: 所有错误，数据有效时为空列表
+        """
+        issues: List[ValidationIssue] = []
+        for section, weekday in changes:
+            if section not in data:
+                if section in self._required:
+                    issues.append(ValidationIssue(section, "缺少必需字段"))
+                continue
+            if weekday is None:
+                issues.extend(self.validate_section(section, data[section]))
+            elif isinstance(data[section], dict):
+                if weekday in data[section]:
+                    issues.extend(self.validate_section(section, data[section][weekday], weekday))
+            else:
+                issues.extend(self.validate_section(section, data[section]))
+        return issues
+
+
+# 模块级共享实例，结构定义只编译一次
+SCHEDULE_VALIDATOR = ScheduleValidator()
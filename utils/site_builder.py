@@ -0,0 +1,278 @@
+import os
+import re
+import html
+import hashlib
+import logging
+from datetime import date, datetime
+from typing import Dict, Any, List, Optional, Tuple
+
+from utils.class_manager import ClassContext
+from utils.history_manager import load_history_records
+from utils.mobile_page_generator import (
+    REMINDER_HASH_PATTERN, get_output_path, load_mobile_page, parse_reminder_content,
+    reminder_hash, render_mobile_html
+)
+from utils.term_calendar import WEEKDAY_NAMES
+from utils.output_archive import list_archived_files, read_archived_file
+from utils.storage import read_json, write_json, write_text
+
+logger = logging.getLogger(__name__)
+
+# 站点清单文件（记录每个网页对应的提醒内容哈希和已生成的索引页）
+MANIFEST_FILE = 'site_manifest.json'
+# 首页每页显示的日期数
+INDEX_PAGE_SIZE = 30
+# 手机网页文件名
+PAGE_FILE_PATTERN = re.compile(r'^lezhiban_reminder_(\d{8})\.html$')
+# 命令行批量生成写出的文本提醒
+TEXT_FILE_PATTERN = re.compile(r'^lezhiban_reminder_(\d{8})\.txt$')
+
+INDEX_TEMPLATE = """<!DOCTYPE html>
+<html lang="zh-CN">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>{title}</title>
+    <style>
+        body {{ margin: 0; padding: 16px; font-family: 'PingFang SC', 'Helvetica Neue', Arial, sans-serif;
+               background: linear-gradient(135deg, #f8f4ff 0%, #e6f7ff 100%); color: #333; }}
+        h1 {{ font-size: 20px; }}
+        ul {{ list-style: none; padding: 0; }}
+        li {{ background: #fff; border-radius: 10px; margin: 8px 0; padding: 12px; }}
+        a {{ color: #6a4c93; text-decoration: none; }}
+        .weather {{ color: #888; font-size: 13px; }}
+        nav a {{ display: inline-block; margin: 4px 8px 4px 0; }}
+    </style>
+</head>
+<body>
+    <h1>{title}</h1>
+    <nav>{nav}</nav>
+    <ul>
+{items}
+    </ul>
+    <nav>{pager}</nav>
+</body>
+</html>
+"""
+
+
+def get_manifest_path(context: ClassContext) -> str:
+    """
+    获取站点清单文件路径
+
+    Args:
+        context (ClassContext): 班级上下文
+
+    Returns:
+        str: 清单文件路径
+    """
+    return os.path.join(context.site_dir, MANIFEST_FILE)
+
+
+def _parse_file_date(value: str) -> date:
+    return datetime.strptime(value, "%Y%m%d").date()
+
+
+def collect_sources(context: ClassContext) -> Dict[date, str]:
+    """
+    收集每个日期最新的提醒内容
+
+    历史记录中每个日期取最后保存的一条；历史记录中没有的日期使用命令行写出的文本文件。
+
+    Args:
+        context (ClassContext): 班级上下文
+
+    Returns:
+        Dict[date, str]: 日期到提醒内容的映射
+    """
+    sources: Dict[date, str] = {}
+    if os.path.isdir(context.output_dir):
+        for name in os.listdir(context.output_dir):
+            match = TEXT_FILE_PATTERN.match(name)
+            if match:
+                with open(os.path.join(context.output_dir, name), 'r', encoding='utf-8') as f:
+                    sources[_parse_file_date(match.group(1))] = f.read()
+
+    records = sorted(load_history_records(context.history_file), key=lambda record: record.get("timestamp", ""))
+    for record in records:
+        try:
+            record_date = datetime.strptime(record.get("date", ""), "%Y年%m月%d日").date()
+        except ValueError:
+            continue
+        if record.get("reminder_content"):
+            sources[record_date] = record["reminder_content"]
+    return sources
+
+
+def _page_entry(file_name: str, page_hash: str, target_date: date,
+                reminder_text: Optional[str] = None) -> Dict[str, Any]:
+    """清单中一个网页的记录"""
+    info = parse_reminder_content(reminder_text) if reminder_text else {}
+    return {
+        "file": file_name,
+        "hash": page_hash,
+        "weekday": info.get("weekday") or WEEKDAY_NAMES[target_date.weekday()],
+        "weather": info.get("weather", ""),
+    }
+
+
+def _list_output_pages(output_dir: str) -> List[str]:
+    """输出目录和归档中的所有手机网页文件名"""
+    names = set(list_archived_files(output_dir))
+    if os.path.isdir(output_dir):
+        names.update(os.listdir(output_dir))
+    return sorted(name for name in names if PAGE_FILE_PATTERN.match(name))
+
+
+def _read_output_page(output_dir: str, file_name: str) -> Optional[str]:
+    """读取输出目录中的网页，已归档时从压缩包中读取"""
+    try:
+        with open(os.path.join(output_dir, file_name), 'r', encoding='utf-8') as f:
+            return f.read()
+    except OSError:
+        return read_archived_file(output_dir, file_name)
+
+
+def _render_links(links: List[Tuple[str, str]]) -> str:
+    """生成导航链接"""
+    return " ".join(f'<a href="{href}">{html.escape(text)}</a>' for text, href in links)
+
+
+def _render_listing(title: str, days: List[Tuple[date, Dict[str, Any]]], prefix: str,
+                    nav: List[Tuple[str, str]], pager: List[Tuple[str, str]]) -> str:
+    """生成日期列表页"""
+    items = "\n".join(
+        f'        <li><a href="{prefix}{entry["file"]}">{day.month}月{day.day}日 {entry["weekday"]}</a>'
+        f'<div class="weather">{html.escape(entry["weather"])}</div></li>'
+        for day, entry in days
+    )
+    return INDEX_TEMPLATE.format(title=html.escape(title), nav=_render_links(nav),
+                                 items=items, pager=_render_links(pager))
+
+
+def render_indexes(context: ClassContext, pages: Dict[str, Dict[str, Any]],
+                   page_size: int = INDEX_PAGE_SIZE) -> Dict[str, str]:
+    """
+    生成分页首页、月份页和周页
+
+    Args:
+        context (ClassContext): 班级上下文
+        pages (Dict[str, Dict[str, Any]]): 清单中的网页记录（ISO日期 -> 记录）
+        page_size (int): 首页每页显示的日期数
+
+    Returns:
+        Dict[str, str]: 相对网站目录的路径到页面内容的映射
+    """
+    days = sorted(((date.fromisoformat(day), entry) for day, entry in pages.items()), reverse=True)
+    months: Dict[str, List[Tuple[date, Dict[str, Any]]]] = {}
+    weeks: Dict[str, List[Tuple[date, Dict[str, Any]]]] = {}
+    for day, entry in days:
+        months.setdefault(f"{day.year}-{day.month:02d}", []).append((day, entry))
+        iso_year, iso_week, _ = day.isocalendar()
+        weeks.setdefault(f"{iso_year}-W{iso_week:02d}", []).append((day, entry))
+
+    outputs = {}
+    month_links = [(month.replace("-", "年", 1) + "月", f"months/{month}.html") for month in months]
+    page_count = max(1, (len(days) + page_size - 1) // page_size)
+    for page in range(1, page_count + 1):
+        name = "index.html" if page == 1 else f"index-{page}.html"
+        pager = []
+        if page > 1:
+            pager.append(("上一页", "index.html" if page == 2 else f"index-{page - 1}.html"))
+        if page < page_count:
+            pager.append(("下一页", f"index-{page + 1}.html"))
+        title = f"{context.name}温馨提醒" + (f"（第{page}页）" if page > 1 else "")
+        outputs[name] = _render_listing(title, days[(page - 1) * page_size:page * page_size], "",
+                                        month_links, pager)
+
+    for month, month_days in months.items():
+        month_weeks = list(dict.fromkeys(
+            "{}-W{:02d}".format(*day.isocalendar()[:2]) for day, _ in month_days))
+        nav = [("全部", "../index.html")] + [(f"第{week[-2:]}周", f"../weeks/{week}.html") for week in month_weeks]
+        outputs[f"months/{month}.html"] = _render_listing(
+            f"{context.name}温馨提醒 {month.replace('-', '年', 1)}月", month_days, "../", nav, [])
+
+    for week, week_days in weeks.items():
+        first_day = week_days[-1][0]
+        nav = [("全部", "../index.html"), (f"{first_day.year}年{first_day.month}月",
+                                          f"../months/{first_day.year}-{first_day.month:02d}.html")]
+        outputs[f"weeks/{week}.html"] = _render_listing(
+            f"{context.name}温馨提醒 {week[:4]}年第{int(week[-2:])}周", week_days, "../", nav, [])
+    return outputs
+
+
+def build_site(context: ClassContext, page_size: int = INDEX_PAGE_SIZE) -> Dict[str, int]:
+    """
+    增量构建班级的静态网站（手机网页 + 分页首页、月份页、周页）
+
+    网站位于班级独立的网站目录（见ClassContext.site_dir），网页从输出目录或归档中复制过来，
+    输出文件归档后，网站中的网页和索引仍然保留，不受输出目录清理的影响。
+    清单记录每个网页对应的提醒内容哈希，只重新写入内容发生变化的网页；
+    索引页内容不变时不重写，发布到静态托管时只需上传变化的文件。
+
+    Args:
+        context (ClassContext): 班级上下文
+        page_size (int): 首页每页显示的日期数
+
+    Returns:
+        Dict[str, int]: 统计，包含rebuilt（写入网站的网页）、unchanged（未变化的网页）、
+            indexes_written（写入的索引页）和indexes_removed（删除的索引页）
+    """
+    site_dir = context.site_dir
+    manifest_path = get_manifest_path(context)
+    manifest = read_json(manifest_path, default={})
+    pages: Dict[str, Dict[str, Any]] = manifest.get("pages", {})
+    index_hashes: Dict[str, str] = manifest.get("indexes", {})
+    stats = {"rebuilt": 0, "unchanged": 0, "indexes_written": 0, "indexes_removed": 0}
+
+    for target_date, reminder_text in collect_sources(context).items():
+        day = target_date.isoformat()
+        page_hash = reminder_hash(reminder_text)
+        file_name = os.path.basename(get_output_path(target_date, site_dir))
+        entry = pages.get(day)
+        if entry and entry["hash"] == page_hash and os.path.exists(os.path.join(site_dir, file_name)):
+            stats["unchanged"] += 1
+            continue
+        # 输出目录（或归档）中与提醒内容一致的网页直接复制，否则重新生成
+        loaded = load_mobile_page(reminder_text, target_date, context.output_dir)
+        html_content = loaded[0] if loaded is not None else render_mobile_html(reminder_text)
+        write_text(os.path.join(site_dir, file_name), html_content)
+        stats["rebuilt"] += 1
+        pages[day] = _page_entry(file_name, page_hash, target_date, reminder_text)
+
+    # 没有提醒内容来源的已有网页（输出目录中或已归档）也加入网站
+    for name in _list_output_pages(context.output_dir):
+        target_date = _parse_file_date(PAGE_FILE_PATTERN.match(name).group(1))
+        if target_date.isoformat() in pages:
+            continue
+        html_content = _read_output_page(context.output_dir, name)
+        if html_content is None:
+            continue
+        write_text(os.path.join(site_dir, name), html_content)
+        stats["rebuilt"] += 1
+        match = REMINDER_HASH_PATTERN.search(html_content)
+        pages[target_date.isoformat()] = _page_entry(name, match.group(1) if match else "", target_date)
+
+    # 网站目录中已被手动删除的网页从索引中移除
+    for day, entry in list(pages.items()):
+        if not os.path.exists(os.path.join(site_dir, entry["file"])):
+            del pages[day]
+
+    outputs = render_indexes(context, pages, page_size)
+    new_index_hashes = {}
+    for relative_path, content in outputs.items():
+        content_hash = hashlib.sha1(content.encode('utf-8')).hexdigest()[:16]
+        new_index_hashes[relative_path] = content_hash
+        full_path = os.path.join(site_dir, relative_path)
+        if index_hashes.get(relative_path) != content_hash or not os.path.exists(full_path):
+            write_text(full_path, content)
+            stats["indexes_written"] += 1
+    for relative_path in set(index_hashes) - set(new_index_hashes):
+        full_path = os.path.join(site_dir, relative_path)
+        if os.path.exists(full_path):
+            os.remove(full_path)
+        stats["indexes_removed"] += 1
+
+    write_json(manifest_path, {"pages": pages, "indexes": new_index_hashes})
+    logger.info("静态网站已更新: %s %s", site_dir, stats)
+    return stats
@@ -0,0 +1,131 @@
+"""
+核心库的Streamlit适配层
+
+utils中的数据、天气、提醒、历史记录和网页生成模块不依赖Streamlit，
+出错时抛出utils.errors中的异常并写日志；页面通过本模块调用它们，
+把异常转换为页面上的提示信息。
+"""
+
+import streamlit as st
+from datetime import date
+from typing import Dict, Any, List, Optional, Tuple
+
+from utils import data_manager, weather_service, schedule_import
+from utils.errors import ScheduleDataError, ScheduleValidationError, WeatherServiceError, WeatherOutOfRangeError
+
+def load_schedule_data(file_path: Optional[str] = None) -> Dict[str, Any]:
+    """
+    加载课程安排数据，失败时在页面上显示错误并返回空数据
+    
+    Args:
+        file_path (Optional[str]): 数据文件路径
+        
+    Returns:
+        Dict[str, Any]: 课程安排数据
+    """
+    try:
+        return data_manager.load_schedule_data(file_path)
+    except ScheduleDataError as e:
+        st.error(str(e))
+        return {}
+
+def save_schedule_data(data: Dict[str, Any], file_path: Optional[str] = None,
+                       backup_dir: Optional[str] = None) -> bool:
+    """
+    保存课程安排数据，失败时在页面上显示错误
+    
+    Args:
+        data (Dict[str, Any]): 要保存的课程安排数据
+        file_path (Optional[str]): 数据文件路径
+        backup_dir (Optional[str]): 备份目录
+        
+    Returns:
+        bool: 保存是否成功
+    """
+    try:
+        data_manager.save_schedule_data(data, file_path, backup_dir)
+        return True
+    except ScheduleDataError as e:
+        st.error(str(e))
+        return False
+
+def save_schedule_changes(edited: Dict[str, Any], changes: List[Tuple[str, Optional[str]]],
+                          file_path: Optional[str] = None, backup_dir: Optional[str] = None) -> bool:
+    """
+    只保存发生变化的部分，失败时在页面上显示错误
+    
+    Args:
+        edited (Dict[str, Any]): 编辑后的数据
+        changes (List[Tuple[str, Optional[str]]]): 变化位置列表
+        file_path (Optional[str]): 数据文件路径
+        backup_dir (Optional[str]): 备份目录
+        
+    Returns:
+        bool: 保存是否成功
+    """
+    try:
+        data_manager.save_schedule_changes(edited, changes, file_path, backup_dir)
+        return True
+    except ScheduleDataError as e:
+        st.error(str(e))
+        return False
+
+def parse_import_file(uploaded_file: Any, class_names: List[str],
+                      encoding: str = 'utf-8-sig') -> Optional[schedule_import.ImportResult]:
+    """
+    解析上传的导入文件，失败时在页面上显示错误
+    
+    Args:
+        uploaded_file (Any): st.file_uploader返回的文件
+        class_names (List[str]): 当前班级的ID和名称
+        encoding (str): CSV文件编码
+        
+    Returns:
+        Optional[schedule_import.ImportResult]: 解析结果，失败时为None
+    """
+    try:
+        return schedule_import.parse_import_file(uploaded_file, uploaded_file.name, class_names, encoding)
+    except ScheduleDataError as e:
+        st.error(str(e))
+        return None
+
+def apply_import(results: List[schedule_import.ImportResult], file_path: Optional[str] = None,
+                 backup_dir: Optional[str] = None) -> Optional[List[Tuple[str, Optional[str]]]]:
+    """
+    一次保存导入结果，失败时在页面上显示错误
+    
+    Args:
+        results (List[schedule_import.ImportResult]): 导入结果
+        file_path (Optional[str]): 数据文件路径
+        backup_dir (Optional[str]): 备份目录
+        
+    Returns:
+        Optional[List[Tuple[str, Optional[str]]]]: 写入的变化位置，失败时为None
+    """
+    try:
+        return schedule_import.apply_import(results, file_path, backup_dir)
+    except ScheduleDataError as e:
+        st.error(str(e))
+        return None
+
+def get_weather_info(city: str, target_date: date) -> str:
+    """
+    查询天气，失败时在页面上显示提示并返回默认文字
+    
+    Args:
+        city (str): 城市代码
+        target_date (date): 目标日期
+        
+    Returns:
+        str: 天气信息描述
+    """
+    try:
+        return weather_service.fetch_weather_info(city, target_date)
+    except WeatherOutOfRangeError:
+        return weather_service.WEATHER_OUT_OF_RANGE_TEXT
+    except WeatherServiceError as e:
+        st.warning(f"{e}，可手动输入天气信息")
+        return weather_service.WEATHER_FAILED_TEXT
+    except Exception as e:
+        st.warning(f"获取天气信息失败: {str(e)} 可手动输入天气信息")
+        return weather_service.WEATHER_FAILED_TEXT
@@ -0,0 +1,285 @@
+import json
+import os
+import time
+import tempfile
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+logger = logging.getLogger(__name__)
+
+# 锁文件后缀，与数据文件放在同一目录
+LOCK_SUFFIX = '.lock'
+# 默认重试次数与退避基数（秒）
+DEFAULT_RETRIES = 5
+DEFAULT_BACKOFF = 0.05
+# 读到无法解析的JSON时最多重试的次数（原子写入下只有极少数情况会读到不完整的内容，
+# 一直无法解析的文件多半已经损坏，不再长时间等待）
+DECODE_RETRIES = 2
+# 获取锁的默认超时时间（秒）
+DEFAULT_LOCK_TIMEOUT = 10.0
+
+_MISSING = object()
+
+# 进程的umask（只能通过设置再恢复的方式读取，在导入时读取一次）
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+# 记录当前线程已持有的锁，使同一线程内嵌套加锁不会自我死锁
+_held_locks = threading.local()
+
+
+class StorageLockTimeout(TimeoutError):
+    """在超时时间内无法获取文件锁"""
+
+
+def _try_lock(lock_file, shared: bool) -> bool:
+    """
+    尝试以非阻塞方式对锁文件加锁
+
+    Returns:
+        bool: 加锁成功返回True，锁被占用返回False
+    """
+    try:
+        if fcntl is not None:
+            mode = fcntl.LOCK_SH if shared else fcntl.LOCK_EX
+            fcntl.flock(lock_file.fileno(), mode | fcntl.LOCK_NB)
+        else:
+            # msvcrt只支持排他锁，共享锁在Windows上按排他锁处理
+            lock_file.seek(0)
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_NBLCK, 1)
+        return True
+    except OSError:
+        return False
+
+
+def _unlock(lock_file) -> None:
+    """释放锁文件上的锁"""
+    if fcntl is not None:
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+    else:
+        lock_file.seek(0)
+        msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+@contextmanager
+def file_lock(path: str, shared: bool = False, timeout: float = DEFAULT_LOCK_TIMEOUT) -> Iterator[None]:
+    """
+    对数据文件加建议性（advisory）锁，跨进程有效
+
+    锁加在旁路的 <path>.lock 文件上，数据文件本身通过原子替换更新，
+    因此替换后锁依然有效。
+
+    Args:
+        path (str): 数据文件路径
+        shared (bool): 是否使用共享锁（只读场景）
+        timeout (float): 等待锁的最长时间（秒）
+    """
+    lock_path = os.path.abspath(path + LOCK_SUFFIX)
+    held = getattr(_held_locks, 'counts', None)
+    if held is None:
+        held = _held_locks.counts = {}
+    if held.get(lock_path):
+        # 本线程已持有该锁，直接重入
+        held[lock_path] += 1
+        try:
+            yield
+        finally:
+            held[lock_path] -= 1
+        return
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    lock_file = open(lock_path, 'a+')
+    try:
+        deadline = time.monotonic() + timeout
+        delay = DEFAULT_BACKOFF
+        while not _try_lock(lock_file, shared):
+            if time.monotonic() >= deadline:
+                raise StorageLockTimeout(f"获取文件锁超时: {path}")
+            time.sleep(delay)
+            delay = min(delay * 2, 1.0)
+        held[lock_path] = 1
+        try:
+            yield
+        finally:
+            held[lock_path] = 0
+            _unlock(lock_file)
+    finally:
+        lock_file.close()
+
+
+def with_retry(func: Callable[[], Any], retries: int = DEFAULT_RETRIES,
+               backoff: float = DEFAULT_BACKOFF,
+               exceptions: tuple = (OSError, json.JSONDecodeError),
+               decode_retries: int = DECODE_RETRIES) -> Any:
+    """
+    执行操作，遇到瞬时错误时按指数退避重试
+
+    Args:
+        func (Callable[[], Any]): 要执行的操作
+        retries (int): 最大重试次数
+        backoff (float): 首次重试前的等待时间（秒），之后每次翻倍
+        exceptions (tuple): 需要重试的异常类型
+        decode_retries (int): JSON解析失败时的最大重试次数（不超过retries）
+
+    Returns:
+        Any: 操作的返回值
+    """
+    for attempt in range(retries + 1):
+        try:
+            return func()
+        except FileNotFoundError:
+            raise
+        except exceptions as e:
+            limit = min(retries, decode_retries) if isinstance(e, json.JSONDecodeError) else retries
+            if attempt >= limit:
+                raise
+            logger.debug("存储操作失败，第%d次重试: %s", attempt + 1, e)
+            time.sleep(backoff * (2 ** attempt))
+
+
+def read_json(path: str, default: Any = _MISSING) -> Any:
+    """
+    读取JSON文件，读到不完整内容时自动重试
+
+    Args:
+        path (str): 文件路径
+        default (Any): 文件不存在时返回的默认值；不提供则抛出FileNotFoundError
+
+    Returns:
+        Any: 解析后的JSON数据
+    """
+    def _read():
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    try:
+        return with_retry(_read)
+    except FileNotFoundError:
+        if default is _MISSING:
+            raise
+        return default
+
+
+def copy_target_mode(tmp_path: str, path: str) -> None:
+    """
+    把临时文件的权限设为替换后应有的权限
+
+    mkstemp创建的临时文件只有所有者可读写（0600），直接替换后网页、静态网站等输出文件
+    无法被Web服务器读取。目标文件已存在时沿用其权限，否则与open()新建文件一致（0666去掉umask）。
+
+    Args:
+        tmp_path (str): 临时文件路径
+        path (str): 目标文件路径
+    """
+    try:
+        mode = os.stat(path).st_mode & 0o7777
+    except OSError:
+        mode = 0o666 & ~_UMASK
+    os.chmod(tmp_path, mode)
+
+
+def _write_atomic(path: str, write: Callable[[Any], None], binary: bool = False) -> None:
+    """
+    先写临时文件再原子替换目标文件（调用方负责加锁）
+    """
+    directory = os.path.dirname(path) or '.'
+    os.makedirs(directory, exist_ok=True)
+
+    fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(path) + '.', suffix='.tmp', dir=directory)
+    try:
+        with (os.fdopen(fd, 'wb') if binary else os.fdopen(fd, 'w', encoding='utf-8')) as f:
+            write(f)
+            f.flush()
+            os.fsync(f.fileno())
+        copy_target_mode(tmp_path, path)
+        # Windows上目标文件被占用时os.replace会失败，需要重试
+        with_retry(lambda: os.replace(tmp_path, path), exceptions=(PermissionError,))
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def _write_json_unlocked(path: str, data: Any) -> None:
+    """
+    原子地写入JSON文件（调用方负责加锁）
+    """
+    _write_atomic(path, lambda f: json.dump(data, f, ensure_ascii=False, indent=2))
+
+
+def write_text(path: str, content: str) -> None:
+    """
+    原子地写入文本文件（网页、文本提醒等输出文件）
+
+    Args:
+        path (str): 文件路径
+        content (str): 文件内容
+    """
+    _write_atomic(path, lambda f: f.write(content))
+
+
+def write_bytes(path: str, content: bytes) -> None:
+    """
+    原子地写入二进制文件（图片等输出文件）
+
+    Args:
+        path (str): 文件路径
+        content (bytes): 文件内容
+    """
+    _write_atomic(path, lambda f: f.write(content), binary=True)
+
+
+def write_json(path: str, data: Any) -> None:
+    """
+    原子地写入JSON文件（临时文件 + 重命名），并持有排他锁
+
+    读者要么看到旧文件，要么看到新文件，不会读到写了一半的内容。
+
+    Args:
+        path (str): 文件路径
+        data (Any): 要写入的数据
+    """
+    with file_lock(path):
+        _write_json_unlocked(path, data)
+
+
+def update_json(path: str, func: Callable[[Any], Any], default: Optional[Any] = None) -> Any:
+    """
+    在排他锁内完成"读取-修改-写回"，避免并发保存相互覆盖
+
+    Args:
+        path (str): 文件路径
+        func (Callable[[Any], Any]): 接收当前数据并返回新数据的函数
+        default (Optional[Any]): 文件不存在时传给func的初始数据
+
+    Returns:
+        Any: 写入后的新数据
+    """
+    with file_lock(path):
+        current = read_json(path, default=default)
+        updated = func(current)
+        _write_json_unlocked(path, updated)
+        return updated
+
+
+def remove_file(path: str) -> None:
+    """
+    在排他锁内删除文件，文件不存在时忽略
+
+    Args:
+        path (str): 文件路径
+    """
+    with file_lock(path):
+        if os.path.exists(path):
+            os.remove(path)
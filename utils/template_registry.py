@@ -0,0 +1,191 @@
+"""
+网页模板注册表：预编译模板并在文件修改后自动重新加载
+
+templates/image_template.html 是页面框架，其中的 {{占位符}} 由 templates/partials/
+下的片段（标题、课程时段、社团条目、值日条目、注意事项等）渲染后填入。
+模板在第一次使用时编译为“文本 + 占位符”的片段列表并常驻内存，
+之后的预览和批量导出不再每次读取文件；每个文件单独按修改时间检查，
+只有改动过的文件会重新编译，编辑模板后无需重启应用。
+
+缓存网页（或由网页派生的内容）的地方需要把 TEMPLATES.version() 放进缓存键，
+模板修改后缓存随之失效。
+"""
+import os
+import hashlib
+import re
+import time
+import logging
+import threading
+from typing import Dict, List, Tuple
+
+from utils.metrics import increment
+
+logger = logging.getLogger(__name__)
+
+# 页面框架模板路径
+LAYOUT_TEMPLATE = 'templates/image_template.html'
+
+# 片段目录（与页面框架模板位于同一目录下）
+PARTIALS_DIR_NAME = 'partials'
+
+# 模板中的占位符，例如 {{class_name}}
+SLOT_PATTERN = re.compile(r'\{\{\s*(\w+)\s*\}\}')
+
+# 检查模板文件是否修改的最短间隔（秒），两次检查之间直接使用内存中的模板
+CHECK_INTERVAL = 1.0
+
+
+class CompiledTemplate:
+    """
+    编译后的模板：文本片段与占位符交替排列，渲染时只做一次拼接
+    """
+
+    __slots__ = ("path", "literals", "slots")
+
+    def __init__(self, path: str, source: str):
+        parts = SLOT_PATTERN.split(source)
+        self.path = path
+        self.literals: List[str] = parts[0::2]
+        self.slots: List[str] = parts[1::2]
+
+    def render(self, **values: str) -> str:
+        """
+        填入占位符
+
+        Args:
+            **values (str): 占位符名称对应的内容（内容原样插入，不再解析其中的占位符）
+
+        Returns:
+            str: 渲染结果
+
+        Raises:
+            KeyError: 模板中的占位符没有提供对应的内容
+        """
+        literals = self.literals
+        output = [literals[0]]
+        for index, slot in enumerate(self.slots):
+            try:
+                output.append(str(values[slot]))
+            except KeyError:
+                raise KeyError(f"模板 {self.path} 中的占位符 {{{{{slot}}}}} 没有提供内容") from None
+            output.append(literals[index + 1])
+        return "".join(output)
+
+
+class TemplateRegistry:
+    """
+    按文件路径缓存编译后的模板，文件修改时间变化时只重新编译该文件
+    """
+
+    def __init__(self, check_interval: float = CHECK_INTERVAL):
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        # 文件路径 -> (修改时间, 文件大小, 上次检查时间, 编译结果)
+        self._entries: Dict[str, Tuple[int, int, float, CompiledTemplate]] = {}
+        # 页面框架模板路径 -> (上次检查时间, 版本号)
+        self._versions: Dict[str, Tuple[float, str]] = {}
+
+    def layout(self, template_path: str = LAYOUT_TEMPLATE) -> CompiledTemplate:
+        """
+        获取页面框架模板
+
+        Args:
+            template_path (str): 模板文件路径
+
+        Returns:
+            CompiledTemplate: 编译后的模板
+        """
+        return self._get(template_path, trim=False)
+
+    def partial(self, name: str, template_path: str = LAYOUT_TEMPLATE) -> CompiledTemplate:
+        """
+        获取页面片段（去掉文件末尾的换行，片段内容原样嵌入页面）
+
+        Args:
+            name (str): 片段名称，例如 "club_item"
+            template_path (str): 页面框架模板路径，片段位于其所在目录的 partials/ 下
+
+        Returns:
+            CompiledTemplate: 编译后的片段
+        """
+        path = os.path.join(os.path.dirname(template_path), PARTIALS_DIR_NAME, f"{name}.html")
+        return self._get(path, trim=True)
+
+    def version(self, template_path: str = LAYOUT_TEMPLATE) -> str:
+        """
+        获取模板版本号：由页面框架和全部片段文件的修改时间和大小计算，任何一个文件修改后都会变化
+
+        与渲染使用相同的检查间隔，缓存键中的版本号与实际渲染使用的模板一致。
+
+        Args:
+            template_path (str): 页面框架模板路径
+
+        Returns:
+            str: 12位十六进制版本号
+        """
+        now = time.monotonic()
+        cached = self._versions.get(template_path)
+        if cached is not None and now - cached[0] < self.check_interval:
+            return cached[1]
+
+        partials_dir = os.path.join(os.path.dirname(template_path), PARTIALS_DIR_NAME)
+        try:
+            names = sorted(name for name in os.listdir(partials_dir) if name.endswith('.html'))
+        except OSError:
+            names = []
+        signature = []
+        for path in [template_path, *(os.path.join(partials_dir, name) for name in names)]:
+            try:
+                stat = os.stat(path)
+                signature.append(f"{os.path.basename(path)}:{stat.st_mtime_ns}:{stat.st_size}")
+            except OSError:
+                signature.append(f"{os.path.basename(path)}:missing")
+        version = hashlib.sha1("\n".join(signature).encode('utf-8')).hexdigest()[:12]
+        with self._lock:
+            if cached is not None and cached[1] != version:
+                # 版本号已变化，下次渲染时立即检查各文件，不使用检查间隔内的旧模板
+                self._entries = {path: (entry[0], entry[1], float('-inf'), entry[3])
+                                 for path, entry in self._entries.items()}
+            self._versions[template_path] = (now, version)
+        return version
+
+    def clear(self) -> None:
+        """清空内存中的模板，下次使用时重新读取"""
+        with self._lock:
+            self._entries.clear()
+            self._versions.clear()
+
+    def _get(self, path: str, trim: bool) -> CompiledTemplate:
+        """读取模板；距上次检查超过间隔时按修改时间和大小判断是否需要重新编译"""
+        now = time.monotonic()
+        entry = self._entries.get(path)
+        if entry is not None and now - entry[2] < self.check_interval:
+            return entry[3]
+
+        with self._lock:
+            entry = self._entries.get(path)
+            stat = os.stat(path)
+            if entry is not None and (entry[0], entry[1]) == (stat.st_mtime_ns, stat.st_size):
+                self._entries[path] = (entry[0], entry[1], now, entry[3])
+                return entry[3]
+
+            with open(path, 'r', encoding='utf-8') as f:
+                source = f.read()
+            if trim:
+                source = source.rstrip('\n')
+            compiled = CompiledTemplate(path, source)
+            self._entries[path] = (stat.st_mtime_ns, stat.st_size, now, compiled)
+            if entry is not None:
+                # 文件已修改，版本号需要重新计算
+                self._versions.clear()
+
+        if entry is not None:
+            increment("template_reloads")
+            logger.info("模板已修改，重新加载: %s", path)
+        else:
+            increment("template_loads")
+        return compiled
+
+
+# 应用全局使用的模板注册表
+TEMPLATES = TemplateRegistry()
@@ -0,0 +1,292 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+from typing import Dict, Any, List, Optional, Tuple
+
+# 星期映射（date.weekday() -> 中文星期）
+WEEKDAY_NAMES = ["星期一", "星期二", "星期三", "星期四", "星期五", "星期六", "星期日"]
+
+# 单双周课程标记，例如 "心理健康-单 | 综合实践-双"
+ODD_WEEK_SUFFIX = "-单"
+EVEN_WEEK_SUFFIX = "-双"
+ALTERNATION_SEPARATOR = "|"
+
+# 最多缓存的学期表数量（多班级部署时每个班级一份）
+MAX_CACHED_TABLES = 32
+
+# 最多记住版本号的已加载课程安排数据份数
+MAX_REMEMBERED_VERSIONS = 64
+
+_table_cache: "OrderedDict[str, Dict[date, Dict[str, Any]]]" = OrderedDict()
+_table_cache_lock = threading.Lock()
+
+# 已加载的课程安排数据（按对象）-> 版本号，保存对象本身以保证id不会被复用
+_version_cache: "OrderedDict[int, Tuple[Dict[str, Any], str]]" = OrderedDict()
+_version_cache_lock = threading.Lock()
+
+
+def parse_date(value: Any) -> date:
+    """
+    将 "YYYY-MM-DD" 字符串或date对象统一转换为date
+
+    Args:
+        value (Any): 日期字符串或日期对象
+
+    Returns:
+        date: 日期
+    """
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return datetime.strptime(str(value).strip(), "%Y-%m-%d").date()
+
+
+def schedule_version(schedule_data: Dict[str, Any]) -> str:
+    """
+    计算课程安排数据的版本号（内容哈希），用于缓存失效判断
+
+    Args:
+        schedule_data (Dict[str, Any]): 课程安排数据
+
+    Returns:
+        str: 16位十六进制版本号
+    """
+    payload = json.dumps(schedule_data, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()[:16]
+
+
+def remember_schedule_version(schedule_data: Dict[str, Any], version: str) -> None:
+    """
+    记住一份刚加载的课程安排数据的版本号（load_schedule_data调用），之后查询版本号不再计算哈希
+
+    Args:
+        schedule_data (Dict[str, Any]): 课程安排数据
+        version (str): 该数据的版本号
+    """
+    with _version_cache_lock:
+        _version_cache[id(schedule_data)] = (schedule_data, version)
+        _version_cache.move_to_end(id(schedule_data))
+        while len(_version_cache) > MAX_REMEMBERED_VERSIONS:
+            _version_cache.popitem(last=False)
+
+
+def get_schedule_version(schedule_data: Dict[str, Any]) -> str:
+    """
+    获取课程安排数据的版本号：load_schedule_data刚加载的数据直接返回加载时的版本号，其他数据计算哈希
+
+    加载的数据被修改后应使用schedule_version重新计算（页面和接口只读取、不修改加载的数据）。
+
+    Args:
+        schedule_data (Dict[str, Any]): 课程安排数据
+
+    Returns:
+        str: 16位十六进制版本号
+    """
+    with _version_cache_lock:
+        cached = _version_cache.get(id(schedule_data))
+    if cached is not None and cached[0] is schedule_data:
+        return cached[1]
+    return schedule_version(schedule_data)
+
+
+def resolve_course_name(entry: str, week_number: Optional[int]) -> str:
+    """
+    根据单双周解析课程名称
+
+    "心理健康-单 | 综合实践-双" 在单周返回 "心理健康"，在双周返回 "综合实践"；
+    无法确定周次时原样返回。
+
+    Args:
+        entry (str): 课程表中的课程条目
+        week_number (Optional[int]): 学期第几周（从1开始），未知时为None
+
+    Returns:
+        str: 当周实际上的课程名称
+    """
+    if week_number is None or (ODD_WEEK_SUFFIX not in entry and EVEN_WEEK_SUFFIX not in entry):
+        return entry
+
+    suffix = ODD_WEEK_SUFFIX if week_number % 2 == 1 else EVEN_WEEK_SUFFIX
+    other_suffix = EVEN_WEEK_SUFFIX if suffix == ODD_WEEK_SUFFIX else ODD_WEEK_SUFFIX
+    plain_parts = []
+    for part in entry.split(ALTERNATION_SEPARATOR):
+        part = part.strip()
+        if part.endswith(suffix):
+            return part[:-len(suffix)].strip()
+        if part and not part.endswith(other_suffix):
+            plain_parts.append(part)
+
+    # 本周没有对应的课程（例如只写了 "心理健康-单"），使用未标记单双周的部分
+    return " | ".join(plain_parts)
+
+
+def _expand_holidays(holidays: List[Dict[str, Any]]) -> Dict[date, str]:
+    """
+    将节假日区间展开为逐日映射
+    """
+    holiday_days = {}
+    for holiday in holidays or []:
+        start = parse_date(holiday["开始日期"])
+        end = parse_date(holiday.get("结束日期") or holiday["开始日期"])
+        name = holiday.get("名称", "假期")
+        current = start
+        while current <= end:
+            holiday_days[current] = name
+            current += timedelta(days=1)
+    return holiday_days
+
+
+def _build_day(schedule_data: Dict[str, Any], timetable_weekday: str,
+               week_number: Optional[int]) -> Dict[str, Any]:
+    """
+    按课表星期和周次生成一天的实际课程、社团和值日安排
+    """
+    courses = schedule_data.get("课程安排", {}).get(timetable_weekday, {})
+    resolved_courses = {}
+    if courses:
+        for period in ("上午", "下午"):
+            resolved = [resolve_course_name(entry, week_number) for entry in courses.get(period, [])]
+            resolved_courses[period] = [name for name in resolved if name]
+
+    # 复制社团条目，学期表缓存不与调用方的课程安排数据共用可变对象
+    clubs = [dict(club, 成员=list(club.get("成员", [])))
+             for club in schedule_data.get("社团安排", {}).get(timetable_weekday, [])]
+    return {
+        "courses": resolved_courses,
+        "clubs": clubs,
+        "duty": schedule_data.get("值日安排", {}).get(timetable_weekday, ""),
+    }
+
+
+def build_term_table(schedule_data: Dict[str, Any]) -> Dict[date, Dict[str, Any]]:
+    """
+    预先计算整个学期每一天的实际安排表
+
+    学期配置位于课程安排数据的 "学期安排" 字段：
+        开学日期 / 结束日期: "YYYY-MM-DD"
+        节假日: [{"名称": "国庆节", "开始日期": "...", "结束日期": "..."}]
+        调休上课: {"YYYY-MM-DD": "星期一"}  周末补课日及其执行的课表
+
+    Args:
+        schedule_data (Dict[str, Any]): 课程安排数据
+
+    Returns:
+        Dict[date, Dict[str, Any]]: 日期到当日安排的映射，未配置学期时为空
+    """
+    term = schedule_data.get("学期安排") or {}
+    if not term.get("开学日期") or not term.get("结束日期"):
+        return {}
+
+    start = parse_date(term["开学日期"])
+    end = parse_date(term["结束日期"])
+    holiday_days = _expand_holidays(term.get("节假日", []))
+    swapped_days = {parse_date(day): weekday for day, weekday in (term.get("调休上课") or {}).items()}
+    # 第一周从开学日期所在周的周一算起
+    first_monday = start - timedelta(days=start.weekday())
+
+    table = {}
+    current = start
+    while current <= end:
+        weekday = WEEKDAY_NAMES[current.weekday()]
+        week_number = (current - first_monday).days // 7 + 1
+        entry = {
+            "weekday": weekday,
+            "timetable_weekday": weekday,
+            "week_number": week_number,
+            "holiday": None,
+            "swapped": False,
+        }
+
+        if current in holiday_days:
+            entry["holiday"] = holiday_days[current]
+            entry.update({"courses": {}, "clubs": [], "duty": ""})
+        elif current in swapped_days:
+            entry["timetable_weekday"] = swapped_days[current]
+            entry["swapped"] = True
+            entry.update(_build_day(schedule_data, swapped_days[current], week_number))
+        else:
+            entry.update(_build_day(schedule_data, weekday, week_number))
+
+        table[current] = entry
+        current += timedelta(days=1)
+    return table
+
+
+def get_term_table(schedule_data: Dict[str, Any]) -> Dict[date, Dict[str, Any]]:
+    """
+    获取学期安排表，相同内容的数据只计算一次
+
+    Args:
+        schedule_data (Dict[str, Any]): 课程安排数据
+
+    Returns:
+        Dict[date, Dict[str, Any]]: 日期到当日安排的映射
+    """
+    if not (schedule_data.get("学期安排") or {}).get("开学日期"):
+        return {}
+
+    version = get_schedule_version(schedule_data)
+    with _table_cache_lock:
+        table = _table_cache.get(version)
+        if table is not None:
+            _table_cache.move_to_end(version)
+            return table
+
+    table = build_term_table(schedule_data)
+    with _table_cache_lock:
+        _table_cache[version] = table
+        while len(_table_cache) > MAX_CACHED_TABLES:
+            _table_cache.popitem(last=False)
+    return table
+
+
+def _copy_day(entry: Dict[str, Any]) -> Dict[str, Any]:
+    """复制学期表中的一天（包括课程列表和社团条目）"""
+    return dict(
+        entry,
+        courses={period: list(courses) for period, courses in entry["courses"].items()},
+        clubs=[dict(club, 成员=list(club["成员"])) for club in entry["clubs"]],
+    )
+
+
+def resolve_day(schedule_data: Dict[str, Any], target_date: date,
+                term_table: Optional[Dict[date, Dict[str, Any]]] = None,
+                weekday: Optional[str] = None) -> Dict[str, Any]:
+    """
+    查询指定日期的实际安排（课程、社团、值日、节假日、调休）
+
+    日期在学期范围内时直接查表；未配置学期或超出学期范围时，
+    按星期几读取课程表，单双周课程保持原样。
+
+    Args:
+        schedule_data (Dict[str, Any]): 课程安排数据
+        target_date (date): 目标日期
+        term_table (Optional[Dict[date, Dict[str, Any]]]): 已计算好的学期表，批量生成时可复用
+        weekday (Optional[str]): 不在学期表中时使用的星期，默认按日期计算
+
+    Returns:
+        Dict[str, Any]: 当日安排
+    """
+    if isinstance(target_date, datetime):
+        target_date = target_date.date()
+    if term_table is None:
+        term_table = get_term_table(schedule_data)
+
+    entry = term_table.get(target_date)
+    if entry is not None:
+        # 学期表在会话和请求之间共享，返回副本
+        return _copy_day(entry)
+
+    weekday = weekday or WEEKDAY_NAMES[target_date.weekday()]
+    entry = {
+        "weekday": weekday,
+        "timetable_weekday": weekday,
+        "week_number": None,
+        "holiday": None,
+        "swapped": False,
+    }
+    entry.update(_build_day(schedule_data, weekday, None))
+    return entry
@@ -1,42 +1,150 @@
 import streamlit as st
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Callable
 import os
 import json
 import pandas as pd
-from utils.data_manager import save_schedule_data, load_schedule_data
+from utils.st_adapters import load_schedule_data, parse_import_file, apply_import
+from utils.schedule_import import REQUIRED_COLUMNS, plan_import, describe_changes
+from utils.class_manager import ClassContext, get_class_context, load_class_registry
+from utils.term_calendar import parse_date
+from utils.metrics import snapshot, reset_metrics, write_prometheus_file
 
-def render_data_editor(schedule_data: Dict[str, Any]) -> None:
+def get_current_class() -> ClassContext:
     """
-    渲染数据编辑界面
-    
-    Args:
-        schedule_data (Dict[str, Any]): 当前的课程安排数据
+    根据URL查询参数 ?class=<班级ID> 确定当前班级
+
+    查询参数缺失时（例如通过switch_page跳转）沿用本会话上次选择的班级，
+    并把班级写回URL，方便老师收藏或分享链接。
+
+    Returns:
+        ClassContext: 当前班级上下文
     """
-    st.subheader(".schedule_data.json 数据编辑界面")
+    class_id = st.query_params.get("class") or st.session_state.get("class_id")
+    context = get_class_context(class_id)
     
-    # 创建标签页用于不同类型的编辑
-    tab1, tab2, tab3 = st.tabs(["课程安排", "社团安排", "值日安排"])
+    # 切换班级时清理上一个班级的会话数据
+    if st.session_state.get("class_id") not in (None, context.class_id):
+        for key in list(st.session_state.keys()):
+            if key != "class_id":
+                del st.session_state[key]
     
-    # 课程安排编辑
-    with tab1:
-        edited_course_data = render_course_editor(schedule_data)
-        schedule_data["课程安排"] = edited_course_data
-    
-    # 社团安排编辑
-    with tab2:
-        edited_club_data = render_club_editor(schedule_data)
-        schedule_data["社团安排"] = edited_club_data
-    
-    # 值日安排编辑
-    with tab3:
-        edited_duty_data = render_duty_editor(schedule_data)
-        schedule_data["值日安排"] = edited_duty_data
+    st.session_state.class_id = context.class_id
+    if st.query_params.get("class") != context.class_id:
+        st.query_params["class"] = context.class_id
+    return context
+
+def render_class_selector(context: ClassContext) -> None:
+    """
+    在侧边栏渲染班级切换下拉框（仅在注册了多个班级时显示）
+
+    Args:
+        context (ClassContext): 当前班级上下文
+    """
+    classes = load_class_registry()
+    if len(classes) <= 1:
+        return
     
-    # 保存按钮
-    if st.button("保存所有更改"):
-        if save_schedule_data(schedule_data):
-            st.success("数据已保存成功！")
-            st.rerun()
+    class_ids = list(classes.keys())
+    selected = st.sidebar.selectbox(
+        "班级",
+        class_ids,
+        index=class_ids.index(context.class_id),
+        format_func=lambda class_id: classes[class_id].get("名称", class_id)
+    )
+    if selected != context.class_id:
+        st.query_params["class"] = selected
+        st.rerun()
+
+def is_debug_enabled() -> bool:
+    """
+    是否显示调试侧边栏（URL参数 ?debug=1 或环境变量 LEZHIBAN_DEBUG=1）
+
+    通过URL参数开启后在本会话内保持，切换页面时不会丢失。
+
+    Returns:
+        bool: 是否启用调试
+    """
+    if st.query_params.get("debug") == "1":
+        st.session_state.debug = True
+    return st.session_state.get("debug", False) or os.environ.get("LEZHIBAN_DEBUG") == "1"
+
+def render_debug_sidebar() -> None:
+    """
+    在侧边栏显示各处理阶段的耗时和天气缓存命中情况（仅调试模式）
+
+    统计在进程内所有会话间共享，放在页面末尾渲染，包含本次运行的耗时。
+    """
+    if not is_debug_enabled():
+        return
+
+    data = snapshot()
+    with st.sidebar.expander("⏱ 性能调试", expanded=True):
+        if data["timings"]:
+            rows = [
+                {
+                    "阶段": stage,
+                    "次数": stats["count"],
+                    "平均(ms)": round(stats["total"] / stats["count"] * 1000, 2),
+                    "最长(ms)": round(stats["max"] * 1000, 2),
+                    "最近(ms)": round(stats["last"] * 1000, 2),
+                }
+                for stage, stats in sorted(data["timings"].items())
+            ]
+            st.dataframe(pd.DataFrame(rows), hide_index=True, use_container_width=True)
+        else:
+            st.caption("暂无统计")
+
+        hits = data["counters"].get("weather_cache_hits", 0)
+        misses = data["counters"].get("weather_cache_misses", 0)
+        if hits or misses:
+            st.caption(f"天气缓存：命中 {hits} 次，未命中 {misses} 次（命中率 {hits / (hits + misses):.0%}）")
+
+        col1, col2 = st.columns(2)
+        with col1:
+            if st.button("导出指标", key="export_metrics_btn", use_container_width=True):
+                st.success(f"已写入 {write_prometheus_file()}")
+        with col2:
+            if st.button("清空统计", key="reset_metrics_btn", use_container_width=True):
+                reset_metrics()
+                st.rerun()
+
+def get_editor_frame(key: str, build_frame: Callable[[], pd.DataFrame]) -> pd.DataFrame:
+    """
+    获取缓存在session_state中的编辑表格
+
+    表格只在首次渲染（或调用clear_editor_frames之后）构建一次，之后的每次重新运行
+    都复用同一个DataFrame，用户的修改由data_editor自身的控件状态保存。
+
+    Args:
+        key (str): 表格缓存键
+        build_frame (Callable[[], pd.DataFrame]): 构建表格的函数
+
+    Returns:
+        pd.DataFrame: 编辑表格的初始数据
+    """
+    frames = st.session_state.setdefault("editor_frames", {})
+    if key not in frames:
+        frames[key] = build_frame()
+    return frames[key]
+
+def clear_editor_frames() -> None:
+    """
+    清空缓存的编辑表格（重新加载数据后调用）
+    """
+    st.session_state["editor_frames"] = {}
+
+def _non_empty_cells(column: pd.Series) -> List[str]:
+    """
+    按列筛选非空单元格，保留原始文本
+
+    Args:
+        column (pd.Series): 编辑表格中的一列
+
+    Returns:
+        List[str]: 去除空白单元格后的值列表
+    """
+    values = column.fillna("").astype(str)
+    return values[values.str.strip().ne("")].tolist()
 
 def render_course_editor(schedule_data: Dict[str, Any]) -> Dict[str, Any]:
     """
@@ -62,21 +170,22 @@ def render_course_editor(schedule_data: Dict[str, Any]) -> Dict[str, Any]:
         with weekday_tabs[i]:
             weekday_data = course_data.get(weekday, {"上午": [], "下午": []})
             
-            # 获取上午和下午的课程
-            morning_classes = weekday_data.get("上午", [])
-            afternoon_classes = weekday_data.get("下午", [])
-            
-            # 确保上午和下午的课程列表长度一致（至少8节课）
-            max_classes = max(len(morning_classes), len(afternoon_classes), 8)
-            
-            # 创建DataFrame用于编辑
-            course_df_data = {
-                "节次": [f"第{j+1}节" for j in range(max_classes)],
-                "上午": morning_classes + [""] * (max_classes - len(morning_classes)),
-                "下午": afternoon_classes + [""] * (max_classes - len(afternoon_classes))
-            }
+            def build_course_frame(weekday_data=weekday_data):
+                # 获取上午和下午的课程
+                morning_classes = weekday_data.get("上午", [])
+                afternoon_classes = weekday_data.get("下午", [])
+                
+                # 确保上午和下午的课程列表长度一致（至少8节课）
+                max_classes = max(len(morning_classes), len(afternoon_classes), 8)
+                
+                # 创建DataFrame用于编辑
+                return pd.DataFrame({
+                    "节次": [f"第{j+1}节" for j in range(max_classes)],
+                    "上午": morning_classes + [""] * (max_classes - len(morning_classes)),
+                    "下午": afternoon_classes + [""] * (max_classes - len(afternoon_classes))
+                })
             
-            course_df = pd.DataFrame(course_df_data)
+            course_df = get_editor_frame(f"course_{weekday}", build_course_frame)
             
             # 使用data_editor编辑课程表
             st.markdown(f"##### {weekday} 课程表")
@@ -87,13 +196,9 @@ def render_course_editor(schedule_data: Dict[str, Any]) -> Dict[str, Any]:
                 use_container_width=True
             )
             
-            # 从编辑后的DataFrame中提取数据
-            edited_morning = [row["上午"] for _, row in edited_df.iterrows() if row["上午"].strip()]
-            edited_afternoon = [row["下午"] for _, row in edited_df.iterrows() if row["下午"].strip()]
-            
+            # 从编辑后的DataFrame中按列提取非空课程
             edited_course_data[weekday] = {
-                "上午": edited_morning,
-                "下午": edited_afternoon
+                period: _non_empty_cells(edited_df[period]) for period in ("上午", "下午")
             }
     
     return edited_course_data
@@ -120,26 +225,25 @@ def render_club_editor(schedule_data: Dict[str, Any]) -> Dict[str, Any]:
     
     for i, weekday in enumerate(weekdays):
         with weekday_tabs[i]:
-            weekday_clubs = club_data.get(weekday, [])
-            
-            # 如果没有社团数据，创建一个空的社团列表
-            if not weekday_clubs:
-                weekday_clubs = [{"社团名称": "", "成员": []}]
+            def build_club_frame(weekday_clubs=club_data.get(weekday, [])):
+                # 如果没有社团数据，创建一个空的社团列表
+                if not weekday_clubs:
+                    weekday_clubs = [{"社团名称": "", "成员": []}]
+                
+                # 创建社团数据列表用于编辑
+                club_edit_data = [
+                    {"社团名称": club.get("社团名称", ""), "成员": "，".join(club.get("成员", []))}
+                    for club in weekday_clubs
+                ]
+                
+                # 如果社团数量较少，添加一些空行以便编辑
+                while len(club_edit_data) < 5:
+                    club_edit_data.append({"社团名称": "", "成员": ""})
+                
+                # 创建DataFrame用于编辑
+                return pd.DataFrame(club_edit_data)
             
-            # 创建社团数据列表用于编辑
-            club_edit_data = []
-            for j, club in enumerate(weekday_clubs):
-                club_edit_data.append({
-                    "社团名称": club.get("社团名称", ""),
-                    "成员": "，".join(club.get("成员", []))
-                })
-            
-            # 如果社团数量较少，添加一些空行以便编辑
-            while len(club_edit_data) < 5:
-                club_edit_data.append({"社团名称": "", "成员": ""})
-            
-            # 创建DataFrame用于编辑
-            club_df = pd.DataFrame(club_edit_data)
+            club_df = get_editor_frame(f"club_{weekday}", build_club_frame)
             
             # 使用data_editor编辑社团表
             st.markdown(f"##### {weekday} 社团安排")
@@ -154,21 +258,17 @@ def render_club_editor(schedule_data: Dict[str, Any]) -> Dict[str, Any]:
                 }
             )
             
-            # 从编辑后的DataFrame中提取数据
-            edited_clubs = []
-            for _, row in edited_df.iterrows():
-                # 检查空值并处理
-                club_name = row["社团名称"] or ""
-                members_str = row["成员"] or ""
-                if club_name.strip() or members_str.strip():
-                    # 将成员字符串转换为列表
-                    members = [m.strip() for m in members_str.split("，") if m.strip()]
-                    edited_clubs.append({
-                        "社团名称": club_name,
-                        "成员": members
-                    })
+            # 从编辑后的DataFrame中按列提取数据（空值按空字符串处理）
+            club_names = edited_df["社团名称"].fillna("").astype(str)
+            members_text = edited_df["成员"].fillna("").astype(str)
+            keep = club_names.str.strip().ne("") | members_text.str.strip().ne("")
             
-            edited_club_data[weekday] = edited_clubs
+            # 将成员字符串转换为列表
+            member_lists = members_text[keep].str.split("，")
+            edited_club_data[weekday] = [
+                {"社团名称": name, "成员": [m.strip() for m in members if m.strip()]}
+                for name, members in zip(club_names[keep].tolist(), member_lists.tolist())
+            ]
     
     return edited_club_data
 
@@ -189,15 +289,10 @@ def render_duty_editor(schedule_data: Dict[str, Any]) -> Dict[str, Any]:
     weekdays = ["星期一", "星期二", "星期三", "星期四", "星期五"]
     
     # 创建一个DataFrame用于编辑所有星期的值日生
-    duty_edit_data = []
-    for weekday in weekdays:
-        duty_students = duty_data.get(weekday, "")
-        duty_edit_data.append({
-            "星期": weekday,
-            "值日生": duty_students
-        })
-    
-    duty_df = pd.DataFrame(duty_edit_data)
+    duty_df = get_editor_frame("duty", lambda: pd.DataFrame({
+        "星期": weekdays,
+        "值日生": [duty_data.get(weekday, "") for weekday in weekdays]
+    }))
     
     # 使用data_editor编辑值日生表
     st.markdown("##### 值日生安排表")
@@ -212,9 +307,173 @@ def render_duty_editor(schedule_data: Dict[str, Any]) -> Dict[str, Any]:
         }
     )
     
-    # 从编辑后的DataFrame中提取数据
-    edited_duty_data = {}
-    for _, row in edited_df.iterrows():
-        edited_duty_data[row["星期"]] = row["值日生"]
+    # 从编辑后的DataFrame中按列提取数据
+    return dict(zip(edited_df["星期"].tolist(), edited_df["值日生"].fillna("").tolist()))
+def render_term_editor(schedule_data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    渲染学期安排编辑界面（开学日期、节假日、调休上课）
+    
+    Args:
+        schedule_data (Dict[str, Any]): 当前的课程安排数据
+        
+    Returns:
+        Dict[str, Any]: 编辑后的学期安排数据
+    """
+    st.subheader("学期安排编辑")
+    st.caption("配置学期后，单双周课程（如“心理健康-单 | 综合实践-双”）、节假日和调休上课会在生成提醒时自动处理")
+    term_data = schedule_data.get("学期安排", {}) or {}
+    
+    # 开学和结束日期
+    col1, col2 = st.columns(2)
+    with col1:
+        start_date = st.date_input(
+            "开学日期",
+            value=parse_date(term_data["开学日期"]) if term_data.get("开学日期") else None,
+            key="term_start_date"
+        )
+    with col2:
+        end_date = st.date_input(
+            "结束日期",
+            value=parse_date(term_data["结束日期"]) if term_data.get("结束日期") else None,
+            key="term_end_date"
+        )
+    
+    # 节假日编辑
+    st.markdown("##### 节假日")
+    holiday_df = get_editor_frame("term_holidays", lambda: pd.DataFrame(
+        [
+            {
+                "名称": holiday.get("名称", ""),
+                "开始日期": parse_date(holiday["开始日期"]),
+                "结束日期": parse_date(holiday.get("结束日期") or holiday["开始日期"])
+            }
+            for holiday in term_data.get("节假日", [])
+        ],
+        columns=["名称", "开始日期", "结束日期"]
+    ))
+    edited_holidays = st.data_editor(
+        holiday_df,
+        num_rows="dynamic",
+        key="term_holiday_editor",
+        use_container_width=True,
+        column_config={
+            "名称": st.column_config.TextColumn("名称"),
+            "开始日期": st.column_config.DateColumn("开始日期", format="YYYY-MM-DD"),
+            "结束日期": st.column_config.DateColumn("结束日期", format="YYYY-MM-DD")
+        }
+    )
+    
+    # 调休上课编辑
+    st.markdown("##### 调休上课")
+    swap_df = get_editor_frame("term_swaps", lambda: pd.DataFrame(
+        [
+            {"日期": parse_date(day), "执行课表": weekday}
+            for day, weekday in (term_data.get("调休上课") or {}).items()
+        ],
+        columns=["日期", "执行课表"]
+    ))
+    edited_swaps = st.data_editor(
+        swap_df,
+        num_rows="dynamic",
+        key="term_swap_editor",
+        use_container_width=True,
+        column_config={
+            "日期": st.column_config.DateColumn("日期", format="YYYY-MM-DD"),
+            "执行课表": st.column_config.SelectboxColumn(
+                "执行课表", options=["星期一", "星期二", "星期三", "星期四", "星期五"]
+            )
+        }
+    )
+    
+    # 从编辑后的表格中提取数据
+    edited_term_data = {}
+    if start_date:
+        edited_term_data["开学日期"] = start_date.isoformat()
+    if end_date:
+        edited_term_data["结束日期"] = end_date.isoformat()
+    
+    # 按列提取节假日，未填结束日期时按单日假期处理
+    holiday_rows = edited_holidays[edited_holidays["开始日期"].notna()]
+    holiday_starts = holiday_rows["开始日期"]
+    holiday_ends = holiday_rows["结束日期"].where(holiday_rows["结束日期"].notna(), holiday_starts)
+    holidays = [
+        {
+            "名称": name or "假期",
+            "开始日期": parse_date(start).isoformat(),
+            "结束日期": parse_date(end).isoformat()
+        }
+        for name, start, end in zip(holiday_rows["名称"].fillna("").astype(str).tolist(),
+                                    holiday_starts.tolist(), holiday_ends.tolist())
+    ]
+    if holidays:
+        edited_term_data["节假日"] = holidays
+    
+    swap_weekdays = edited_swaps["执行课表"].fillna("").astype(str)
+    swap_rows = edited_swaps["日期"].notna() & swap_weekdays.ne("")
+    swapped_days = {
+        parse_date(day).isoformat(): weekday
+        for day, weekday in zip(edited_swaps["日期"][swap_rows].tolist(), swap_weekdays[swap_rows].tolist())
+    }
+    if swapped_days:
+        edited_term_data["调休上课"] = swapped_days
+    
+    return edited_term_data
+
+def render_import_panel(context: ClassContext) -> bool:
+    """
+    渲染批量导入界面：上传课程表或社团名单（CSV/Excel），预览修改后一次保存
+    
+    Args:
+        context (ClassContext): 当前班级上下文
+        
+    Returns:
+        bool: 是否已导入（调用方需要重新加载数据）
+    """
+    st.subheader("批量导入")
+    st.caption(
+        "每行一条记录，第一行为表头。" +
+        "；".join(f"{kind}：{'、'.join(columns)}" for kind, columns in REQUIRED_COLUMNS.items()) +
+        "。课程表可加节次列，两种表格都可加班级列（年级总表只导入本班的行）。文件中出现的星期会整体替换。"
+    )
+    if "import_message" in st.session_state:
+        st.success(st.session_state.pop("import_message"))
+    uploaded_files = st.file_uploader("选择文件", type=["csv", "xlsx"], accept_multiple_files=True,
+                                      key="import_files")
+    encoding = st.selectbox("CSV文件编码", ["utf-8-sig", "gbk"],
+                            format_func=lambda value: {"utf-8-sig": "UTF-8", "gbk": "GBK（Excel另存的CSV）"}[value],
+                            key="import_encoding")
+    if not uploaded_files:
+        return False
+    
+    results = []
+    for uploaded_file in uploaded_files:
+        result = parse_import_file(uploaded_file, [context.class_id, context.name], encoding)
+        if result is None:
+            continue
+        results.append(result)
+        st.markdown(f"**{result.file_name}**（{result.kind}）：导入 {result.rows} 行" +
+                    (f"，其他班级 {result.skipped_rows} 行" if result.skipped_rows else ""))
+        if result.issues:
+            st.warning("\n".join(f"- {issue}" for issue in result.issues[:50]) +
+                       (f"\n- ……共 {len(result.issues)} 个问题" if len(result.issues) > 50 else ""))
+    if not results:
+        return False
+    
+    current = load_schedule_data(context.schedule_file)
+    merged, changes, problems = plan_import(current, results)
+    if not changes:
+        st.info("导入内容与当前数据相同，无需保存")
+        return False
     
-    return edited_duty_data
\ No newline at end of file
+    st.markdown(f"##### 将要修改 {len(changes)} 处")
+    st.dataframe(pd.DataFrame(describe_changes(current, merged, changes)), use_container_width=True, hide_index=True)
+    if problems:
+        st.error("请修正以下问题后重新上传：\n" + "\n".join(f"- {problem}" for problem in problems[:50]))
+    st.caption("导入会重新加载数据，编辑表格中未保存的修改将被丢弃；保存前自动备份")
+    if st.button("确认导入", key="apply_import_btn", disabled=bool(problems)):
+        applied = apply_import(results, context.schedule_file, context.backup_dir)
+        if applied is not None:
+            # 重新运行页面后显示
+            st.session_state["import_message"] = f"已导入 {len(applied)} 处修改"
+            return True
+    return False
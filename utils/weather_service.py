@@ -1,70 +1,207 @@
-import streamlit as st
-import requests
 import json
 import os
+import logging
 from datetime import datetime, timedelta, date
-from typing import Optional
+from typing import Dict, Any, List, Optional
+from utils.storage import read_json, update_json
+from utils.errors import WeatherServiceError, WeatherOutOfRangeError
+from utils.metrics import timed, increment
+from utils.records import WeatherEntry, weather_cache_items, encode_weather_cache
+from utils.weather_store import record_forecasts, lookup_weather, import_cache_entries
+
+logger = logging.getLogger(__name__)
 
 # 天气缓存文件路径
 WEATHER_CACHE_FILE = 'data/weather_cache.json'
 
-def get_weather_info(city: str, target_date: date) -> str:
+# 天气接口地址（可用环境变量 LEZHIBAN_WEATHER_API 指向本地替身服务，如负载测试）
+WEATHER_API_URL = os.environ.get("LEZHIBAN_WEATHER_API", "http://t.weather.sojson.com/api/weather/city/{city}")
+
+# 天气缓存有效期
+WEATHER_CACHE_TTL = timedelta(hours=1)
+
+# 查询失败时返回给界面的默认提示
+WEATHER_FAILED_TEXT = "查询天气信息失败，可手动输入天气信息"
+WEATHER_OUT_OF_RANGE_TEXT = "日期超出天气预报范围，可手动输入天气信息"
+
+def fetch_weather_info(city: str, target_date: date) -> str:
     """
     获取指定日期的天气信息，带缓存机制
     
+    过去的日期、超出预报范围的日期和联网失败时，使用历史天气库中该日期最后一次查到的预报。
+    
     Args:
         city (str): 城市代码
         target_date (date): 目标日期
         
     Returns:
         str: 天气信息描述
+        
+    Raises:
+        WeatherOutOfRangeError: 目标日期不在天气预报范围内，且历史天气库中没有记录
+        WeatherServiceError: 网络请求失败或接口返回异常，且历史天气库中没有记录
     """
+    # 计算目标日期与今天相差的天数
+    today = datetime.now().date()
+    days_ahead = (target_date - today).days
+    
+    # 检查缓存
+    cached_weather = get_cached_weather(city, target_date)
+    if cached_weather:
+        increment("weather_cache_hits")
+        return cached_weather
+    increment("weather_cache_misses")
+    
+    # 过去的日期接口查不到，只能使用历史天气库
+    if days_ahead < 0:
+        stored_weather = get_stored_weather(city, target_date)
+        if stored_weather is None:
+            raise WeatherOutOfRangeError(WEATHER_OUT_OF_RANGE_TEXT)
+        return stored_weather
+    
+    try:
+        forecast = _fetch_forecast(city)
+    except WeatherServiceError:
+        # 离线时使用最后一次查到的预报
+        stored_weather = get_stored_weather(city, target_date)
+        if stored_weather is None:
+            raise
+        return stored_weather
+    
+    # 整份预报写入历史天气库，以后这些日期离线也能查到
+    store_forecast(city, today, forecast)
+    
+    # 确保目标日期在预报范围内（0-7天）
+    if not 0 <= days_ahead < len(forecast):
+        stored_weather = get_stored_weather(city, target_date)
+        if stored_weather is None:
+            raise WeatherOutOfRangeError(WEATHER_OUT_OF_RANGE_TEXT)
+        return stored_weather
+    
+    weather_info = format_day_weather(forecast[days_ahead])
+    
+    # 缓存天气信息
+    cache_weather(city, target_date, weather_info)
+    return weather_info
+
+def _fetch_forecast(city: str) -> List[Dict[str, Any]]:
+    """
+    联网查询城市的天气预报（从今天起的各日预报）
+    
+    Raises:
+        WeatherServiceError: 网络请求失败或接口返回异常
+    """
+    # requests只在需要联网时导入，缓存命中和命令行工具不承担其导入开销
+    import requests
+    
     try:
-        # 计算目标日期与今天相差的天数
-        today = datetime.now().date()
-        days_ahead = (target_date - today).days
-        
-        # 检查缓存
-        cached_weather = get_cached_weather(city, target_date)
-        if cached_weather:
-            return cached_weather
-        
         # 使用指定的天气API获取天气信息
-        url = f"http://t.weather.sojson.com/api/weather/city/{city}"
-        response = requests.get(url, timeout=5)
+        url = WEATHER_API_URL.format(city=city)
+        with timed("weather_http"):
+            response = requests.get(url, timeout=5)
+        
+        if response.status_code != 200:
+            raise WeatherServiceError(f"天气接口返回状态码 {response.status_code}")
         
-        if response.status_code == 200:
-            weather_data = response.json()
-            # 检查API响应状态
-            if weather_data.get('status') == 200 and 'data' in weather_data:
-                # 获取天气预报数据
-                forecast = weather_data['data']['forecast']
-                
-                # 确保目标日期在预报范围内（0-7天）
-                if 0 <= days_ahead < len(forecast):
-                    day_weather = forecast[days_ahead]
-                    weather_desc = day_weather['type']
-                    high_temp = day_weather['high']
-                    low_temp = day_weather['low']
-                    weather_info = f"{weather_desc}，{low_temp}~{high_temp}"
-                    
-                    # 缓存天气信息
-                    cache_weather(city, target_date, weather_info)
-                    return weather_info
-                else:
-                    return "日期超出天气预报范围，可手动输入天气信息"
+        weather_data = response.json()
+        # 检查API响应状态
+        if weather_data.get('status') != 200 or 'data' not in weather_data:
+            raise WeatherServiceError(f"天气接口返回异常状态: {weather_data.get('status')}")
         
-        return "查询天气信息失败，可手动输入天气信息"  # 默认天气
-    except requests.Timeout:
-        st.warning("获取天气信息超时，可手动输入天气信息")
-        return "查询天气信息失败，可手动输入天气信息"
+        # 获取天气预报数据
+        return weather_data['data']['forecast']
+    except requests.Timeout as e:
+        raise WeatherServiceError("获取天气信息超时") from e
     except requests.RequestException as e:
-        st.warning(f"网络请求失败: {str(e)} 可手动输入天气信息")
-        return "查询天气信息失败，可手动输入天气信息"
+        raise WeatherServiceError(f"网络请求失败: {str(e)}") from e
+    except (ValueError, KeyError, TypeError) as e:
+        raise WeatherServiceError(f"解析天气信息失败: {str(e)}") from e
+
+def format_day_weather(day_weather: Dict[str, Any]) -> str:
+    """
+    把接口返回的一天预报格式化为天气信息
+    
+    Args:
+        day_weather (Dict[str, Any]): 一天的预报（type、low、high）
+        
+    Returns:
+        str: 天气信息描述，例如 "小雨，低温 25℃~高温 32℃"
+    """
+    return f"{day_weather['type']}，{day_weather['low']}~{day_weather['high']}"
+
+def store_forecast(city: str, today: date, forecast: List[Dict[str, Any]]) -> None:
+    """
+    把整份预报写入历史天气库（出错只记录日志，不影响本次查询）
+    
+    Args:
+        city (str): 城市代码
+        today (date): 预报第一天的日期（预报中没有ymd字段时按顺序推算日期）
+        forecast (List[Dict[str, Any]]): 接口返回的各日预报
+    """
+    days = []
+    for index, day_weather in enumerate(forecast):
+        try:
+            day = date.fromisoformat(day_weather['ymd']) if day_weather.get('ymd') else today + timedelta(days=index)
+            days.append((day, format_day_weather(day_weather)))
+        except (KeyError, TypeError, ValueError):
+            continue
+    try:
+        record_forecasts(city, days)
+    except Exception as e:
+        logger.warning("保存历史天气失败: %s", e)
+
+def get_stored_weather(city: str, target_date: date) -> Optional[str]:
+    """
+    从历史天气库读取某天最后一次查到的预报
+    
+    Args:
+        city (str): 城市代码
+        target_date (date): 目标日期
+        
+    Returns:
+        Optional[str]: 天气信息，没有记录或读取失败时为None
+    """
+    try:
+        stored_weather = lookup_weather(city, target_date)
+    except Exception as e:
+        logger.warning("读取历史天气失败: %s", e)
+        return None
+    increment("weather_store_hits" if stored_weather is not None else "weather_store_misses")
+    return stored_weather
+
+def get_weather_info(city: str, target_date: date) -> str:
+    """
+    获取指定日期的天气信息，失败时返回可直接显示的提示文字
+    
+    Args:
+        city (str): 城市代码
+        target_date (date): 目标日期
+        
+    Returns:
+        str: 天气信息描述，查询失败时为提示文字
+    """
+    try:
+        return fetch_weather_info(city, target_date)
+    except WeatherOutOfRangeError:
+        return WEATHER_OUT_OF_RANGE_TEXT
+    except WeatherServiceError as e:
+        logger.warning("%s，可手动输入天气信息", e)
+        return WEATHER_FAILED_TEXT
     except Exception as e:
-        st.warning(f"获取天气信息失败: {str(e)} 可手动输入天气信息")
-        return "查询天气信息失败，可手动输入天气信息"
+        logger.warning("获取天气信息失败: %s，可手动输入天气信息", e)
+        return WEATHER_FAILED_TEXT
 
+def _load_entries(cache_data) -> Dict[str, WeatherEntry]:
+    """解析缓存文件中的全部条目，跳过无法识别的条目"""
+    entries = {}
+    for key, value in weather_cache_items(cache_data).items():
+        try:
+            entries[key] = WeatherEntry.from_raw(value)
+        except (KeyError, IndexError, TypeError, ValueError):
+            logger.debug("跳过无法识别的天气缓存条目: %s", key)
+    return entries
+
+@timed("weather_cache_read")
 def get_cached_weather(city: str, target_date: date) -> Optional[str]:
     """
     从缓存获取指定日期的天气信息
@@ -77,11 +214,7 @@ def get_cached_weather(city: str, target_date: date) -> Optional[str]:
         Optional[str]: 缓存的天气信息，如果没有有效缓存则返回None
     """
     try:
-        if not os.path.exists(WEATHER_CACHE_FILE):
-            return None
-            
-        with open(WEATHER_CACHE_FILE, 'r', encoding='utf-8') as f:
-            cache_data = json.load(f)
+        cache_data = weather_cache_items(read_json(WEATHER_CACHE_FILE, default={}))
         
         # 创建缓存键（city_date格式）
         cache_key = f"{city}_{target_date}"
@@ -91,21 +224,24 @@ def get_cached_weather(city: str, target_date: date) -> Optional[str]:
             return None
             
         # 检查缓存是否过期（缓存有效期1小时）
-        cached_entry = cache_data[cache_key]
-        cached_time = datetime.fromisoformat(cached_entry['timestamp'])
-        if datetime.now() - cached_time > timedelta(hours=1):
-            # 缓存过期，删除该条目
-            del cache_data[cache_key]
-            # 更新缓存文件
-            with open(WEATHER_CACHE_FILE, 'w', encoding='utf-8') as f:
-                json.dump(cache_data, f, ensure_ascii=False, indent=2)
+        cached_entry = WeatherEntry.from_raw(cache_data[cache_key])
+        if cached_entry.is_expired(WEATHER_CACHE_TTL):
+            # 缓存过期，在锁内删除该条目（期间可能已被其他进程刷新，需重新判断）
+            def _drop_expired(current):
+                entries = _load_entries(current)
+                entry = entries.get(cache_key)
+                if entry and entry.is_expired(WEATHER_CACHE_TTL):
+                    del entries[cache_key]
+                return encode_weather_cache(entries)
+            update_json(WEATHER_CACHE_FILE, _drop_expired, default={})
             return None
             
-        return cached_entry['weather_info']
+        return cached_entry.weather_info
     except Exception:
         # 缓存读取失败，忽略缓存
         return None
 
+@timed("weather_cache_write")
 def cache_weather(city: str, target_date: date, weather_info: str) -> None:
     """
     缓存指定日期的天气信息
@@ -116,25 +252,26 @@ def cache_weather(city: str, target_date: date, weather_info: str) -> None:
         weather_info (str): 天气信息
     """
     try:
-        # 确保缓存目录存在
-        os.makedirs(os.path.dirname(WEATHER_CACHE_FILE), exist_ok=True)
-        
-        # 读取现有缓存
-        cache_data = {}
-        if os.path.exists(WEATHER_CACHE_FILE):
-            with open(WEATHER_CACHE_FILE, 'r', encoding='utf-8') as f:
-                cache_data = json.load(f)
-        
-        # 更新缓存
+        # 更新缓存（在锁内读取-修改-写回，避免并发写入丢失条目）
         cache_key = f"{city}_{target_date}"
-        cache_data[cache_key] = {
-            'weather_info': weather_info,
-            'timestamp': datetime.now().isoformat()
-        }
         
-        # 保存缓存
-        with open(WEATHER_CACHE_FILE, 'w', encoding='utf-8') as f:
-            json.dump(cache_data, f, ensure_ascii=False, indent=2)
+        def _add_entry(cache_data):
+            # 旧格式的缓存文件同时迁移为紧凑格式
+            entries = _load_entries(cache_data)
+            entries[cache_key] = WeatherEntry(weather_info, datetime.now())
+            return encode_weather_cache(entries)
+        
+        update_json(WEATHER_CACHE_FILE, _add_entry, default={})
     except Exception as e:
         # 缓存失败不影响主要功能
-        pass
\ No newline at end of file
+        logger.warning("缓存天气信息失败: %s", e)
+
+def seed_weather_store() -> int:
+    """
+    把天气缓存中的条目导入历史天气库（启用历史天气库之前查到的天气）
+    
+    Returns:
+        int: 导入的天数
+    """
+    entries = _load_entries(read_json(WEATHER_CACHE_FILE, default={}))
+    return import_cache_entries((key, entry.weather_info, entry.fetched_at) for key, entry in entries.items())
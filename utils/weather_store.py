@@ -0,0 +1,136 @@
+"""
+历史天气库：按（城市, 日期）永久保存最后一次查到的天气预报
+
+天气缓存只保留1小时，过期后过去的日期和超出预报范围的日期就查不到了。
+每次联网查询都把整份预报（未来十几天）写入本库，之后重新生成旧日期的提醒、
+回放历史记录和批量导出都可以离线得到当天的天气。
+
+使用SQLite（标准库自带），多进程、多线程同时读写由SQLite自身的锁保证。
+"""
+import os
+import re
+import sqlite3
+import logging
+from contextlib import closing
+from datetime import date, datetime
+from typing import Iterable, Optional, Tuple
+
+from utils.metrics import timed
+
+logger = logging.getLogger(__name__)
+
+# 历史天气库文件路径
+WEATHER_STORE_FILE = 'data/weather_history.db'
+
+# 等待其他进程释放数据库锁的最长时间（秒）
+STORE_TIMEOUT = 10
+
+# 天气缓存键，例如 "101240301_2025-09-28"
+CACHE_KEY_PATTERN = re.compile(r'^(\w+)_(\d{4}-\d{2}-\d{2})$')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS weather_days (
+    city TEXT NOT NULL,
+    day TEXT NOT NULL,
+    weather_info TEXT NOT NULL,
+    fetched_at TEXT NOT NULL,
+    PRIMARY KEY (city, day)
+)
+"""
+
+# 同一天以查询时间较晚的预报为准（离目标日期越近的预报越准确）
+UPSERT = """
+INSERT INTO weather_days (city, day, weather_info, fetched_at) VALUES (?, ?, ?, ?)
+ON CONFLICT (city, day) DO UPDATE SET weather_info = excluded.weather_info, fetched_at = excluded.fetched_at
+WHERE excluded.fetched_at >= weather_days.fetched_at
+"""
+
+# 已初始化过表结构的数据库文件
+_initialized = set()
+
+
+def _connect(store_file: Optional[str]) -> sqlite3.Connection:
+    """打开数据库（首次使用时创建目录和表）"""
+    path = store_file or WEATHER_STORE_FILE
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    connection = sqlite3.connect(path, timeout=STORE_TIMEOUT)
+    if path not in _initialized:
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute(SCHEMA)
+        connection.commit()
+        _initialized.add(path)
+    return connection
+
+
+@timed("weather_store_write")
+def record_forecasts(city: str, forecasts: Iterable[Tuple[date, str]],
+                     fetched_at: Optional[datetime] = None, store_file: Optional[str] = None) -> int:
+    """
+    保存一次查询得到的各日预报（同一天已有更晚查询的结果时保留原结果）
+
+    Args:
+        city (str): 城市代码
+        forecasts (Iterable[Tuple[date, str]]): (日期, 天气信息)
+        fetched_at (Optional[datetime]): 查询时间，默认当前时间
+        store_file (Optional[str]): 数据库文件路径，默认为WEATHER_STORE_FILE
+
+    Returns:
+        int: 写入的天数
+    """
+    fetched = (fetched_at or datetime.now()).isoformat()
+    rows = [(city, day.isoformat(), weather_info, fetched) for day, weather_info in forecasts]
+    if not rows:
+        return 0
+    with closing(_connect(store_file)) as connection, connection:
+        connection.executemany(UPSERT, rows)
+    return len(rows)
+
+
+@timed("weather_store_read")
+def lookup_weather(city: str, target_date: date, store_file: Optional[str] = None) -> Optional[str]:
+    """
+    查询某天最后一次查到的天气预报
+
+    Args:
+        city (str): 城市代码
+        target_date (date): 日期
+        store_file (Optional[str]): 数据库文件路径，默认为WEATHER_STORE_FILE
+
+    Returns:
+        Optional[str]: 天气信息，没有记录时为None
+    """
+    path = store_file or WEATHER_STORE_FILE
+    if not os.path.exists(path):
+        return None
+    with closing(_connect(path)) as connection:
+        row = connection.execute(
+            "SELECT weather_info FROM weather_days WHERE city = ? AND day = ?",
+            (city, target_date.isoformat())
+        ).fetchone()
+    return row[0] if row else None
+
+
+def import_cache_entries(entries: Iterable[Tuple[str, str, datetime]], store_file: Optional[str] = None) -> int:
+    """
+    把天气缓存中的条目导入历史天气库（启用本库之前查到的天气）
+
+    Args:
+        entries (Iterable[Tuple[str, str, datetime]]): (缓存键, 天气信息, 查询时间)，缓存键为 "城市_日期"
+        store_file (Optional[str]): 数据库文件路径，默认为WEATHER_STORE_FILE
+
+    Returns:
+        int: 导入的天数（无法识别的缓存键跳过）
+    """
+    imported = 0
+    for key, weather_info, fetched_at in entries:
+        match = CACHE_KEY_PATTERN.match(key)
+        if not match:
+            continue
+        try:
+            day = date.fromisoformat(match.group(2))
+        except ValueError:
+            continue
+        imported += record_forecasts(match.group(1), [(day, weather_info)], fetched_at, store_file)
+    return imported
@@ -0,0 +1,255 @@
+import time
+import atexit
+import logging
+import threading
+from typing import Dict, Any, List, Optional, Callable, Tuple
+
+from utils.storage import write_text
+from utils.metrics import timed, increment
+
+logger = logging.getLogger(__name__)
+
+# 收到第一个写入请求后等待的时间（秒），期间到达的写入合并为一批
+FLUSH_DELAY = 0.2
+# 写入失败后重试前的等待时间（秒）
+RETRY_DELAY = 1.0
+# 同一文件连续写入失败的最多次数，超过后丢弃该文件的待写内容（权限不足、磁盘已满等不会自行恢复）
+MAX_ATTEMPTS = 3
+# 进程退出时等待后台写入完成的最长时间（秒）
+SHUTDOWN_TIMEOUT = 10.0
+
+# 批量追加函数：(待追加的条目, 文件路径) -> None，失败时抛出异常
+AppendWriter = Callable[[List[Any], str], None]
+
+
+class WriteBehindQueue:
+    """
+    后台写入队列：页面把要写的内容交给队列后立即返回，由一个后台线程批量写盘
+
+    - 同一输出文件的多次写入只写最后一次的内容
+    - 同一文件的多次追加（如历史记录）合并为一次"读取-修改-写回"
+    - 写入失败的内容重新排队，稍后重试；连续失败MAX_ATTEMPTS次后丢弃并记录错误日志
+    - 进程正常退出时（atexit）写完队列中剩余的内容
+
+    写入完成前，pending_text / pending_items 可以读到尚未落盘的内容。
+    """
+
+    def __init__(self, delay: float = FLUSH_DELAY):
+        self.delay = delay
+        self._cond = threading.Condition()
+        # 待写入：文件路径 -> 内容；文件路径 -> (追加函数, 条目列表)
+        self._outputs: Dict[str, str] = {}
+        self._appends: Dict[str, Tuple[AppendWriter, List[Any]]] = {}
+        # 正在写入的一批（写入完成前仍可读到）
+        self._inflight_outputs: Dict[str, str] = {}
+        self._inflight_appends: Dict[str, Tuple[AppendWriter, List[Any]]] = {}
+        # 连续写入失败的次数：文件路径 -> 次数
+        self._text_failures: Dict[str, int] = {}
+        self._append_failures: Dict[str, int] = {}
+        self._busy = False
+        self._closed = False
+        # 正在flush等待的调用数，有等待时不再等批处理窗口结束
+        self._flush_waiters = 0
+        self._thread: Optional[threading.Thread] = None
+
+    def _pending(self) -> bool:
+        return bool(self._outputs or self._appends)
+
+    def _ensure_worker(self) -> None:
+        """首次写入时启动后台线程并注册退出时的写入（调用方持有锁）"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+            self._thread.start()
+            atexit.register(self.close)
+
+    def write_text(self, path: str, content: str) -> None:
+        """
+        排队写入一个文本文件（同一路径只保留最后一次的内容）
+
+        Args:
+            path (str): 文件路径
+            content (str): 文件内容
+        """
+        with self._cond:
+            if self._closed:
+                write_text(path, content)
+                return
+            if path in self._outputs:
+                increment("write_behind_coalesced")
+            self._outputs[path] = content
+            self._ensure_worker()
+            self._cond.notify_all()
+
+    def append(self, path: str, item: Any, writer: AppendWriter) -> None:
+        """
+        排队向文件追加一个条目，同一文件的条目由writer一次写入
+
+        Args:
+            path (str): 文件路径
+            item (Any): 要追加的条目
+            writer (AppendWriter): 批量追加函数
+        """
+        with self._cond:
+            if self._closed:
+                writer([item], path)
+                return
+            self._appends.setdefault(path, (writer, []))[1].append(item)
+            self._ensure_worker()
+            self._cond.notify_all()
+
+    def pending_text(self, path: str) -> Optional[str]:
+        """
+        读取尚未写盘的文件内容
+
+        Args:
+            path (str): 文件路径
+
+        Returns:
+            Optional[str]: 排队或正在写入的内容，没有时为None
+        """
+        with self._cond:
+            content = self._outputs.get(path)
+            return content if content is not None else self._inflight_outputs.get(path)
+
+    def pending_items(self, path: str) -> List[Any]:
+        """
+        读取尚未写盘的追加条目（按排队顺序）
+
+        Args:
+            path (str): 文件路径
+
+        Returns:
+            List[Any]: 正在写入和排队中的条目
+        """
+        with self._cond:
+            items = list(self._inflight_appends.get(path, (None, []))[1])
+            items.extend(self._appends.get(path, (None, []))[1])
+            return items
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        等待队列中的内容全部写盘（删除、清空等需要读到最新数据的操作前调用）
+
+        Args:
+            timeout (Optional[float]): 最长等待时间（秒），None表示一直等待
+
+        Returns:
+            bool: 队列已清空返回True，超时返回False
+        """
+        with self._cond:
+            if self._thread is None or self._closed:
+                return not (self._pending() or self._busy)
+            self._flush_waiters += 1
+            self._cond.notify_all()
+            try:
+                return self._cond.wait_for(lambda: not (self._pending() or self._busy), timeout)
+            finally:
+                self._flush_waiters -= 1
+
+    def close(self, timeout: float = SHUTDOWN_TIMEOUT) -> None:
+        """
+        停止后台线程并写完剩余内容（进程退出时自动调用）
+
+        Args:
+            timeout (float): 等待后台线程的最长时间（秒）
+        """
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify_all()
+            thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+        # 后台线程退出后在当前线程写完剩余内容
+        if self._drain():
+            logger.error("进程退出前仍有内容写入失败")
+
+    def _run(self) -> None:
+        """后台线程：等待写入请求，攒够一批后写盘"""
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._pending() or self._closed)
+                if self._closed:
+                    return
+                # 合并批处理窗口内到达的写入：新条目到达时继续等到窗口结束
+                deadline = time.monotonic() + self.delay
+                while not (self._closed or self._flush_waiters):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                if self._closed:
+                    return
+            if self._drain():
+                time.sleep(RETRY_DELAY)
+
+    @timed("write_behind_flush")
+    def _drain(self) -> int:
+        """
+        写入当前排队的全部内容
+
+        Returns:
+            int: 写入失败并重新排队的文件数（已丢弃的不计入）
+        """
+        with self._cond:
+            outputs, self._outputs = self._outputs, {}
+            appends, self._appends = self._appends, {}
+            self._inflight_outputs, self._inflight_appends = outputs, appends
+            self._busy = True
+
+        failed_outputs: Dict[str, str] = {}
+        failed_appends: Dict[str, Tuple[AppendWriter, List[Any]]] = {}
+        for path, content in outputs.items():
+            try:
+                write_text(path, content)
+            except Exception:
+                logger.exception("后台写入文件失败: %s", path)
+                failed_outputs[path] = content
+        for path, (writer, items) in appends.items():
+            try:
+                writer(items, path)
+            except Exception:
+                logger.exception("后台追加 %d 条记录失败: %s", len(items), path)
+                failed_appends[path] = (writer, items)
+
+        requeued = 0
+        with self._cond:
+            for path in outputs.keys() - failed_outputs.keys():
+                self._text_failures.pop(path, None)
+            for path in appends.keys() - failed_appends.keys():
+                self._append_failures.pop(path, None)
+            # 失败的内容重新排队；同一文件已有更新的内容时以新内容为准
+            for path, content in failed_outputs.items():
+                if self._give_up(self._text_failures, path):
+                    logger.error("文件 %s 连续 %d 次写入失败，已丢弃待写内容", path, MAX_ATTEMPTS)
+                    continue
+                self._outputs.setdefault(path, content)
+                requeued += 1
+            for path, (writer, items) in failed_appends.items():
+                if self._give_up(self._append_failures, path):
+                    logger.error("文件 %s 连续 %d 次追加失败，已丢弃 %d 条记录", path, MAX_ATTEMPTS, len(items))
+                    continue
+                queued = self._appends.setdefault(path, (writer, []))[1]
+                queued[:0] = items
+                requeued += 1
+            self._inflight_outputs, self._inflight_appends = {}, {}
+            self._busy = False
+            self._cond.notify_all()
+        if failed_outputs or failed_appends:
+            increment("write_behind_errors")
+        return requeued
+
+    @staticmethod
+    def _give_up(failures: Dict[str, int], path: str) -> bool:
+        """记录一次写入失败，达到MAX_ATTEMPTS次时返回True（调用方持有锁）"""
+        failures[path] = failures.get(path, 0) + 1
+        if failures[path] < MAX_ATTEMPTS:
+            return False
+        del failures[path]
+        increment("write_behind_dropped")
+        return True
+
+
+# 进程内共享的后台写入队列
+WRITE_QUEUE = WriteBehindQueue()
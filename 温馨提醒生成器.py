@@ -3,11 +3,16 @@ import streamlit.components.v1 as components
 from datetime import datetime, timedelta
 
 # 导入自定义模块
-from utils.data_manager import load_schedule_data
-from utils.weather_service import get_weather_info
-from utils.reminder_generator import generate_reminder_content
-from utils.history_manager import save_history_record, load_history_records, clear_history_records, format_history_record
-from utils.mobile_page_generator import generate_mobile_page
+from utils.st_adapters import load_schedule_data, get_weather_info
+from utils.history_manager import queue_history_record, load_history_records, clear_history_records, format_history_record
+from utils.mobile_page_generator import generate_mobile_page, save_mobile_page
+from utils.reminder_generator import build_reminder_data, render_reminder_text
+from utils.reminder_formats import OUTPUT_FORMATS, render_formats
+from utils.precompute import (
+    get_precomputed, reminder_from_precomputed, reminder_data_from_precomputed, page_from_precomputed
+)
+from utils.image_renderer import check_image_support, get_or_render_reminder_image
+from utils.ui_components import get_current_class, render_class_selector, render_debug_sidebar
 
 # 设置页面配置
 st.set_page_config(
@@ -16,20 +21,14 @@ st.set_page_config(
     layout="wide"
 )
 
+# 确定当前班级（URL参数 ?class=<班级ID>）
+class_context = get_current_class()
+render_class_selector(class_context)
+
 # 标题和说明
-st.title("🗓乐知班每日温馨提醒生成器")
+st.title(f"🗓{class_context.name}每日温馨提醒生成器")
 # st.write("点击下方按钮生成明日的班级温馨提示")
 
-# 加载课程安排数据
-schedule_data = load_schedule_data()
-
-# 获取当前日期和明日日期
-today = datetime.now()
-
-# 添加日期选择器
-selected_date = st.date_input("日期（默认为明天）", value=today + timedelta(days=1))
-# selected_date = st.markdown(today + timedelta(days=1))
-
 # 获取星期几（中文）
 weekday_map = {
     0: "星期一",
@@ -41,48 +40,8 @@ weekday_map = {
     6: "星期日"
 }
 
-selected_weekday = weekday_map[selected_date.weekday()]
-
-# 显示日期信息
-col1, col2 = st.columns(2)
-with col1:
-    st.info(f"当前日期：{today.strftime('%Y年%m月%d日')} {weekday_map[today.weekday()]}")
-with col2:
-    st.info(f"生成对象：{selected_date.strftime('%Y年%m月%d日')} {selected_weekday}")
-
-# 默认城市设置为上饶市信州区
-city = '101240301' # "上饶市信州区"
-
-# 当日期改变时，自动更新天气信息
-# 使用session_state来存储天气信息，避免每次重新计算
-if 'weather_info' not in st.session_state or 'last_selected_date' not in st.session_state or st.session_state.last_selected_date != selected_date:
-    st.session_state.weather_info = get_weather_info(city, selected_date)
-    st.session_state.last_selected_date = selected_date if selected_date else None
-
-# 创建两列布局，一列用于天气输入框，另一列用于更新按钮
-weather_col, button_col = st.columns([3, 1])
-with weather_col:
-    weather = st.text_input("天气查询结果", st.session_state.weather_info, key="weather_input_field")
-with button_col:
-    # 添加更新天气按钮
-    if st.button("更新天气", key="update_weather_btn", use_container_width=True):
-        # 手动更新天气信息
-        with st.spinner("正在获取最新天气信息..."):
-            st.session_state.weather_info = get_weather_info(city, selected_date)
-            st.session_state.last_selected_date = selected_date
-            # 重新运行应用以更新界面
-            st.rerun()
-
-# 特别注意事项
-special_notes = st.text_area("特别注意事项（可选）", 
-                           placeholder="如有特别事项请在此填写，例如：考试安排、活动通知等",
-                           height=100)
-
-# LLM API设置
-# with st.expander("LLM API设置（可选）"):
-#     api_provider = st.selectbox("选择API提供商", ["不使用", "OpenAI", "Anthropic"], index=0)
-#     api_key = st.text_input("API密钥", type="password")
-
+# 城市代码来自班级配置（默认为上饶市信州区），同城班级共享天气缓存
+city = class_context.city
 
 # 初始化session_state中的变量
 if 'reminder_text' not in st.session_state:
@@ -94,32 +53,114 @@ if 'show_mobile_page' not in st.session_state:
 if 'safe_special_notes' not in st.session_state:
     st.session_state.safe_special_notes = ""
 
-# 生成按钮
-if st.button("生成乐知班温馨提示", key="generate_btn", use_container_width=True):
-    with st.spinner("正在生成温馨提示..."):
-        # 确保special_notes不为None
-        safe_special_notes = special_notes if special_notes is not None else ""
-        # 只在点击按钮时生成提醒内容
-        reminder_text = generate_reminder_content(selected_date, selected_weekday, weather, schedule_data, safe_special_notes)
-        
-        # 保存到session_state
-        st.session_state.reminder_text = reminder_text
-        st.session_state.show_editor = True
-        st.session_state.show_mobile_page = False
-        st.session_state.safe_special_notes = safe_special_notes
+# 页面分为四个独立重新运行的片段（fragment）：日期天气、生成、编辑、预览。
+# 片段内的交互只重新运行该片段；片段之间通过session_state传递数据，
+# 只有需要显示新区域时（生成提示、生成网页）才重新运行整个页面。
+
+@st.fragment
+def render_date_weather_section():
+    """日期选择与天气查询区域"""
+    # 获取当前日期和明日日期
+    today = datetime.now()
+    
+    # 添加日期选择器
+    selected_date = st.date_input("日期（默认为明天）", value=today + timedelta(days=1), key="selected_date")
+    # selected_date = st.markdown(today + timedelta(days=1))
+    
+    selected_weekday = weekday_map[selected_date.weekday()]
+    
+    # 显示日期信息
+    col1, col2 = st.columns(2)
+    with col1:
+        st.info(f"当前日期：{today.strftime('%Y年%m月%d日')} {weekday_map[today.weekday()]}")
+    with col2:
+        st.info(f"生成对象：{selected_date.strftime('%Y年%m月%d日')} {selected_weekday}")
+    
+    # 当日期改变时，自动更新天气信息
+    # 使用session_state来存储天气信息，避免每次重新计算
+    if 'weather_info' not in st.session_state or 'last_selected_date' not in st.session_state or st.session_state.last_selected_date != selected_date:
+        st.session_state.weather_info = get_weather_info(city, selected_date)
+        st.session_state.last_selected_date = selected_date if selected_date else None
+    
+    # 创建两列布局，一列用于天气输入框，另一列用于更新按钮
+    weather_col, button_col = st.columns([3, 1])
+    with weather_col:
+        st.text_input("天气查询结果", st.session_state.weather_info, key="weather_input_field")
+    with button_col:
+        # 添加更新天气按钮
+        if st.button("更新天气", key="update_weather_btn", use_container_width=True):
+            # 手动更新天气信息
+            with st.spinner("正在获取最新天气信息..."):
+                st.session_state.weather_info = get_weather_info(city, selected_date)
+                st.session_state.last_selected_date = selected_date
+                # 只重新运行日期天气区域以更新界面
+                st.rerun(scope="fragment")
+
+def build_history_record(reminder_text: str) -> dict:
+    """根据当前选择的日期和天气构建历史记录"""
+    selected_date = st.session_state.selected_date
+    return {
+        "date": selected_date.strftime('%Y年%m月%d日'),
+        "weekday": weekday_map[selected_date.weekday()],
+        "weather": st.session_state.weather_input_field,
+        "special_notes": st.session_state.safe_special_notes,
+        "reminder_content": reminder_text
+    }
+
+@st.fragment
+def render_generator_section():
+    """特别注意事项与生成按钮区域"""
+    # 特别注意事项
+    special_notes = st.text_area("特别注意事项（可选）", 
+                               placeholder="如有特别事项请在此填写，例如：考试安排、活动通知等",
+                               height=100)
+    
+    # LLM API设置
+    # with st.expander("LLM API设置（可选）"):
+    #     api_provider = st.selectbox("选择API提供商", ["不使用", "OpenAI", "Anthropic"], index=0)
+    #     api_key = st.text_input("API密钥", type="password")
+    
+    # 生成按钮
+    if st.button("生成乐知班温馨提示", key="generate_btn", use_container_width=True):
+        with st.spinner("正在生成温馨提示..."):
+            # 课程安排数据只在生成时读取（进程内缓存，文件未变化时不重新解析）
+            schedule_data = load_schedule_data(class_context.schedule_file)
+            selected_date = st.session_state.selected_date
+            weather = st.session_state.weather_input_field
+            
+            # 确保special_notes不为None
+            safe_special_notes = special_notes if special_notes is not None else ""
+            # 结构化的提醒数据，文本和其他格式都由它渲染
+            selected_weekday = weekday_map[selected_date.weekday()]
+            # 优先使用每晚预生成的结果，只重新计算特别注意事项部分
+            precomputed = get_precomputed(class_context, selected_date, weather, schedule_data)
+            if precomputed is not None:
+                reminder_text = reminder_from_precomputed(precomputed, safe_special_notes)
+                reminder_data = reminder_data_from_precomputed(precomputed, safe_special_notes)
+            else:
+                reminder_data = build_reminder_data(selected_date, selected_weekday, weather, schedule_data, safe_special_notes, class_context.name)
+                reminder_text = render_reminder_text(reminder_data)
+            
+            # 保存到session_state
+            st.session_state.reminder_text = reminder_text
+            st.session_state.reminder_data = reminder_data
+            st.session_state.precomputed = precomputed
+            st.session_state.show_editor = True
+            st.session_state.show_mobile_page = False
+            st.session_state.safe_special_notes = safe_special_notes
+            
+            # 保存到历史记录（后台写盘，不等待写入完成）
+            queue_history_record(build_history_record(reminder_text), class_context.history_file)
         
-        # 保存到历史记录
-        history_record = {
-            "date": selected_date.strftime('%Y年%m月%d日'),
-            "weekday": selected_weekday,
-            "weather": weather,
-            "special_notes": safe_special_notes,
-            "reminder_content": reminder_text
-        }
-        save_history_record(history_record)
-
-# 显示生成的提示和编辑区域
-if st.session_state.show_editor and st.session_state.reminder_text:
+        # 编辑区域和预览区域需要随之更新，重新运行整个页面
+        st.rerun()
+
+@st.fragment
+def render_editor_section():
+    """温馨提示编辑区域，编辑文本时只重新运行本区域"""
+    if not (st.session_state.show_editor and st.session_state.reminder_text):
+        return
+    
     st.subheader("生成的温馨提示：")
     
     # 创建可编辑的文本区域
@@ -143,29 +184,54 @@ if st.session_state.show_editor and st.session_state.reminder_text:
     # st.text_area("点击上方按钮后，请在此处选中文本进行复制", value=edited_reminder, height=100, key="copy_area")
     st.code(edited_reminder, language="``")
     
+    # 提醒内容未经修改时，提供由同一份数据一次渲染的其他格式
+    reminder_data = st.session_state.get("reminder_data")
+    if reminder_data is not None and edited_reminder == render_reminder_text(reminder_data):
+        with st.expander("📋 其他格式（Markdown、微信群、短信）"):
+            outputs = render_formats(reminder_data, ["markdown", "wechat", "sms"])
+            tabs = st.tabs([OUTPUT_FORMATS[fmt] for fmt in outputs])
+            for tab, (fmt, content) in zip(tabs, outputs.items()):
+                with tab:
+                    st.code(content, language="markdown" if fmt == "markdown" else None)
+                    if fmt == "sms":
+                        st.caption(f"共 {len(content)} 字")
+    
     # 生成手机网页按钮
     if st.button("保存并生成手机网页（支持图片下载）", key="generate_mobile_btn", use_container_width=True):
         with st.spinner("正在生成手机网页..."):
-            # 使用编辑后的内容生成手机网页
-            html_content, file_path = generate_mobile_page(edited_reminder, selected_date)
+            # 提醒内容未经修改且有预生成的网页骨架时，只填入特别注意事项
+            precomputed = st.session_state.get("precomputed")
+            notes = st.session_state.safe_special_notes
+            if precomputed is not None and edited_reminder == reminder_from_precomputed(precomputed, notes):
+                html_content = page_from_precomputed(precomputed, notes)
+                file_path = save_mobile_page(html_content, st.session_state.selected_date, class_context.output_dir,
+                                             background=True)
+            else:
+                # 使用编辑后的内容生成手机网页
+                html_content, file_path = generate_mobile_page(edited_reminder, st.session_state.selected_date,
+                                                                class_context.output_dir, background=True)
             
             # 保存到session_state
             st.session_state.html_content = html_content
             st.session_state.file_path = file_path
             st.session_state.show_mobile_page = True
             
-            # 更新历史记录
-            history_record = {
-                "date": selected_date.strftime('%Y年%m月%d日'),
-                "weekday": selected_weekday,
-                "weather": weather,
-                "special_notes": st.session_state.safe_special_notes,
-                "reminder_content": edited_reminder
-            }
-            save_history_record(history_record)
-
-# 显示手机网页
-if st.session_state.show_mobile_page and hasattr(st.session_state, 'html_content'):
+            # 图片在点击下载时才绘制，这里只记录内容；不可用时仍可使用网页中的下载按钮
+            st.session_state.image_source = (edited_reminder, st.session_state.selected_date)
+            st.session_state.image_error = check_image_support()
+            
+            # 更新历史记录（网页和历史记录都由后台队列写盘）
+            queue_history_record(build_history_record(edited_reminder), class_context.history_file)
+        
+        # 预览区域位于本片段之外，重新运行整个页面以挂载新的预览
+        st.rerun()
+
+@st.fragment
+def render_preview_section():
+    """手机网页预览区域，只在生成新网页时重新挂载"""
+    if not (st.session_state.show_mobile_page and hasattr(st.session_state, 'html_content')):
+        return
+    
     # st.subheader("📱 手机网页版本")
     
     # 创建三列布局
@@ -192,10 +258,35 @@ if st.session_state.show_mobile_page and hasattr(st.session_state, 'html_content
     #     在下方预览页面中点击"📷 下载为图片"按钮，可以将温馨提醒保存为PNG图片格式，方便分享和打印。
     #     """)
     
+    # 服务器端生成的图片，家长手机上无需再截图
+    image_source = st.session_state.get("image_source")
+    if image_source and not st.session_state.get("image_error"):
+        reminder_text, target_date = image_source
+        output_dir = class_context.output_dir
+        
+        def render_image() -> bytes:
+            # 点击下载时在后台线程中绘制（按内容缓存，同一份提醒只绘制一次），不阻塞页面
+            return get_or_render_reminder_image(reminder_text, target_date, output_dir)[0]
+        
+        st.download_button(
+            label="📷 下载图片",
+            data=render_image,
+            file_name=f"{class_context.name}温馨提醒_{st.session_state.selected_date.strftime('%Y%m%d')}.png",
+            mime="image/png",
+            key="download_image_btn",
+        )
+    elif st.session_state.get("image_error"):
+        st.caption(st.session_state.image_error)
+    
     # 显示网页预览
     st.markdown("#### 📱 网页预览")
     components.html(st.session_state.html_content, height=650, scrolling=True)
 
+render_date_weather_section()
+render_generator_section()
+render_editor_section()
+render_preview_section()
+
 # 在页面底部添加编辑界面和历史记录的入口
 st.markdown("---")
 col1, col2 = st.columns(2)
@@ -206,3 +297,6 @@ with col1:
 with col2:
     if st.button("查看历史记录"):
         st.switch_page("pages/历史记录.py")
+
+# 调试模式下显示各阶段耗时（放在页面末尾，包含本次运行的统计）
+render_debug_sidebar()